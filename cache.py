@@ -0,0 +1,452 @@
+"""
+Server-Side Cache
+
+This module provides the cache shared by the route handlers and the property data service.
+Every worker keeps an in-process LRU cache with per-key TTLs and an entry limit. When
+CACHE_REDIS_URL is set, a shared backend speaking the Redis protocol sits behind it, so a payload
+computed by one gunicorn worker is reused by the others.
+
+Use it through get()/set()/delete() or the @cached decorator. Hit, miss and eviction counters are
+available from cache_stats(). The 'local://' URL swaps in LocalRedis, an in-process stand-in for
+the shared backend, for tests and development without a Redis server (scripts/check_cache.py
+exercises it).
+
+Values in the shared backend are stored as JSON, never pickled, so whoever can write to it cannot
+run code in the workers. Besides JSON types, datetimes, dates, Decimals and bytes round-trip;
+tuples come back as lists.
+"""
+
+import os
+import json
+import time
+import base64
+import decimal
+import fnmatch
+import logging
+import datetime
+import threading
+import functools
+from collections import OrderedDict
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of entries each worker keeps in memory
+CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES', 2048))
+# Seconds an entry lives when set() is not given a TTL
+CACHE_DEFAULT_TTL = int(os.environ.get('CACHE_DEFAULT_TTL', 300))
+# Shared backend, e.g. redis://localhost:6379/0 (empty for in-process only)
+CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL', '')
+CACHE_KEY_PREFIX = os.environ.get('CACHE_KEY_PREFIX', 'glassrain:')
+# With a shared backend, workers keep local copies this long at most, which bounds how long
+# a worker can miss another worker's delete()
+CACHE_LOCAL_MAX_TTL = int(os.environ.get('CACHE_LOCAL_MAX_TTL', 30))
+
+_MISSING = object()
+# Marks a JSON object that encodes a value JSON has no type for
+_TYPE_TAG = '__cache_type__'
+
+
+def _encode_special(value):
+    """Encode the non-JSON values the application caches"""
+    if isinstance(value, datetime.datetime):
+        return {_TYPE_TAG: 'datetime', 'value': value.isoformat()}
+    if isinstance(value, datetime.date):
+        return {_TYPE_TAG: 'date', 'value': value.isoformat()}
+    if isinstance(value, decimal.Decimal):
+        return {_TYPE_TAG: 'decimal', 'value': str(value)}
+    if isinstance(value, bytes):
+        return {_TYPE_TAG: 'bytes', 'value': base64.b64encode(value).decode('ascii')}
+    raise TypeError(f"{type(value).__name__} values cannot be stored in the shared cache")
+
+
+def _decode_special(obj):
+    """Decode the values written by _encode_special"""
+    kind = obj.get(_TYPE_TAG)
+    if kind is None:
+        return obj
+    if kind == 'datetime':
+        return datetime.datetime.fromisoformat(obj['value'])
+    if kind == 'date':
+        return datetime.date.fromisoformat(obj['value'])
+    if kind == 'decimal':
+        return decimal.Decimal(obj['value'])
+    if kind == 'bytes':
+        return base64.b64decode(obj['value'])
+    raise ValueError(f"Unknown cached value type {kind}")
+
+
+def dumps(value):
+    """Serialize a value for the shared backend"""
+    return json.dumps(value, default=_encode_special, separators=(',', ':')).encode('utf-8')
+
+
+def loads(payload):
+    """Deserialize a value read from the shared backend"""
+    return json.loads(payload, object_hook=_decode_special)
+
+
+class LRUCache:
+    """An in-process, thread-safe LRU cache with per-key expiry"""
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, default_ttl=CACHE_DEFAULT_TTL):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'sets': 0, 'evictions': 0, 'expirations': 0}
+
+    def get(self, key, default=None):
+        """Return the cached value for key, or default if it is missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats['misses'] += 1
+                return default
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                self._stats['expirations'] += 1
+                self._stats['misses'] += 1
+                return default
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        """Cache value under key for ttl seconds (the default TTL if None, forever if 0)"""
+        ttl = self.default_ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            self._stats['sets'] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def delete(self, key):
+        """Remove key from the cache"""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """Remove every entry"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Return the hit/miss/eviction counters and the current size"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+            stats['max_entries'] = self.max_entries
+        return stats
+
+
+class LocalRedis:
+    """
+    An in-process stand-in for a Redis client
+
+    Implements the subset of the redis-py client used by RedisCache, so the shared backend
+    can be exercised in tests without a server.
+    """
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def _live(self, name):
+        entry = self._data.get(name)
+        if entry is not None and entry[1] is not None and entry[1] <= time.monotonic():
+            del self._data[name]
+            return None
+        return entry
+
+    def get(self, name):
+        with self._lock:
+            entry = self._live(name)
+            return entry[0] if entry else None
+
+    def set(self, name, value, ex=None):
+        with self._lock:
+            self._data[name] = (value, time.monotonic() + ex if ex else None)
+        return True
+
+    def pttl(self, name):
+        with self._lock:
+            entry = self._live(name)
+            if entry is None:
+                return -2
+            if entry[1] is None:
+                return -1
+            return max(0, int((entry[1] - time.monotonic()) * 1000))
+
+    def pipeline(self, transaction=True):
+        return _LocalPipeline(self)
+
+    def delete(self, *names):
+        with self._lock:
+            return sum(1 for name in names if self._data.pop(name, None) is not None)
+
+    def scan_iter(self, match=None):
+        with self._lock:
+            names = [name for name in list(self._data) if self._live(name) is not None]
+        return iter([name for name in names if match is None or fnmatch.fnmatchcase(name, match)])
+
+
+class _LocalPipeline:
+    """Queues LocalRedis calls and runs them on execute(), like a redis-py pipeline"""
+
+    def __init__(self, client):
+        self._client = client
+        self._calls = []
+
+    def __getattr__(self, name):
+        method = getattr(self._client, name)
+
+        def queue(*args, **kwargs):
+            self._calls.append((method, args, kwargs))
+            return self
+        return queue
+
+    def execute(self):
+        calls, self._calls = self._calls, []
+        return [method(*args, **kwargs) for method, args, kwargs in calls]
+
+
+class RedisCache:
+    """A cache stored in a shared backend speaking the Redis protocol"""
+
+    def __init__(self, client, prefix=CACHE_KEY_PREFIX, default_ttl=CACHE_DEFAULT_TTL):
+        self.client = client
+        self.prefix = prefix
+        self.default_ttl = default_ttl
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'sets': 0, 'errors': 0}
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def get(self, key, default=None):
+        """Return the cached value for key, or default if it is missing or the backend fails"""
+        return self.get_with_ttl(key, default)[0]
+
+    def get_with_ttl(self, key, default=None):
+        """
+        Return the cached value for key with the seconds it has left
+
+        Returns:
+        tuple: (value, remaining seconds or None if it never expires); (default, None) on a miss
+        """
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            pipe.get(self.prefix + key)
+            pipe.pttl(self.prefix + key)
+            payload, pttl = pipe.execute()
+        except Exception as e:
+            logger.warning(f"Shared cache get failed for {key}: {str(e)}")
+            self._count('errors')
+            self._count('misses')
+            return default, None
+        # PTTL is -2 once the key has expired (between the two reads, too)
+        if payload is None or pttl == -2:
+            self._count('misses')
+            return default, None
+        try:
+            value = loads(payload)
+        except Exception as e:
+            logger.warning(f"Shared cache entry {key} could not be decoded: {str(e)}")
+            self._count('errors')
+            self._count('misses')
+            return default, None
+        self._count('hits')
+        return value, (pttl / 1000 if pttl >= 0 else None)
+
+    def set(self, key, value, ttl=None):
+        """Cache value under key for ttl seconds (the default TTL if None, forever if 0)"""
+        ttl = self.default_ttl if ttl is None else ttl
+        try:
+            self.client.set(self.prefix + key, dumps(value), ex=ttl or None)
+            self._count('sets')
+        except Exception as e:
+            logger.warning(f"Shared cache set failed for {key}: {str(e)}")
+            self._count('errors')
+
+    def delete(self, key):
+        """Remove key from the cache"""
+        try:
+            self.client.delete(self.prefix + key)
+        except Exception as e:
+            logger.warning(f"Shared cache delete failed for {key}: {str(e)}")
+            self._count('errors')
+
+    def clear(self):
+        """Remove every entry under this cache's prefix"""
+        try:
+            names = list(self.client.scan_iter(match=self.prefix + '*'))
+            if names:
+                self.client.delete(*names)
+        except Exception as e:
+            logger.warning(f"Shared cache clear failed: {str(e)}")
+            self._count('errors')
+
+    def stats(self):
+        """Return this worker's hit/miss counters for the shared backend"""
+        with self._lock:
+            return dict(self._stats)
+
+
+class Cache:
+    """The per-worker LRU cache, optionally backed by a shared cache"""
+
+    def __init__(self, local, shared=None, local_max_ttl=CACHE_LOCAL_MAX_TTL):
+        self.local = local
+        self.shared = shared
+        self.local_max_ttl = local_max_ttl
+
+    def _local_ttl(self, ttl):
+        ttl = self.local.default_ttl if ttl is None else ttl
+        if self.shared is None:
+            return ttl
+        return min(ttl, self.local_max_ttl) if ttl else self.local_max_ttl
+
+    def get(self, key, default=None):
+        value = self.local.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        if self.shared is None:
+            return default
+        value, remaining = self.shared.get_with_ttl(key, _MISSING)
+        if value is _MISSING:
+            return default
+        # The local copy never outlives the shared entry
+        if remaining is None:
+            self.local.set(key, value, self.local_max_ttl)
+        elif remaining > 0:
+            self.local.set(key, value, min(remaining, self.local_max_ttl))
+        return value
+
+    def set(self, key, value, ttl=None):
+        self.local.set(key, value, self._local_ttl(ttl))
+        if self.shared is not None:
+            self.shared.set(key, value, ttl)
+
+    def delete(self, key):
+        self.local.delete(key)
+        if self.shared is not None:
+            self.shared.delete(key)
+
+    def clear(self):
+        self.local.clear()
+        if self.shared is not None:
+            self.shared.clear()
+
+    def stats(self):
+        stats = {'local': self.local.stats()}
+        if self.shared is not None:
+            stats['shared'] = self.shared.stats()
+        return stats
+
+
+def _create_shared_backend(url):
+    """Create the shared backend for a CACHE_REDIS_URL, or None to stay in-process"""
+    if not url:
+        return None
+    if url == 'local://':
+        return RedisCache(LocalRedis())
+    if redis is None:
+        logger.warning("CACHE_REDIS_URL is set but the redis package is not installed; using the in-process cache only")
+        return None
+    return RedisCache(redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5))
+
+
+_cache = Cache(LRUCache(), _create_shared_backend(CACHE_REDIS_URL))
+
+
+def configure(redis_url=None, max_entries=None, default_ttl=None, shared_client=None):
+    """
+    Replace the module cache, e.g. for tests
+
+    Parameters:
+    redis_url (str, optional): Shared backend URL ('local://' for LocalRedis)
+    max_entries (int, optional): Entry limit of the in-process cache
+    default_ttl (int, optional): TTL used when none is given
+    shared_client (optional): A Redis-protocol client to use instead of redis_url
+    """
+    global _cache
+    default_ttl = CACHE_DEFAULT_TTL if default_ttl is None else default_ttl
+    local = LRUCache(max_entries or CACHE_MAX_ENTRIES, default_ttl)
+    if shared_client is not None:
+        shared = RedisCache(shared_client, default_ttl=default_ttl)
+    else:
+        shared = _create_shared_backend(redis_url)
+        if shared is not None:
+            shared.default_ttl = default_ttl
+    _cache = Cache(local, shared)
+
+
+def get(key, default=None):
+    """Return the cached value for key, or default"""
+    return _cache.get(key, default)
+
+
+def set(key, value, ttl=None):
+    """Cache value under key for ttl seconds"""
+    _cache.set(key, value, ttl)
+
+
+def delete(key):
+    """Remove key from the cache"""
+    _cache.delete(key)
+
+
+def clear():
+    """Remove every cached entry"""
+    _cache.clear()
+
+
+def cache_stats():
+    """Return the cache counters for this worker"""
+    return _cache.stats()
+
+
+def cached(ttl=None, key_func=None, cache_none=False):
+    """
+    Cache a function's return value
+
+    Parameters:
+    ttl (int, optional): Seconds to keep the result (the default TTL if None)
+    key_func (callable, optional): Builds the cache key from the call's arguments
+    cache_none (bool): Whether a None result is cached
+
+    Returns:
+    callable: The decorator
+
+    Cached results are shared between callers, so they must not be mutated.
+    """
+    def decorator(func):
+        prefix = f"{func.__module__}.{func.__qualname__}:"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if key_func is not None:
+                key = prefix + str(key_func(*args, **kwargs))
+            else:
+                key = prefix + repr((args, sorted(kwargs.items())))
+            value = _cache.get(key, _MISSING)
+            if value is not _MISSING:
+                return value
+            value = func(*args, **kwargs)
+            if value is not None or cache_none:
+                _cache.set(key, value, ttl)
+            return value
+
+        wrapper.cache_key_prefix = prefix
+        return wrapper
+    return decorator
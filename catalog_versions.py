@@ -0,0 +1,109 @@
+"""
+Catalog Versions
+
+This module keeps a version counter per catalog in the `catalog_versions` table.
+Statement-level triggers bump the counter whenever a tracked table changes, so derived data
+(precomputed recommendations, cached payloads) can tell it is stale with one primary-key lookup.
+"""
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def setup_catalog_versions(cursor):
+    """
+    Create the catalog_versions table and its trigger function
+
+    Parameters:
+    cursor: An open database cursor (the caller commits)
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS catalog_versions (
+            name VARCHAR(100) PRIMARY KEY,
+            version BIGINT NOT NULL DEFAULT 1,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("""
+        CREATE OR REPLACE FUNCTION bump_catalog_version() RETURNS trigger AS $$
+        DECLARE
+            catalog_name TEXT;
+        BEGIN
+            FOREACH catalog_name IN ARRAY TG_ARGV LOOP
+                INSERT INTO catalog_versions (name, version, updated_at)
+                VALUES (catalog_name, 1, CURRENT_TIMESTAMP)
+                ON CONFLICT (name) DO UPDATE
+                SET version = catalog_versions.version + 1,
+                    updated_at = CURRENT_TIMESTAMP;
+            END LOOP;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+
+
+def track_table(cursor, table_name, *catalog_names):
+    """
+    Bump the given catalogs' versions whenever table_name is modified
+
+    Parameters:
+    cursor: An open database cursor (the caller commits)
+    table_name (str): The table to watch
+    *catalog_names (str): Catalog versions to bump on change
+    """
+    # Triggers created before catalogs were tracked independently bump the same versions twice
+    cursor.execute(f"DROP TRIGGER IF EXISTS trg_{table_name}_catalog_version ON {table_name}")
+    # One trigger per catalog, so several catalogs can track the same table independently
+    for name in catalog_names:
+        trigger_name = f"trg_{table_name}_version_{name}"
+        cursor.execute("SELECT EXISTS (SELECT FROM pg_trigger WHERE tgname = %s)", (trigger_name,))
+        if not cursor.fetchone()[0]:
+            cursor.execute(f"""
+                CREATE TRIGGER {trigger_name}
+                AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table_name}
+                FOR EACH STATEMENT EXECUTE FUNCTION bump_catalog_version('{name}')
+            """)
+        cursor.execute("""
+            INSERT INTO catalog_versions (name) VALUES (%s)
+            ON CONFLICT (name) DO NOTHING
+        """, (name,))
+
+
+def get_catalog_version(cursor, catalog_name):
+    """
+    Get the current version of a catalog
+
+    Parameters:
+    cursor: An open database cursor
+    catalog_name (str): The catalog to look up
+
+    Returns:
+    int: The version, or 0 if the catalog has never been tracked
+    """
+    cursor.execute("SELECT version FROM catalog_versions WHERE name = %s", (catalog_name,))
+    row = cursor.fetchone()
+    if not row:
+        return 0
+    return row['version'] if isinstance(row, dict) else row[0]
+
+
+def get_catalog_versions(cursor, catalog_names):
+    """
+    Get the current versions of several catalogs in one query
+
+    Parameters:
+    cursor: An open database cursor
+    catalog_names (list): The catalogs to look up
+
+    Returns:
+    dict: Catalog name to version, omitting catalogs that have never been tracked
+    """
+    cursor.execute("SELECT name, version FROM catalog_versions WHERE name = ANY(%s)", (list(catalog_names),))
+    versions = {}
+    for row in cursor.fetchall():
+        if isinstance(row, dict):
+            versions[row['name']] = row['version']
+        else:
+            versions[row[0]] = row[1]
+    return versions
@@ -0,0 +1,220 @@
+"""
+Conditional GET
+
+This module adds ETag / 304 handling to the reference-data endpoints (service categories, service
+tiers, stores and store categories). Each resource's ETag is its catalog version, which every worker
+keeps in memory and polls in the background, plus the build version of the code and static assets
+that render it (a deploy can change a response without touching its table). A revalidation that
+matches is answered with 304 Not Modified without touching the database. Full responses are kept
+in the server-side cache under the same ETag, so other workers can serve them without a query
+either. Responses carry a Cache-Control policy that lets browsers and CDNs reuse them and
+revalidate cheaply.
+"""
+
+import os
+import glob
+import json
+import time
+import hashlib
+import logging
+import threading
+import functools
+from flask import request, make_response
+import db_pool
+import cache
+import static_assets
+from catalog_versions import setup_catalog_versions, track_table, get_catalog_versions
+
+logger = logging.getLogger(__name__)
+
+# Catalog name -> table whose changes invalidate it
+REFERENCE_CATALOGS = {
+    'service_categories': 'service_categories',
+    'service_tiers': 'service_tiers',
+    'stores': 'stores',
+    'store_categories': 'store_categories'
+}
+
+# Seconds browsers may reuse a response before revalidating
+REFERENCE_DATA_MAX_AGE = int(os.environ.get('REFERENCE_DATA_MAX_AGE', 60))
+# Seconds shared caches (CDNs) may reuse a response before revalidating
+REFERENCE_DATA_SHARED_MAX_AGE = int(os.environ.get('REFERENCE_DATA_SHARED_MAX_AGE', 300))
+# Seconds a cache may keep serving a stale response while it revalidates in the background
+REFERENCE_DATA_STALE_WHILE_REVALIDATE = int(os.environ.get('REFERENCE_DATA_STALE_WHILE_REVALIDATE', 600))
+# Seconds a rendered response stays in the server-side cache
+REFERENCE_DATA_CACHE_TTL = int(os.environ.get('REFERENCE_DATA_CACHE_TTL', 3600))
+# Seconds between polls of catalog_versions; this bounds how long a worker can report an old version
+CATALOG_VERSION_POLL_INTERVAL = int(os.environ.get('CATALOG_VERSION_POLL_INTERVAL', 5))
+
+# Version of the deployed code and static build (e.g. its git commit); when unset, a hash of the
+# application source and the static asset manifest is used
+BUILD_VERSION = os.environ.get('BUILD_VERSION', '')
+
+CACHE_CONTROL = (
+    f"public, max-age={REFERENCE_DATA_MAX_AGE}, s-maxage={REFERENCE_DATA_SHARED_MAX_AGE}, "
+    f"stale-while-revalidate={REFERENCE_DATA_STALE_WHILE_REVALIDATE}"
+)
+
+_versions = {}
+_versions_loaded = False
+_poller_pid = None
+_poller_lock = threading.Lock()
+_build_version = None
+
+
+def setup_conditional_get(cursor):
+    """
+    Track the reference-data tables so each resource has a version
+
+    Parameters:
+    cursor: An open database cursor (the caller commits)
+    """
+    setup_catalog_versions(cursor)
+    for catalog_name, table_name in REFERENCE_CATALOGS.items():
+        track_table(cursor, table_name, catalog_name)
+
+
+def load_versions():
+    """
+    Reload this worker's copy of the reference catalog versions
+
+    Returns:
+    bool: True if the versions were loaded
+    """
+    global _versions, _versions_loaded
+    conn = db_pool.get_connection()
+    if conn is None:
+        return False
+    try:
+        with conn.cursor() as cursor:
+            _versions = get_catalog_versions(cursor, REFERENCE_CATALOGS.keys())
+        _versions_loaded = True
+        return True
+    except Exception as e:
+        logger.error(f"Error loading catalog versions: {str(e)}")
+        return False
+    finally:
+        conn.close()
+
+
+def _poll_loop():
+    """Keep the in-memory catalog versions current"""
+    while True:
+        load_versions()
+        time.sleep(CATALOG_VERSION_POLL_INTERVAL)
+
+
+def ensure_poller_started():
+    """Start this worker's version poller if it is not running yet (it loads the versions at once)"""
+    global _poller_pid
+    if _poller_pid == os.getpid():
+        return
+    with _poller_lock:
+        if _poller_pid == os.getpid():
+            return
+        thread = threading.Thread(target=_poll_loop, name='catalog-version-poller', daemon=True)
+        thread.start()
+        _poller_pid = os.getpid()
+
+
+def _after_fork_in_child():
+    """Forget the parent's versions and start the child's own poller"""
+    global _versions_loaded
+    # Versions loaded before a fork may already be stale in the child; until its poller has
+    # loaded them, responses fall back to a hash of the body
+    _versions_loaded = False
+    ensure_poller_started()
+
+
+def init_app(app):
+    """
+    Load the catalog versions and start polling them when the app starts
+
+    Parameters:
+    app: The Flask app
+
+    Requests never load versions themselves, so a revalidation is answered without a query even
+    on a worker's first request. Workers forked from a preloaded app start their own poller.
+    """
+    load_versions()
+    ensure_poller_started()
+    if hasattr(os, 'register_at_fork'):
+        os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+def get_build_version():
+    """Return the version of the code and static build serving this process, computed once"""
+    global _build_version
+    if _build_version is None:
+        if BUILD_VERSION:
+            _build_version = BUILD_VERSION
+        else:
+            digest = hashlib.sha1()
+            for path in sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), '*.py'))):
+                with open(path, 'rb') as f:
+                    digest.update(f.read())
+            digest.update(json.dumps(static_assets.get_manifest().assets, sort_keys=True).encode('utf-8'))
+            _build_version = digest.hexdigest()[:12]
+    return _build_version
+
+
+def make_etag(catalog_name, version):
+    """Build the (unquoted) ETag for a catalog version under the current build"""
+    return f"{catalog_name}-v{version}-{get_build_version()}"
+
+
+def _not_modified(etag):
+    """Build a 304 response for a matching revalidation"""
+    response = make_response('', 304)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = CACHE_CONTROL
+    return response
+
+
+def conditional_get(catalog_name):
+    """
+    Decorate a reference-data view with ETag / 304 handling
+
+    Parameters:
+    catalog_name (str): The catalog version that identifies the view's content
+
+    Returns:
+    callable: The decorator
+
+    Falls back to a hash of the response body when the catalog version is not known yet.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            # Only starts a thread if this process has none; never queries here
+            ensure_poller_started()
+            version = _versions.get(catalog_name) if _versions_loaded else None
+            etag = make_etag(catalog_name, version) if version is not None else None
+
+            # Answered from memory: no database connection is checked out
+            if etag and request.if_none_match.contains_weak(etag):
+                return _not_modified(etag)
+
+            cache_key = f"reference:{request.full_path}:{etag}" if etag else None
+            cached_body = cache.get(cache_key) if cache_key else None
+            if cached_body is not None:
+                body, mimetype = cached_body
+                response = make_response(body)
+                response.mimetype = mimetype
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                if cache_key:
+                    # The version is part of the key, so entries never need invalidating
+                    cache.set(cache_key, (response.get_data(), response.mimetype), REFERENCE_DATA_CACHE_TTL)
+
+            if etag is None:
+                etag = hashlib.sha1(response.get_data()).hexdigest()
+                if request.if_none_match.contains_weak(etag):
+                    return _not_modified(etag)
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = CACHE_CONTROL
+            return response
+        return wrapper
+    return decorator
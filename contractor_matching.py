@@ -0,0 +1,694 @@
+"""
+Contractor Matching
+
+This module keeps a per-worker in-memory index for contractor matching.
+The index maps (service_id, zipcode) to the contractors that offer the service in that ZIP code,
+already ordered by tier and rating, so a match is a dictionary lookup instead of a three-way join.
+Radius-based coverage areas are kept in a lat/lng grid so the contractors covering a property's
+coordinates are found by checking only the areas registered in the property's grid cell.
+
+Changes to contractors, their services or their service areas are written to a
+`contractor_changes` log by triggers; each worker replays the log periodically and reloads only
+the contractors that changed. A change id is taken when its transaction writes the log, not when
+it commits, so ids do not commit in order: each replay re-reads the last few minutes of the log
+and applies every change it has not applied yet, not just the ids above the highest one seen.
+"""
+
+import os
+import math
+import time
+import logging
+import threading
+import db_pool
+from psycopg2.extras import RealDictCursor
+from catalog_versions import setup_catalog_versions, track_table, get_catalog_version
+
+logger = logging.getLogger(__name__)
+
+# Seconds between incremental refreshes of the index
+CONTRACTOR_INDEX_REFRESH_INTERVAL = int(os.environ.get('CONTRACTOR_INDEX_REFRESH_INTERVAL', 30))
+# Seconds of the change log re-read on every refresh, to pick up changes that committed after
+# changes with higher ids; a transaction open longer than this is only picked up by a rebuild
+CONTRACTOR_CHANGE_OVERLAP = int(os.environ.get('CONTRACTOR_CHANGE_OVERLAP', 300))
+# Size of a spatial grid cell in degrees (about 17 miles of latitude)
+GRID_CELL_DEGREES = float(os.environ.get('CONTRACTOR_GRID_CELL_DEGREES', 0.25))
+EARTH_RADIUS_MILES = 3958.8
+# Miles per degree of latitude on the sphere distance_miles() measures on (about 69.09)
+MILES_PER_DEGREE_LAT = math.radians(EARTH_RADIUS_MILES)
+# Largest number of items accepted by one batch match request
+MATCH_BATCH_MAX_ITEMS = int(os.environ.get('MATCH_BATCH_MAX_ITEMS', 100))
+
+# Match priority for tier levels; mirrors the ORDER BY of the SQL matcher, where
+# NULL tier levels sort first because boolean DESC puts NULLs first
+TIER_PRIORITY = {
+    None: 0,
+    'Diamond': 1,
+    'Gold': 2,
+    'Standard': 3
+}
+OTHER_TIER_PRIORITY = 4
+
+CONTRACTOR_COLUMNS = """
+    c.id, c.name, c.description, c.contact_email,
+    c.contact_phone, c.website, c.logo_url, c.rating,
+    c.tier_level
+"""
+
+SERVICE_COLUMNS = "s.id, s.name, s.description, s.base_price"
+
+# Half-widths in degrees of the box around a coverage circle; the longitude span is taken at the
+# circle's most poleward latitude, where a degree of longitude is shortest, so the box holds the
+# whole circle and not just its centre row. _coverage_spans() is the same calculation in Python.
+LAT_SPAN_SQL = f"radius_miles / {MILES_PER_DEGREE_LAT!r}"
+LNG_SPAN_SQL = (f"radius_miles / GREATEST({MILES_PER_DEGREE_LAT!r} * "
+                f"cos(radians(LEAST(abs(center_lat) + {LAT_SPAN_SQL}, 90))), 0.01)")
+COVERAGE_BOX_COLUMNS = [
+    ('min_lat', f"center_lat - {LAT_SPAN_SQL}"),
+    ('max_lat', f"center_lat + {LAT_SPAN_SQL}"),
+    ('min_lng', f"center_lng - {LNG_SPAN_SQL}"),
+    ('max_lng', f"center_lng + {LNG_SPAN_SQL}")
+]
+
+
+def setup_contractor_matching(cursor):
+    """
+    Create the contractor change log and its triggers
+
+    Parameters:
+    cursor: An open database cursor (the caller commits)
+    """
+    setup_catalog_versions(cursor)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS contractor_changes (
+            change_id BIGSERIAL PRIMARY KEY,
+            contractor_id INTEGER NOT NULL,
+            changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("""
+        CREATE OR REPLACE FUNCTION log_contractor_change() RETURNS trigger AS $$
+        BEGIN
+            IF TG_TABLE_NAME = 'contractors' THEN
+                IF TG_OP <> 'INSERT' THEN
+                    INSERT INTO contractor_changes (contractor_id) VALUES (OLD.id);
+                END IF;
+                IF TG_OP <> 'DELETE' THEN
+                    INSERT INTO contractor_changes (contractor_id) VALUES (NEW.id);
+                END IF;
+            ELSE
+                IF TG_OP <> 'INSERT' THEN
+                    INSERT INTO contractor_changes (contractor_id) VALUES (OLD.contractor_id);
+                END IF;
+                IF TG_OP <> 'DELETE' THEN
+                    INSERT INTO contractor_changes (contractor_id) VALUES (NEW.contractor_id);
+                END IF;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    # Radius-based coverage: a centroid and radius per area, with a generated bounding box
+    # so the database fallback can prefilter on indexed columns
+    box_columns = [f"{name} DOUBLE PRECISION GENERATED ALWAYS AS ({expression}) STORED"
+                   for name, expression in COVERAGE_BOX_COLUMNS]
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS contractor_coverage_areas (
+            id SERIAL PRIMARY KEY,
+            contractor_id INTEGER NOT NULL,
+            center_lat DOUBLE PRECISION NOT NULL,
+            center_lng DOUBLE PRECISION NOT NULL,
+            radius_miles DOUBLE PRECISION NOT NULL,
+            {', '.join(box_columns)}
+        )
+    """)
+    # Tables created with the first boxes (69.0/69.172 miles per degree at the centre latitude)
+    # could miss points near a circle's edge; regenerate them once, the index is recreated below
+    cursor.execute("""
+        SELECT generation_expression FROM information_schema.columns
+        WHERE table_schema = current_schema()
+        AND table_name = 'contractor_coverage_areas' AND column_name = 'min_lng'
+    """)
+    row = cursor.fetchone()
+    generation_expression = (row['generation_expression'] if isinstance(row, dict) else row[0]) if row else None
+    if generation_expression and '69.172' in generation_expression:
+        logger.info("Regenerating contractor coverage bounding boxes")
+        cursor.execute("ALTER TABLE contractor_coverage_areas " +
+                       ", ".join(f"DROP COLUMN {name}" for name, _ in COVERAGE_BOX_COLUMNS))
+        cursor.execute("ALTER TABLE contractor_coverage_areas " +
+                       ", ".join(f"ADD COLUMN {column}" for column in box_columns))
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_contractor_coverage_areas_contractor_id ON contractor_coverage_areas(contractor_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_contractor_coverage_areas_bbox ON contractor_coverage_areas(min_lat, max_lat, min_lng, max_lng)')
+    for table_name in ['contractors', 'contractor_services', 'contractor_service_areas', 'contractor_coverage_areas']:
+        trigger_name = f"trg_{table_name}_contractor_change"
+        cursor.execute("SELECT EXISTS (SELECT FROM pg_trigger WHERE tgname = %s)", (trigger_name,))
+        if not cursor.fetchone()[0]:
+            cursor.execute(f"""
+                CREATE TRIGGER {trigger_name}
+                AFTER INSERT OR UPDATE OR DELETE ON {table_name}
+                FOR EACH ROW EXECUTE FUNCTION log_contractor_change()
+            """)
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_contractor_changes_changed_at ON contractor_changes(changed_at)')
+    # Workers rebuild from scratch at startup, so old log entries are never replayed
+    cursor.execute("DELETE FROM contractor_changes WHERE changed_at < CURRENT_TIMESTAMP - INTERVAL '7 days'")
+    # Service details are small enough to reload whole when they change
+    track_table(cursor, 'services', 'services')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_contractor_service_areas_contractor_id ON contractor_service_areas(contractor_id)')
+
+
+def _sort_key(contractor):
+    """Order contractors like the SQL matcher: tier, then rating (NULLs first), then id"""
+    tier = contractor.get('tier_level')
+    tier_rank = TIER_PRIORITY.get(tier, OTHER_TIER_PRIORITY)
+    rating = contractor.get('rating')
+    rating_rank = (0, 0) if rating is None else (1, -float(rating))
+    return (tier_rank, rating_rank, contractor['id'])
+
+
+def _normalize_key(service_id, zipcode):
+    """Build the index key for a request, or None if the service_id is not numeric"""
+    try:
+        return (int(service_id), str(zipcode).strip())
+    except (TypeError, ValueError):
+        return None
+
+
+def distance_miles(lat1, lng1, lat2, lng2):
+    """Great-circle distance between two points in miles (haversine)"""
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = (math.sin((lat2 - lat1) / 2) ** 2 +
+         math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_MILES * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _grid_cell(lat, lng):
+    """Return the grid cell containing a point"""
+    return (math.floor(lat / GRID_CELL_DEGREES), math.floor(lng / GRID_CELL_DEGREES))
+
+
+def _coverage_spans(lat, radius_miles):
+    """Return the (lat, lng) half-widths in degrees of the box around a coverage circle"""
+    lat_span = radius_miles / MILES_PER_DEGREE_LAT
+    edge_lat = min(abs(lat) + lat_span, 90.0)
+    lng_span = radius_miles / max(MILES_PER_DEGREE_LAT * math.cos(math.radians(edge_lat)), 0.01)
+    return lat_span, lng_span
+
+
+def parse_coordinates(lat, lng):
+    """Return (lat, lng) as floats, or (None, None) if they are not a valid position"""
+    try:
+        lat = float(lat)
+        lng = float(lng)
+    except (TypeError, ValueError):
+        return None, None
+    # Comparisons are False for NaN, so NaN is rejected along with out-of-range values
+    if not (-90.0 <= lat <= 90.0 and -180.0 <= lng <= 180.0):
+        return None, None
+    return lat, lng
+
+
+def _covered_cells(lat, lng, radius_miles):
+    """Return every grid cell overlapping the bounding box of a coverage circle"""
+    lat_span, lng_span = _coverage_spans(lat, radius_miles)
+    min_lat, min_lng = _grid_cell(lat - lat_span, lng - lng_span)
+    max_lat, max_lng = _grid_cell(lat + lat_span, lng + lng_span)
+    return [(cell_lat, cell_lng)
+            for cell_lat in range(min_lat, max_lat + 1)
+            for cell_lng in range(min_lng, max_lng + 1)]
+
+
+class ContractorMatchIndex:
+    """In-memory (service_id, zipcode) -> ordered contractors index for one worker"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._contractors = {}
+        self._services = {}
+        self._matches = {}
+        self._keys_by_contractor = {}
+        self._service_ids = {}
+        self._grid = {}
+        self._cells_by_contractor = {}
+        self._last_change_id = 0
+        # Change ids in the overlap window that are already applied
+        self._applied_change_ids = set()
+        self._services_version = None
+        self.loaded = False
+
+    def _load_contractors(self, cursor, contractor_ids=None):
+        """Load contractor rows with their service ids, ZIP codes and coverage areas"""
+        where_sql = ""
+        params = []
+        if contractor_ids is not None:
+            where_sql = "WHERE c.id = ANY(%s)"
+            params = [list(contractor_ids)]
+        cursor.execute(f"SELECT {CONTRACTOR_COLUMNS} FROM contractors c {where_sql}", params)
+        contractors = {row['id']: dict(row) for row in cursor.fetchall()}
+
+        service_ids = {contractor_id: set() for contractor_id in contractors}
+        zipcodes = {contractor_id: set() for contractor_id in contractors}
+        if contractors:
+            cursor.execute("""
+                SELECT contractor_id, service_id FROM contractor_services
+                WHERE contractor_id = ANY(%s)
+            """, (list(contractors.keys()),))
+            for row in cursor.fetchall():
+                service_ids[row['contractor_id']].add(row['service_id'])
+            cursor.execute("""
+                SELECT contractor_id, zipcode FROM contractor_service_areas
+                WHERE contractor_id = ANY(%s)
+            """, (list(contractors.keys()),))
+            for row in cursor.fetchall():
+                if row['zipcode'] is not None:
+                    zipcodes[row['contractor_id']].add(str(row['zipcode']).strip())
+        areas = {contractor_id: [] for contractor_id in contractors}
+        if contractors:
+            cursor.execute("""
+                SELECT contractor_id, center_lat, center_lng, radius_miles
+                FROM contractor_coverage_areas
+                WHERE contractor_id = ANY(%s)
+            """, (list(contractors.keys()),))
+            for row in cursor.fetchall():
+                areas[row['contractor_id']].append(
+                    (float(row['center_lat']), float(row['center_lng']), float(row['radius_miles'])))
+        return contractors, service_ids, zipcodes, areas
+
+    def _load_services(self, cursor):
+        """Load service details keyed by id"""
+        cursor.execute(f"SELECT {SERVICE_COLUMNS} FROM services s")
+        return {row['id']: dict(row) for row in cursor.fetchall()}
+
+    def _remove_contractor(self, contractor_id):
+        """Drop a contractor from every key it was indexed under"""
+        self._contractors.pop(contractor_id, None)
+        self._service_ids.pop(contractor_id, None)
+        for cell in self._cells_by_contractor.pop(contractor_id, ()):
+            entries = [entry for entry in self._grid.get(cell, ()) if entry[0] != contractor_id]
+            if entries:
+                self._grid[cell] = entries
+            else:
+                self._grid.pop(cell, None)
+        for key in self._keys_by_contractor.pop(contractor_id, ()):
+            contractor_ids = self._matches.get(key)
+            if contractor_ids is None:
+                continue
+            if contractor_id in contractor_ids:
+                contractor_ids.remove(contractor_id)
+            if not contractor_ids:
+                del self._matches[key]
+
+    def _add_contractors(self, contractors, service_ids, zipcodes, areas):
+        """Index contractors under every (service_id, zipcode) pair and grid cell they cover"""
+        touched = set()
+        for contractor_id, contractor in contractors.items():
+            self._contractors[contractor_id] = contractor
+            self._service_ids[contractor_id] = service_ids[contractor_id]
+            cells = set()
+            for lat, lng, radius in areas[contractor_id]:
+                for cell in _covered_cells(lat, lng, radius):
+                    self._grid.setdefault(cell, []).append((contractor_id, lat, lng, radius))
+                    cells.add(cell)
+            self._cells_by_contractor[contractor_id] = cells
+            keys = {(service_id, zipcode)
+                    for service_id in service_ids[contractor_id]
+                    for zipcode in zipcodes[contractor_id]}
+            self._keys_by_contractor[contractor_id] = keys
+            for key in keys:
+                self._matches.setdefault(key, []).append(contractor_id)
+                touched.add(key)
+        for key in touched:
+            self._matches[key].sort(key=lambda cid: _sort_key(self._contractors[cid]))
+
+    def _read_changes(self, cursor, last_change_id):
+        """
+        Read the changes above last_change_id and every change logged within the overlap window
+
+        Parameters:
+        cursor: A RealDictCursor
+        last_change_id (int): The highest change id applied so far
+
+        Returns:
+        list: Rows with change_id and contractor_id
+        """
+        cursor.execute("""
+            SELECT change_id, contractor_id FROM contractor_changes
+            WHERE change_id > %s
+               OR changed_at > CURRENT_TIMESTAMP - make_interval(secs => %s)
+        """, (last_change_id, CONTRACTOR_CHANGE_OVERLAP))
+        return cursor.fetchall()
+
+    def build(self, cursor):
+        """
+        Build the whole index from the database
+
+        Parameters:
+        cursor: A RealDictCursor
+        """
+        started = time.monotonic()
+        # Read the change log first so changes made while loading are replayed later
+        cursor.execute("SELECT COALESCE(MAX(change_id), 0) as change_id FROM contractor_changes")
+        last_change_id = cursor.fetchone()['change_id']
+        changes = self._read_changes(cursor, last_change_id)
+        services_version = get_catalog_version(cursor, 'services')
+        contractors, service_ids, zipcodes, areas = self._load_contractors(cursor)
+        services = self._load_services(cursor)
+
+        with self._lock:
+            self._contractors = {}
+            self._matches = {}
+            self._keys_by_contractor = {}
+            self._service_ids = {}
+            self._grid = {}
+            self._cells_by_contractor = {}
+            self._add_contractors(contractors, service_ids, zipcodes, areas)
+            self._services = services
+            self._services_version = services_version
+            self._last_change_id = last_change_id
+            self._applied_change_ids = {row['change_id'] for row in changes}
+            self.loaded = True
+        logger.info(f"Built contractor match index: {len(contractors)} contractors, "
+                    f"{len(self._matches)} keys in {time.monotonic() - started:.2f}s")
+
+    def refresh(self, cursor):
+        """
+        Apply contractor changes logged since the last build or refresh
+
+        Parameters:
+        cursor: A RealDictCursor
+
+        Returns:
+        int: The number of contractors reloaded
+        """
+        if not self.loaded:
+            self.build(cursor)
+            return len(self._contractors)
+
+        changes = self._read_changes(cursor, self._last_change_id)
+
+        services_version = get_catalog_version(cursor, 'services')
+        if services_version != self._services_version:
+            services = self._load_services(cursor)
+            with self._lock:
+                self._services = services
+                self._services_version = services_version
+
+        new_changes = [row for row in changes if row['change_id'] not in self._applied_change_ids]
+        # Ids that fell out of the window are never read again, so only the window is remembered
+        applied_change_ids = {row['change_id'] for row in changes}
+        if not new_changes:
+            self._applied_change_ids = applied_change_ids
+            return 0
+
+        changed_ids = {row['contractor_id'] for row in new_changes}
+        contractors, service_ids, zipcodes, areas = self._load_contractors(cursor, changed_ids)
+
+        with self._lock:
+            for contractor_id in changed_ids:
+                self._remove_contractor(contractor_id)
+            self._add_contractors(contractors, service_ids, zipcodes, areas)
+            self._last_change_id = max(self._last_change_id, max(row['change_id'] for row in new_changes))
+            self._applied_change_ids = applied_change_ids
+        logger.info(f"Refreshed contractor match index for {len(changed_ids)} contractors")
+        return len(changed_ids)
+
+    def match(self, service_id, zipcode, tier=None):
+        """
+        Find the best contractor for a service in a ZIP code
+
+        Parameters:
+        service_id: The requested service
+        zipcode: The property ZIP code
+        tier (str, optional): Only consider contractors at this tier level
+
+        Returns:
+        tuple: (contractor, service) dicts, or (None, service) when nothing matches
+        """
+        key = _normalize_key(service_id, zipcode)
+        if key is None:
+            return None, None
+        with self._lock:
+            contractor = None
+            for contractor_id in self._matches.get(key, ()):
+                if tier is None or self._contractors[contractor_id].get('tier_level') == tier:
+                    contractor = dict(self._contractors[contractor_id])
+                    break
+            service = self._services.get(key[0])
+            return contractor, dict(service) if service else None
+
+    def nearby(self, service_id, lat, lng, tier=None):
+        """
+        Find every contractor offering a service whose coverage area contains a point
+
+        Parameters:
+        service_id: The requested service
+        lat (float): Property latitude
+        lng (float): Property longitude
+        tier (str, optional): Only consider contractors at this tier level
+
+        Returns:
+        list: Contractor dicts with distance_miles, ordered like zipcode matches
+        """
+        lat, lng = parse_coordinates(lat, lng)
+        try:
+            service_id = int(service_id)
+        except (TypeError, ValueError):
+            return []
+        if lat is None:
+            return []
+        with self._lock:
+            distances = {}
+            for contractor_id, area_lat, area_lng, radius in self._grid.get(_grid_cell(lat, lng), ()):
+                if service_id not in self._service_ids.get(contractor_id, ()):
+                    continue
+                if tier is not None and self._contractors[contractor_id].get('tier_level') != tier:
+                    continue
+                distance = distance_miles(lat, lng, area_lat, area_lng)
+                if distance <= radius and distance < distances.get(contractor_id, float('inf')):
+                    distances[contractor_id] = distance
+            ordered = sorted(distances, key=lambda cid: _sort_key(self._contractors[cid]))
+            results = []
+            for contractor_id in ordered:
+                contractor = dict(self._contractors[contractor_id])
+                contractor['distance_miles'] = round(distances[contractor_id], 2)
+                results.append(contractor)
+            return results
+
+    def service(self, service_id):
+        """Return the details of a service, or None"""
+        try:
+            service_id = int(service_id)
+        except (TypeError, ValueError):
+            return None
+        with self._lock:
+            service = self._services.get(service_id)
+            return dict(service) if service else None
+
+
+match_index = ContractorMatchIndex()
+
+_refresher_pid = None
+_refresher_lock = threading.Lock()
+
+
+def _refresh_loop():
+    """Replay the contractor change log periodically"""
+    while True:
+        time.sleep(CONTRACTOR_INDEX_REFRESH_INTERVAL)
+        conn = db_pool.get_connection()
+        if conn is None:
+            continue
+        try:
+            cursor = conn.cursor(cursor_factory=RealDictCursor)
+            match_index.refresh(cursor)
+            cursor.close()
+        except Exception as e:
+            logger.error(f"Error refreshing contractor match index: {str(e)}")
+        finally:
+            conn.close()
+
+
+def ensure_index_loaded(cursor):
+    """
+    Build this worker's index on first use and start its refresh thread
+
+    Parameters:
+    cursor: A RealDictCursor used for the initial build
+
+    Returns:
+    bool: True if the index is ready to serve matches
+    """
+    global _refresher_pid
+    if _refresher_pid != os.getpid():
+        with _refresher_lock:
+            if _refresher_pid != os.getpid():
+                # A forked worker must not trust an index built in its parent
+                if _refresher_pid is not None:
+                    match_index.loaded = False
+                thread = threading.Thread(target=_refresh_loop, name='contractor-index-refresh', daemon=True)
+                thread.start()
+                _refresher_pid = os.getpid()
+    if not match_index.loaded:
+        try:
+            match_index.build(cursor)
+        except Exception as e:
+            logger.error(f"Error building contractor match index: {str(e)}")
+    return match_index.loaded
+
+
+def _match_with_sql(cursor, items):
+    """Match every (service_id, zipcode, tier) item in one query when the index is unavailable"""
+    service_ids = []
+    zipcodes = []
+    tiers = []
+    for service_id, zipcode, tier in items:
+        key = _normalize_key(service_id, zipcode)
+        service_ids.append(key[0] if key else None)
+        zipcodes.append(key[1] if key else None)
+        tiers.append(tier)
+
+    cursor.execute(f"""
+        SELECT req.idx, match.*
+        FROM unnest(%s::integer[], %s::text[], %s::text[])
+             WITH ORDINALITY AS req(service_id, zipcode, tier, idx)
+        JOIN LATERAL (
+            SELECT {CONTRACTOR_COLUMNS}
+            FROM contractors c
+            JOIN contractor_services cs ON c.id = cs.contractor_id
+            JOIN contractor_service_areas csa ON c.id = csa.contractor_id
+            WHERE cs.service_id = req.service_id
+            AND csa.zipcode = req.zipcode
+            AND (req.tier IS NULL OR c.tier_level = req.tier)
+            ORDER BY
+                c.tier_level = 'Diamond' DESC,
+                c.tier_level = 'Gold' DESC,
+                c.tier_level = 'Standard' DESC,
+                c.rating DESC
+            LIMIT 1
+        ) match ON TRUE
+    """, (service_ids, zipcodes, tiers))
+    contractors = {}
+    for row in cursor.fetchall():
+        contractor = dict(row)
+        contractors[contractor.pop('idx') - 1] = contractor
+
+    services = {}
+    matched_service_ids = list({service_ids[idx] for idx in contractors})
+    if matched_service_ids:
+        cursor.execute(f"SELECT {SERVICE_COLUMNS} FROM services s WHERE s.id = ANY(%s)",
+                       (matched_service_ids,))
+        services = {row['id']: row for row in cursor.fetchall()}
+
+    results = []
+    for idx in range(len(items)):
+        contractor = contractors.get(idx)
+        if contractor is None:
+            results.append((None, None))
+        else:
+            results.append((contractor, services.get(service_ids[idx])))
+    return results
+
+
+def find_matches(cursor, items):
+    """
+    Find the best contractor for each (service_id, zipcode, tier) item
+
+    Parameters:
+    cursor: A RealDictCursor, used only if the index has to be built or is unavailable
+    items (list): (service_id, zipcode, tier) tuples; tier may be None
+
+    Returns:
+    list: (contractor, service) tuples in item order; contractor is None when there is no match
+    """
+    if not items:
+        return []
+    if ensure_index_loaded(cursor):
+        results = []
+        for service_id, zipcode, tier in items:
+            contractor, service = match_index.match(service_id, zipcode, tier)
+            results.append((contractor, service) if contractor else (None, None))
+        return results
+    return _match_with_sql(cursor, items)
+
+
+def find_match(cursor, service_id, zipcode, tier=None):
+    """
+    Find the best contractor for a service and ZIP code
+
+    Parameters:
+    cursor: A RealDictCursor, used only if the index has to be built or is unavailable
+    service_id: The requested service
+    zipcode: The property ZIP code
+    tier (str, optional): Only consider contractors at this tier level
+
+    Returns:
+    tuple: (contractor, service); contractor is None when there is no match
+    """
+    return find_matches(cursor, [(service_id, zipcode, tier)])[0]
+
+
+def _nearby_with_sql(cursor, service_id, lat, lng, tier=None):
+    """Radius match with a bounding-box prefilter when the index is unavailable"""
+    cursor.execute(f"""
+        SELECT {CONTRACTOR_COLUMNS}, MIN(area.distance_miles) as distance_miles
+        FROM (
+            SELECT a.contractor_id,
+                   2 * {EARTH_RADIUS_MILES} * asin(least(1.0, sqrt(
+                       power(sin(radians(a.center_lat - %(lat)s) / 2), 2) +
+                       cos(radians(%(lat)s)) * cos(radians(a.center_lat)) *
+                       power(sin(radians(a.center_lng - %(lng)s) / 2), 2)
+                   ))) as distance_miles,
+                   a.radius_miles
+            FROM contractor_coverage_areas a
+            WHERE a.min_lat <= %(lat)s AND a.max_lat >= %(lat)s
+            AND a.min_lng <= %(lng)s AND a.max_lng >= %(lng)s
+        ) area
+        JOIN contractors c ON c.id = area.contractor_id
+        JOIN contractor_services cs ON cs.contractor_id = c.id AND cs.service_id = %(service_id)s
+        WHERE area.distance_miles <= area.radius_miles
+        AND (%(tier)s::text IS NULL OR c.tier_level = %(tier)s::text)
+        GROUP BY c.id
+        ORDER BY
+            c.tier_level = 'Diamond' DESC,
+            c.tier_level = 'Gold' DESC,
+            c.tier_level = 'Standard' DESC,
+            c.rating DESC
+    """, {'lat': lat, 'lng': lng, 'service_id': service_id, 'tier': tier})
+    contractors = []
+    for row in cursor.fetchall():
+        contractor = dict(row)
+        contractor['distance_miles'] = round(float(contractor['distance_miles']), 2)
+        contractors.append(contractor)
+    return contractors
+
+
+def find_nearby(cursor, service_id, lat, lng, tier=None):
+    """
+    Find every contractor offering a service whose coverage area contains the coordinates
+
+    Parameters:
+    cursor: A RealDictCursor, used only if the index has to be built or is unavailable
+    service_id: The requested service
+    lat (float): Property latitude
+    lng (float): Property longitude
+    tier (str, optional): Only consider contractors at this tier level
+
+    Returns:
+    list: Contractor dicts with distance_miles, best match first; empty for invalid input
+    """
+    lat, lng = parse_coordinates(lat, lng)
+    try:
+        service_id = int(service_id)
+    except (TypeError, ValueError):
+        return []
+    if lat is None:
+        return []
+    if ensure_index_loaded(cursor):
+        return match_index.nearby(service_id, lat, lng, tier)
+    return _nearby_with_sql(cursor, service_id, lat, lng, tier)
+
+
+def find_service(cursor, service_id):
+    """Get the details of a service from the index, or from the database as a fallback"""
+    if match_index.loaded:
+        return match_index.service(service_id)
+    cursor.execute(f"SELECT {SERVICE_COLUMNS} FROM services s WHERE s.id = %s", (service_id,))
+    return cursor.fetchone()
@@ -0,0 +1,356 @@
+"""
+Database Connection Pool
+
+This module keeps one shared PostgreSQL connection pool per process (one per gunicorn worker).
+Both the Flask routes and the property data service check connections out of it instead of
+opening a new SSL connection for every request.
+
+Inside a Flask request, get_connection() hands out one connection per request which is returned
+to the pool at teardown. Outside a request (background jobs, CLI scripts) each call checks out
+its own connection which goes back to the pool when close() is called; checkout_connection() does
+the same inside a request, for work that must not share the request's transaction.
+
+The request's connection runs in autocommit, as the application's connections always have: one
+request shares it across many routes and helpers, and a failed statement in one of them must not
+leave it in an aborted transaction for the rest. Writes that must be atomic run inside
+transaction(). Other connections are handed out in psycopg2's default transaction mode, so callers
+commit their own writes; whatever a borrower leaves uncommitted is rolled back when the connection
+is returned.
+"""
+
+import os
+import time
+import logging
+import threading
+import contextlib
+from psycopg2 import pool
+
+logger = logging.getLogger(__name__)
+
+# Pool sizing, overridable per deployment
+DB_POOL_MIN_SIZE = int(os.environ.get('DB_POOL_MIN_SIZE', 1))
+DB_POOL_MAX_SIZE = int(os.environ.get('DB_POOL_MAX_SIZE', 10))
+# Seconds to wait for a free connection before giving up
+DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 5))
+
+_connect_kwargs = {}
+_pool = None
+_pool_pid = None
+_pool_slots = None
+_pool_lock = threading.Lock()
+
+_stats_lock = threading.Lock()
+_stats = {
+    'checkouts': 0,
+    'timeouts': 0,
+    'invalidated': 0,
+    'in_use': 0,
+    'total_wait_ms': 0.0,
+    'max_wait_ms': 0.0
+}
+
+
+def configure(dsn=None, **connect_kwargs):
+    """
+    Set the connection parameters used by the pool
+
+    Parameters:
+    dsn (str, optional): A libpq connection string or URL
+    **connect_kwargs: Keyword parameters passed to psycopg2.connect (dbname, host, sslmode, ...)
+
+    If configure() is never called, the DATABASE_URL environment variable is used.
+    """
+    global _connect_kwargs
+    kwargs = dict(connect_kwargs)
+    if dsn:
+        kwargs['dsn'] = dsn
+    with _pool_lock:
+        _connect_kwargs = kwargs
+        _close_pool()
+
+
+def _get_connect_kwargs():
+    """Return the configured connection parameters, falling back to DATABASE_URL"""
+    if _connect_kwargs:
+        return _connect_kwargs
+    db_url = os.environ.get('DATABASE_URL')
+    if db_url:
+        return {'dsn': db_url}
+    return None
+
+
+def _close_pool():
+    """Close every connection held by the current pool (caller holds _pool_lock)"""
+    global _pool, _pool_pid, _pool_slots
+    if _pool is not None and _pool_pid == os.getpid():
+        try:
+            _pool.closeall()
+        except Exception as e:
+            logger.warning(f"Error closing connection pool: {str(e)}")
+    _pool = None
+    _pool_pid = None
+    _pool_slots = None
+
+
+def _get_pool():
+    """Return the pool for this process, creating it on first use or after a fork"""
+    global _pool, _pool_pid, _pool_slots
+    if _pool is not None and _pool_pid == os.getpid():
+        return _pool
+
+    with _pool_lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            return _pool
+
+        connect_kwargs = _get_connect_kwargs()
+        if not connect_kwargs:
+            logger.error("No database configured: call db_pool.configure() or set DATABASE_URL")
+            return None
+
+        # A pool inherited from the parent process shares its sockets, so never reuse it
+        _pool = None
+        min_size = max(0, DB_POOL_MIN_SIZE)
+        max_size = max(1, min_size, DB_POOL_MAX_SIZE)
+        try:
+            _pool = pool.ThreadedConnectionPool(min_size, max_size, **connect_kwargs)
+        except Exception as e:
+            logger.error(f"❌ Database connection error: {str(e)}")
+            return None
+        _pool_slots = threading.BoundedSemaphore(max_size)
+        _pool_pid = os.getpid()
+        with _stats_lock:
+            _stats['in_use'] = 0
+        logger.info(f"Database pool created (min={min_size}, max={max_size}, pid={_pool_pid})")
+        return _pool
+
+
+def _record_checkout(wait_ms):
+    """Update the pool wait-time metrics"""
+    with _stats_lock:
+        _stats['checkouts'] += 1
+        _stats['in_use'] += 1
+        _stats['total_wait_ms'] += wait_ms
+        if wait_ms > _stats['max_wait_ms']:
+            _stats['max_wait_ms'] = wait_ms
+
+
+def _is_usable(conn):
+    """Validate a connection before handing it out"""
+    if conn.closed:
+        return False
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1")
+        # End the transaction the check opened, so the borrower starts clean
+        conn.rollback()
+        return True
+    except Exception:
+        return False
+
+
+class PooledConnection:
+    """
+    Proxy around a pooled psycopg2 connection
+
+    close() returns the connection to the pool instead of closing the socket, so existing code
+    that opens and closes connections keeps working unchanged.
+    """
+
+    def __init__(self, conn, request_scoped=False):
+        self._conn = conn
+        self._request_scoped = request_scoped
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def __setattr__(self, name, value):
+        # Settings such as autocommit belong to the real connection
+        if name in ('_conn', '_request_scoped'):
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self._conn, name, value)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        """Return the connection to the pool (no-op for request-scoped connections)"""
+        if self._request_scoped:
+            return
+        self.release()
+
+    def release(self):
+        """Return the underlying connection to the pool"""
+        if self._conn is None:
+            return
+        conn = self._conn
+        self._conn = None
+        release_connection(conn)
+
+
+def acquire_connection(timeout=None):
+    """
+    Check a validated connection out of the pool
+
+    Parameters:
+    timeout (float, optional): Seconds to wait for a free connection, defaults to DB_POOL_TIMEOUT
+
+    Returns:
+    connection: A raw psycopg2 connection, or None if the pool is exhausted or unavailable
+    """
+    db_pool = _get_pool()
+    if db_pool is None:
+        return None
+
+    timeout = DB_POOL_TIMEOUT if timeout is None else timeout
+    started = time.monotonic()
+    if not _pool_slots.acquire(timeout=timeout):
+        with _stats_lock:
+            _stats['timeouts'] += 1
+        logger.error(f"Timed out after {timeout}s waiting for a database connection")
+        return None
+
+    try:
+        conn = db_pool.getconn()
+        # Replace connections the server has dropped since they were last used
+        while not _is_usable(conn):
+            with _stats_lock:
+                _stats['invalidated'] += 1
+            db_pool.putconn(conn, close=True)
+            conn = db_pool.getconn()
+    except Exception as e:
+        _pool_slots.release()
+        logger.error(f"❌ Database connection error: {str(e)}")
+        return None
+
+    _record_checkout((time.monotonic() - started) * 1000)
+    return conn
+
+
+def release_connection(conn):
+    """Return a raw connection to the pool"""
+    db_pool = _get_pool()
+    with _stats_lock:
+        _stats['in_use'] = max(0, _stats['in_use'] - 1)
+    try:
+        if db_pool is not None:
+            # Roll back anything left open and restore psycopg2's default transaction mode,
+            # so the next borrower starts clean whatever this one changed
+            if not conn.closed:
+                if conn.autocommit:
+                    conn.autocommit = False
+                else:
+                    conn.rollback()
+            db_pool.putconn(conn, close=bool(conn.closed))
+    except Exception as e:
+        logger.warning(f"Error returning connection to pool: {str(e)}")
+    finally:
+        if _pool_slots is not None:
+            try:
+                _pool_slots.release()
+            except ValueError:
+                pass
+
+
+def get_connection():
+    """
+    Get a pooled database connection
+
+    Inside a Flask request the same connection is returned for the whole request and released
+    at teardown. Outside a request the caller must close() the connection when done.
+
+    Returns:
+    PooledConnection: The connection proxy, or None if no connection is available
+    """
+    try:
+        from flask import g, has_request_context
+    except ImportError:
+        has_request_context = None
+
+    if has_request_context is not None and has_request_context():
+        conn = g.get('_db_conn')
+        if conn is None:
+            raw_conn = acquire_connection()
+            if raw_conn is None:
+                return None
+            raw_conn.autocommit = True
+            conn = PooledConnection(raw_conn, request_scoped=True)
+            g._db_conn = conn
+        return conn
+
+    return checkout_connection()
+
+
+def checkout_connection():
+    """
+    Check out a connection of the caller's own, even inside a Flask request
+
+    For work that commits or rolls back independently of the request's transaction. The caller
+    must close() the connection when done.
+
+    Returns:
+    PooledConnection: The connection proxy, or None if no connection is available
+    """
+    raw_conn = acquire_connection()
+    if raw_conn is None:
+        return None
+    return PooledConnection(raw_conn)
+
+
+@contextlib.contextmanager
+def transaction(conn):
+    """
+    Run a block as one transaction, also on an autocommit connection
+
+    Parameters:
+    conn: The connection (its autocommit setting is restored afterwards)
+
+    Commits when the block finishes and rolls back if it raises.
+    """
+    previous_autocommit = conn.autocommit
+    if previous_autocommit:
+        conn.autocommit = False
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        if previous_autocommit:
+            conn.autocommit = previous_autocommit
+
+
+def teardown_request_connection(exception=None):
+    """Return the request's connection to the pool at the end of the request"""
+    from flask import g
+    conn = g.pop('_db_conn', None)
+    if conn is not None:
+        conn.release()
+
+
+def init_app(app):
+    """Register the per-request connection teardown with the Flask app"""
+    app.teardown_appcontext(teardown_request_connection)
+
+
+def pool_stats():
+    """
+    Return pool usage and wait-time metrics for this process
+
+    Returns:
+    dict: Checkout counts, wait times in milliseconds and pool sizing
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+    checkouts = stats['checkouts']
+    stats['avg_wait_ms'] = round(stats['total_wait_ms'] / checkouts, 3) if checkouts else 0.0
+    stats['total_wait_ms'] = round(stats['total_wait_ms'], 3)
+    stats['max_wait_ms'] = round(stats['max_wait_ms'], 3)
+    stats['min_size'] = DB_POOL_MIN_SIZE
+    stats['max_size'] = DB_POOL_MAX_SIZE
+    stats['pid'] = os.getpid()
+    return stats
@@ -0,0 +1,190 @@
+"""
+Energy Scoring
+
+This module scores many properties at once with NumPy. It applies the same rules as
+calculate_energy_score(), calculate_climate_score(), calculate_solar_exposure(),
+calculate_weather_resilience() and calculate_zip_climate_score() in property_data_service.py,
+but to whole columns instead of one property dict at a time, so rescoring the portfolio is a
+handful of array operations. scripts/check_energy_score_parity.py checks that both give
+identical scores; any change to the scoring rules must be made in both places. Both read
+region membership from the geo factor grid (geo_factors.py) and ZIP scores from the ZIP
+climate table (zip_climate.py).
+
+Missing numbers are NaN and missing strings are empty strings; columns_from_properties() builds
+the columns from property dicts the way the scalar functions read them.
+"""
+
+import numpy as np
+import geo_factors
+import zip_climate
+
+# Year the property age is measured from (matches calculate_energy_score)
+SCORING_YEAR = 2025
+
+
+
+def _numbers(values, size=None):
+    """Return a column as float64, with None as NaN"""
+    if values is None:
+        return np.full(size, np.nan)
+    if isinstance(values, np.ndarray) and values.dtype.kind in 'fiu':
+        return values.astype(np.float64, copy=False)
+    return np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+
+
+def _strings(values, size=None):
+    """Return a column as a string array, with None as ''"""
+    if values is None:
+        return np.full(size, '', dtype='U1')
+    if isinstance(values, np.ndarray) and values.dtype.kind == 'U':
+        return values
+    return np.array(['' if value is None else str(value) for value in values], dtype=str)
+
+
+def age_scores(year_built):
+    """Score adjustment for the property age; 0 where year_built is NaN"""
+    age = SCORING_YEAR - np.trunc(year_built)
+    return np.select(
+        [np.isnan(age), age < 5, age < 15, age < 30, age < 50, age < 70, age < 100],
+        [0, 30, 25, 15, 5, -5, -10],
+        -15
+    ).astype(np.int64)
+
+
+def size_scores(square_feet):
+    """Score adjustment for the floor area; 0 where square_feet is NaN"""
+    sqft = np.trunc(square_feet)
+    return np.select(
+        [np.isnan(sqft), sqft < 1000, sqft < 2000, sqft < 3000, sqft < 4000],
+        [0, 10, 5, 0, -5],
+        -10
+    ).astype(np.int64)
+
+
+def _has(factors, bit):
+    """Element-wise test of a geo factor bit"""
+    return (factors & bit) != 0
+
+
+def climate_scores(lat, lng, factors):
+    """Vectorized calculate_climate_score()"""
+    abs_lat = np.abs(lat)
+    score = np.select([abs_lat > 45, abs_lat > 35, abs_lat > 23.5], [-8, -4, 0], 5)
+    return (score + np.where(_has(factors, geo_factors.COASTAL), 3, 0)).astype(np.int64)
+
+
+def solar_scores(lat, factors, square_feet, orientation, window_sqft):
+    """Vectorized calculate_solar_exposure()"""
+    abs_lat = np.abs(lat)
+    score = np.select([abs_lat < 23.5, abs_lat < 35, abs_lat < 45], [8, 6, 3], 0)
+
+    # Cloud cover regions are checked in order; the first match applies
+    score = score + np.select([
+        _has(factors, geo_factors.PACIFIC_NORTHWEST),
+        _has(factors, geo_factors.SOUTHWEST),
+        _has(factors, geo_factors.SOUTHEAST),
+        _has(factors, geo_factors.NORTHEAST)
+    ], [-5, 5, 2, -2], 0)
+
+    orientation = np.char.lower(orientation)
+    score = score + np.select([orientation == 'south', orientation == 'north'], [5, -2], 0)
+
+    sqft = np.trunc(square_feet)
+    has_ratio = (window_sqft != 0) & (sqft != 0) & ~np.isnan(window_sqft) & ~np.isnan(sqft)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        window_ratio = np.where(has_ratio, window_sqft / np.where(has_ratio, sqft, 1), 0)
+    return (score + np.where(window_ratio > 0.15, 3, 0)).astype(np.int64)
+
+
+def weather_scores(factors, year_built):
+    """Vectorized calculate_weather_resilience()"""
+    year = np.trunc(year_built)
+    has_year = ~np.isnan(year)
+    score = np.zeros(factors.shape, dtype=np.int64)
+    score += np.where(_has(factors, geo_factors.HURRICANE_ZONE), np.where(has_year & (year > 2000), -2, -5), 0)
+    score += np.where(_has(factors, geo_factors.TORNADO_ALLEY), -4, 0)
+    score += np.where(_has(factors, geo_factors.EXTREME_COLD), np.where(has_year & (year > 2010), 1, -3), 0)
+    score += np.where(_has(factors, geo_factors.EXTREME_HEAT), np.where(has_year & (year > 2005), 0, -3), 0)
+    return score
+
+
+def zip_climate_scores(zip_code):
+    """Vectorized calculate_zip_climate_score()"""
+    return zip_climate.zip_climate_scores(zip_code).astype(np.int64)
+
+
+def score_properties(year_built, square_feet, lat, lng, zip_code=None, orientation=None, window_sqft=None):
+    """
+    Score a batch of properties
+
+    Parameters:
+    year_built (array-like): Year built, NaN or None where unknown
+    square_feet (array-like): Floor area, NaN or None where unknown
+    lat (array-like): Latitude, NaN or None where unknown
+    lng (array-like): Longitude, NaN or None where unknown
+    zip_code (array-like, optional): ZIP codes, '' or None where unknown
+    orientation (array-like, optional): Home orientation ('south', 'north', ...)
+    window_sqft (array-like, optional): Window area, NaN or None where unknown
+
+    Returns:
+    dict: int64 arrays 'energy_score', 'climate_score', 'solar_exposure',
+          'weather_resilience' and 'zip_climate_score'. Location components are 0 for rows
+          without a latitude and longitude, and the ZIP score is 0 for rows that have one,
+          matching which adjustments calculate_energy_score() applies.
+    """
+    year_built = _numbers(year_built)
+    size = len(year_built)
+    square_feet = _numbers(square_feet)
+    lat = _numbers(lat)
+    lng = _numbers(lng)
+    zip_code = _strings(zip_code, size)
+    orientation = _strings(orientation, size)
+    window_sqft = _numbers(window_sqft, size)
+
+    has_location = ~np.isnan(lat) & ~np.isnan(lng)
+    factors = geo_factors.factors_for(lat, lng)
+    climate = np.where(has_location, climate_scores(lat, lng, factors), 0)
+    solar = np.where(has_location, solar_scores(lat, factors, square_feet, orientation, window_sqft), 0)
+    weather = np.where(has_location, weather_scores(factors, year_built), 0)
+    zip_score = np.where(has_location, 0, zip_climate_scores(zip_code))
+
+    energy_score = 50 + age_scores(year_built) + size_scores(square_feet) + climate + solar + weather + zip_score
+    return {
+        'energy_score': np.clip(energy_score, 0, 100),
+        'climate_score': climate,
+        'solar_exposure': solar,
+        'weather_resilience': weather,
+        'zip_climate_score': zip_score
+    }
+
+
+def columns_from_properties(properties):
+    """
+    Build score_properties() columns from property dicts
+
+    Parameters:
+    properties (list): Dicts with the keys calculate_energy_score() reads (year_built,
+                       square_feet, latitude, longitude, zip_code, orientation, window_sqft)
+
+    Returns:
+    dict: Keyword arguments for score_properties()
+    """
+    def number(value):
+        # The scalar functions skip falsy values and strip thousands separators
+        return float(str(value).replace(',', '')) if value else None
+
+    def location(prop, key):
+        # Both coordinates are needed; 0 is a valid coordinate
+        if prop.get('latitude') is None or prop.get('longitude') is None:
+            return None
+        return float(prop[key])
+
+    return {
+        'year_built': [number(prop.get('year_built')) for prop in properties],
+        'square_feet': [number(prop.get('square_feet')) for prop in properties],
+        'lat': [location(prop, 'latitude') for prop in properties],
+        'lng': [location(prop, 'longitude') for prop in properties],
+        'zip_code': [prop.get('zip_code') or '' for prop in properties],
+        'orientation': [prop.get('orientation') or '' for prop in properties],
+        'window_sqft': [number(prop.get('window_sqft')) for prop in properties]
+    }
@@ -0,0 +1,262 @@
+"""
+Enrichment Jobs
+
+This module is a small database-backed job queue for work that must not run inside a request,
+such as scraping property data for a new address. Jobs live in the `enrichment_jobs` table and are
+claimed with SELECT ... FOR UPDATE SKIP LOCKED, so any number of web workers (or a standalone
+scripts/run_enrichment_worker.py process) can share the queue. Pages render placeholder data
+along with the job id, and the browser polls the job's status until the enriched data is ready.
+"""
+
+import os
+import time
+import logging
+import threading
+from psycopg2.extras import RealDictCursor
+import db_pool
+
+logger = logging.getLogger(__name__)
+
+# Background worker threads per web process (0 leaves the queue to a standalone worker)
+ENRICHMENT_WORKERS = int(os.environ.get('ENRICHMENT_WORKERS', 2))
+# Seconds an idle worker waits before polling the queue again
+ENRICHMENT_POLL_INTERVAL = float(os.environ.get('ENRICHMENT_POLL_INTERVAL', 2))
+# Attempts before a job that keeps raising is marked failed
+ENRICHMENT_MAX_ATTEMPTS = int(os.environ.get('ENRICHMENT_MAX_ATTEMPTS', 3))
+# Seconds after which a running job is assumed lost (its worker died) and is claimed again
+ENRICHMENT_JOB_TIMEOUT = int(os.environ.get('ENRICHMENT_JOB_TIMEOUT', 600))
+
+JOB_STATUSES = ['queued', 'running', 'done', 'failed']
+
+# Job kind -> handler(address_id) returning True on success
+_handlers = {}
+_workers_pid = None
+_workers_lock = threading.Lock()
+_wakeup = threading.Event()
+
+
+def setup_enrichment_jobs(cursor):
+    """
+    Create the enrichment_jobs table
+
+    Parameters:
+    cursor: An open database cursor (the caller commits)
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS enrichment_jobs (
+            id SERIAL PRIMARY KEY,
+            kind VARCHAR(50) NOT NULL,
+            address_id INTEGER NOT NULL REFERENCES addresses(id) ON DELETE CASCADE,
+            status VARCHAR(20) NOT NULL DEFAULT 'queued',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            started_at TIMESTAMP,
+            finished_at TIMESTAMP
+        )
+    """)
+    # At most one active job per address and kind, so enqueueing is idempotent
+    cursor.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_enrichment_jobs_active
+        ON enrichment_jobs(kind, address_id) WHERE status IN ('queued', 'running')
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_enrichment_jobs_status ON enrichment_jobs(status, id)")
+
+
+def register_handler(kind, handler):
+    """
+    Register the function that runs jobs of a kind
+
+    Parameters:
+    kind (str): The job kind
+    handler (callable): Called with the address_id; returns True on success
+    """
+    _handlers[kind] = handler
+
+
+def enqueue(kind, address_id):
+    """
+    Queue a job, or return the job already queued or running for this address
+
+    Parameters:
+    kind (str): The job kind
+    address_id (int): The address to enrich
+
+    Returns:
+    int: The job id, or None if the job could not be queued
+
+    The job is committed on a connection of its own, never in the caller's request transaction.
+    """
+    conn = db_pool.checkout_connection()
+    if not conn:
+        return None
+
+    queued = False
+    try:
+        with conn.cursor() as cursor:
+            # Pages re-request enrichment on every view until it finishes; those calls only read
+            cursor.execute("""
+                SELECT id FROM enrichment_jobs
+                WHERE kind = %s AND address_id = %s AND status IN ('queued', 'running')
+            """, (kind, address_id))
+            row = cursor.fetchone()
+            if row is None:
+                cursor.execute("""
+                    INSERT INTO enrichment_jobs (kind, address_id)
+                    VALUES (%s, %s)
+                    ON CONFLICT (kind, address_id) WHERE status IN ('queued', 'running') DO NOTHING
+                    RETURNING id
+                """, (kind, address_id))
+                row = cursor.fetchone()
+                queued = row is not None
+                if row is None:
+                    # Another worker queued it since the read
+                    cursor.execute("""
+                        SELECT id FROM enrichment_jobs
+                        WHERE kind = %s AND address_id = %s AND status IN ('queued', 'running')
+                    """, (kind, address_id))
+                    row = cursor.fetchone()
+        if queued:
+            conn.commit()
+    except Exception as e:
+        logger.error(f"Error queueing {kind} job for address ID {address_id}: {str(e)}")
+        conn.rollback()
+        return None
+    finally:
+        conn.close()
+
+    ensure_workers_started()
+    if queued:
+        _wakeup.set()
+    return row[0] if row else None
+
+
+def get_job(job_id):
+    """
+    Get a job's status
+
+    Parameters:
+    job_id (int): The job id
+
+    Returns:
+    dict: The job, or None if it does not exist
+    """
+    ensure_workers_started()
+    conn = db_pool.checkout_connection()
+    if not conn:
+        return None
+
+    try:
+        with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+            cursor.execute("""
+                SELECT id, kind, address_id, status, attempts, error,
+                       created_at, started_at, finished_at
+                FROM enrichment_jobs
+                WHERE id = %s
+            """, (job_id,))
+            return cursor.fetchone()
+    finally:
+        conn.close()
+
+
+def _claim_job(cursor):
+    """Claim the oldest queued job (or one whose worker was lost)"""
+    cursor.execute("""
+        UPDATE enrichment_jobs
+        SET status = 'running', started_at = CURRENT_TIMESTAMP, attempts = attempts + 1
+        WHERE id = (
+            SELECT id FROM enrichment_jobs
+            WHERE status = 'queued'
+               OR (status = 'running' AND started_at < CURRENT_TIMESTAMP - %s * INTERVAL '1 second')
+            ORDER BY id
+            FOR UPDATE SKIP LOCKED
+            LIMIT 1
+        )
+        RETURNING id, kind, address_id, attempts
+    """, (ENRICHMENT_JOB_TIMEOUT,))
+    return cursor.fetchone()
+
+
+def _finish_job(job, status, error=None):
+    """Record a job's outcome"""
+    conn = db_pool.get_connection()
+    if not conn:
+        logger.error(f"Could not record the outcome of enrichment job {job['id']}")
+        return
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                UPDATE enrichment_jobs
+                SET status = %s, error = %s, finished_at = CASE WHEN %s THEN CURRENT_TIMESTAMP END
+                WHERE id = %s
+            """, (status, error, status in ('done', 'failed'), job['id']))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def run_next_job():
+    """
+    Claim and run one job
+
+    Returns:
+    bool: True if a job was run, False if the queue was empty
+    """
+    conn = db_pool.get_connection()
+    if not conn:
+        return False
+    try:
+        with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+            job = _claim_job(cursor)
+        conn.commit()
+    finally:
+        # Not held while the job runs; the handler checks out its own connections
+        conn.close()
+    if job is None:
+        return False
+
+    handler = _handlers.get(job['kind'])
+    if handler is None:
+        _finish_job(job, 'failed', f"No handler for job kind {job['kind']}")
+        return True
+
+    started = time.monotonic()
+    try:
+        succeeded = handler(job['address_id'])
+    except Exception as e:
+        logger.error(f"Enrichment job {job['id']} raised: {str(e)}")
+        retry = job['attempts'] < ENRICHMENT_MAX_ATTEMPTS
+        _finish_job(job, 'queued' if retry else 'failed', str(e))
+    else:
+        _finish_job(job, 'done' if succeeded else 'failed',
+                    None if succeeded else 'No enriched data available')
+    logger.info(f"Enrichment job {job['id']} ({job['kind']}) finished in {time.monotonic() - started:.2f}s")
+    return True
+
+
+def run_worker():
+    """Run jobs until the queue is empty, then wait for new ones"""
+    while True:
+        try:
+            if run_next_job():
+                continue
+        except Exception as e:
+            logger.error(f"Enrichment worker error: {str(e)}")
+        _wakeup.wait(ENRICHMENT_POLL_INTERVAL)
+        _wakeup.clear()
+
+
+def ensure_workers_started(worker_count=None):
+    """Start this process's worker threads if they are not running yet"""
+    global _workers_pid
+    if _workers_pid == os.getpid():
+        return
+    with _workers_lock:
+        if _workers_pid == os.getpid():
+            return
+        count = ENRICHMENT_WORKERS if worker_count is None else worker_count
+        for index in range(count):
+            thread = threading.Thread(target=run_worker, name=f'enrichment-worker-{index}', daemon=True)
+            thread.start()
+        _workers_pid = os.getpid()
+
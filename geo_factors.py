@@ -0,0 +1,291 @@
+"""
+Geographic Factors
+
+This module answers "which scoring regions contain this point" (coastal, Pacific Northwest,
+tornado alley, hurricane zone and so on) with one read from a precomputed lat/lng grid instead
+of re-evaluating every region's bounds. Each grid cell holds a bitmask of the regions covering
+it. scripts/build_geo_factor_grid.py writes the grid to a .npy file that every worker
+memory-maps, so all processes share one copy through the page cache; if the file is missing or
+was built from different regions, the grid is built in memory on first use.
+
+The grid stores region edges as well as cell interiors: along each axis even positions are the
+grid lines and odd positions the open intervals between them. A box whose edges are multiples of
+the resolution is therefore reproduced exactly, including points lying on an edge (which the
+exclusive bounds leave outside). Polygons are sampled at cell centres and lines.
+"""
+
+import os
+import json
+import math
+import hashlib
+import logging
+import threading
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Grid file written by scripts/build_geo_factor_grid.py (with a .json file of its metadata alongside)
+GEO_FACTOR_GRID_PATH = os.environ.get(
+    'GEO_FACTOR_GRID_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'geo_factor_grid.npy')
+)
+# Cell size in degrees; must be a power of two (0.5, 0.25, 0.125, ...) so lookups are exact
+GEO_FACTOR_GRID_RESOLUTION = float(os.environ.get('GEO_FACTOR_GRID_RESOLUTION', 0.25))
+
+# Region bits stored in each grid cell
+COASTAL = 1 << 0
+PACIFIC_NORTHWEST = 1 << 1
+SOUTHWEST = 1 << 2
+SOUTHEAST = 1 << 3
+NORTHEAST = 1 << 4
+HURRICANE_ZONE = 1 << 5
+TORNADO_ALLEY = 1 << 6
+EXTREME_COLD = 1 << 7
+EXTREME_HEAT = 1 << 8
+
+FACTOR_NAMES = {
+    COASTAL: 'coastal',
+    PACIFIC_NORTHWEST: 'pacific_northwest',
+    SOUTHWEST: 'southwest',
+    SOUTHEAST: 'southeast',
+    NORTHEAST: 'northeast',
+    HURRICANE_ZONE: 'hurricane_zone',
+    TORNADO_ALLEY: 'tornado_alley',
+    EXTREME_COLD: 'extreme_cold',
+    EXTREME_HEAT: 'extreme_heat'
+}
+
+# Region bit -> shapes whose union is the region. A box is (lat_min, lat_max, lng_min, lng_max)
+# with exclusive bounds and None for unbounded; a polygon is {'polygon': [(lat, lng), ...]}.
+GEO_REGIONS = {
+    COASTAL: [
+        (32, 49, -125, -115),   # US West Coast
+        (25, 47, -82, -65),     # US East Coast
+        (25, 31, -98, -80)      # Gulf Coast
+    ],
+    PACIFIC_NORTHWEST: [(42, 49, -125, -115)],  # Cloudy
+    SOUTHWEST: [(30, 42, -120, -100)],          # Sunny
+    SOUTHEAST: [(25, 36, -90, -75)],            # Mixed
+    NORTHEAST: [(37, 47, -80, -65)],            # Varied seasons
+    HURRICANE_ZONE: [(25, 40, -98, -65)],       # US East/Gulf Coast
+    TORNADO_ALLEY: [(32, 42, -105, -88)],
+    EXTREME_COLD: [(43, None, None, -90)],
+    EXTREME_HEAT: [(31, 37, -115, -105)]        # Southwest desert
+}
+
+_grid = None
+_grid_lock = threading.Lock()
+
+
+def _check_resolution(resolution):
+    """Reject resolutions that are not a power of two"""
+    mantissa, _ = math.frexp(resolution)
+    if resolution <= 0 or mantissa != 0.5:
+        raise ValueError(f"Geo factor grid resolution must be a power of two, not {resolution}")
+
+
+def regions_fingerprint(regions, resolution):
+    """Identify a region set and resolution, so a stale grid file is detected"""
+    shapes = {str(bit): [shape if isinstance(shape, dict) else list(shape) for shape in regions[bit]]
+              for bit in sorted(regions)}
+    payload = json.dumps({'resolution': resolution, 'regions': shapes}, sort_keys=True)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def _shape_bounds(shape):
+    """Return (lat_min, lat_max, lng_min, lng_max) for a shape, with None for unbounded"""
+    if isinstance(shape, dict):
+        lats = [lat for lat, _ in shape['polygon']]
+        lngs = [lng for _, lng in shape['polygon']]
+        return min(lats), max(lats), min(lngs), max(lngs)
+    return shape
+
+
+def _axis_samples(first_line, last_line, resolution):
+    """Coordinates of every grid position along an axis: lines at even, interval centres at odd positions"""
+    positions = np.arange(2 * (last_line - first_line) + 1)
+    return (first_line + positions / 2) * resolution
+
+
+def _in_polygon(lat, lng, vertices):
+    """Even-odd point-in-polygon test over arrays of points"""
+    inside = np.zeros(np.broadcast(lat, lng).shape, dtype=bool)
+    for index in range(len(vertices)):
+        lat1, lng1 = vertices[index]
+        lat2, lng2 = vertices[index - 1]
+        if lat1 == lat2:
+            continue
+        crosses = (lat1 > lat) != (lat2 > lat)
+        edge_lng = lng1 + (lat - lat1) * (lng2 - lng1) / (lat2 - lat1)
+        inside ^= crosses & (lng < edge_lng)
+    return inside
+
+
+def build_grid(regions=None, resolution=None):
+    """
+    Build the region bitmask grid
+
+    Parameters:
+    regions (dict, optional): Region bit -> shapes (GEO_REGIONS if None)
+    resolution (float, optional): Cell size in degrees (GEO_FACTOR_GRID_RESOLUTION if None)
+
+    Returns:
+    tuple: (grid, metadata) where grid is a uint16 array indexed by lat then lng position
+    """
+    regions = GEO_REGIONS if regions is None else regions
+    resolution = GEO_FACTOR_GRID_RESOLUTION if resolution is None else resolution
+    _check_resolution(resolution)
+
+    # Only the area some region reaches is stored; every point outside it has no factors
+    bounds = [_shape_bounds(shape) for shapes in regions.values() for shape in shapes]
+    lat_min = min(-90 if b[0] is None else b[0] for b in bounds)
+    lat_max = max(90 if b[1] is None else b[1] for b in bounds)
+    lng_min = min(-180 if b[2] is None else b[2] for b in bounds)
+    lng_max = max(180 if b[3] is None else b[3] for b in bounds)
+    lat_lines = (math.floor(lat_min / resolution), math.ceil(lat_max / resolution))
+    lng_lines = (math.floor(lng_min / resolution), math.ceil(lng_max / resolution))
+
+    lats = _axis_samples(*lat_lines, resolution)[:, np.newaxis]
+    lngs = _axis_samples(*lng_lines, resolution)[np.newaxis, :]
+    grid = np.zeros((lats.shape[0], lngs.shape[1]), dtype=np.uint16)
+
+    for bit, shapes in regions.items():
+        covered = np.zeros(grid.shape, dtype=bool)
+        for shape in shapes:
+            if isinstance(shape, dict):
+                covered |= _in_polygon(lats, lngs, shape['polygon'])
+                continue
+            box_lat_min, box_lat_max, box_lng_min, box_lng_max = shape
+            inside = np.ones(grid.shape, dtype=bool)
+            if box_lat_min is not None:
+                inside &= lats > box_lat_min
+            if box_lat_max is not None:
+                inside &= lats < box_lat_max
+            if box_lng_min is not None:
+                inside &= lngs > box_lng_min
+            if box_lng_max is not None:
+                inside &= lngs < box_lng_max
+            covered |= inside
+        grid[covered] |= bit
+
+    metadata = {
+        'resolution': resolution,
+        'first_lat_line': lat_lines[0],
+        'first_lng_line': lng_lines[0],
+        'fingerprint': regions_fingerprint(regions, resolution)
+    }
+    return grid, metadata
+
+
+def save_grid(grid, metadata, path=None):
+    """Write a grid and its metadata for workers to memory-map"""
+    path = path or GEO_FACTOR_GRID_PATH
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    np.save(path, grid)
+    with open(os.path.splitext(path)[0] + '.json', 'w', encoding='utf-8') as f:
+        json.dump(metadata, f, indent=2, sort_keys=True)
+
+
+class FactorGrid:
+    """A region bitmask grid and the lookups against it"""
+
+    def __init__(self, grid, metadata):
+        self.grid = grid
+        self.resolution = metadata['resolution']
+        self.first_lat_line = metadata['first_lat_line']
+        self.first_lng_line = metadata['first_lng_line']
+        self.rows, self.columns = grid.shape
+        # Single-point reads go through a flat memoryview; indexing the array itself is much slower
+        self._cells = memoryview(np.ascontiguousarray(grid).reshape(-1))
+
+    def _position(self, value, first_line, size):
+        """Grid position of a coordinate along one axis, or -1 outside the grid"""
+        q = value / self.resolution
+        line = math.floor(q)
+        position = 2 * (line - first_line) + (0 if q == line else 1)
+        return position if 0 <= position < size else -1
+
+    def factors_at(self, lat, lng):
+        """Return the region bitmask for one point"""
+        if not (math.isfinite(lat) and math.isfinite(lng)):
+            return 0
+        row = self._position(lat, self.first_lat_line, self.rows)
+        column = self._position(lng, self.first_lng_line, self.columns)
+        if row < 0 or column < 0:
+            return 0
+        return self._cells[row * self.columns + column]
+
+    def _positions(self, values, first_line, size):
+        """Grid positions of coordinate arrays along one axis, -1 outside the grid"""
+        q = values / self.resolution
+        lines = np.floor(q)
+        positions = 2 * (lines - first_line) + (q != lines)
+        valid = np.isfinite(q) & (positions >= 0) & (positions < size)
+        return np.where(valid, positions, -1).astype(np.int64)
+
+    def factors_for(self, lat, lng):
+        """Return the region bitmasks for arrays of points (0 for NaN coordinates)"""
+        lat = np.asarray(lat, dtype=np.float64)
+        lng = np.asarray(lng, dtype=np.float64)
+        with np.errstate(invalid='ignore'):
+            rows = self._positions(lat, self.first_lat_line, self.rows)
+            columns = self._positions(lng, self.first_lng_line, self.columns)
+        inside = (rows >= 0) & (columns >= 0)
+        return np.where(inside, self.grid[np.where(inside, rows, 0), np.where(inside, columns, 0)], 0).astype(np.uint16)
+
+
+def _load_grid():
+    """Memory-map the grid file, or build the grid if the file is missing or stale"""
+    fingerprint = regions_fingerprint(GEO_REGIONS, GEO_FACTOR_GRID_RESOLUTION)
+    metadata_path = os.path.splitext(GEO_FACTOR_GRID_PATH)[0] + '.json'
+    try:
+        with open(metadata_path, encoding='utf-8') as f:
+            metadata = json.load(f)
+        if metadata.get('fingerprint') == fingerprint:
+            grid = np.load(GEO_FACTOR_GRID_PATH, mmap_mode='r')
+            return FactorGrid(grid, metadata)
+        logger.warning(f"Geo factor grid {GEO_FACTOR_GRID_PATH} was built from other regions; rebuilding it in memory")
+    except FileNotFoundError:
+        logger.info(f"No geo factor grid at {GEO_FACTOR_GRID_PATH}; building it in memory "
+                    f"(run scripts/build_geo_factor_grid.py to share one copy between workers)")
+    except Exception as e:
+        logger.error(f"Error loading geo factor grid: {str(e)}")
+    return FactorGrid(*build_grid())
+
+
+def get_grid():
+    """Return this process's factor grid, loading it on first use"""
+    global _grid
+    if _grid is None:
+        with _grid_lock:
+            if _grid is None:
+                _grid = _load_grid()
+    return _grid
+
+
+def factors_at(lat, lng):
+    """
+    Get the scoring regions containing a point
+
+    Parameters:
+    lat (float): Latitude
+    lng (float): Longitude
+
+    Returns:
+    int: Bitmask of region bits (COASTAL, HURRICANE_ZONE, ...)
+    """
+    return get_grid().factors_at(lat, lng)
+
+
+def factors_for(lat, lng):
+    """
+    Get the scoring regions containing each of many points
+
+    Parameters:
+    lat (array-like): Latitudes
+    lng (array-like): Longitudes
+
+    Returns:
+    numpy.ndarray: uint16 bitmasks of region bits
+    """
+    return get_grid().factors_for(lat, lng)
@@ -13,11 +13,22 @@ import json
 import logging
 import re
 import psycopg2
+import db_pool
+import cache
 from decimal import Decimal
-from flask import Flask, jsonify, request, render_template, redirect, send_from_directory
+from flask import Flask, g, jsonify, request, render_template, redirect
 from psycopg2.extras import RealDictCursor
-from property_data_service import get_property_data_by_address, format_price
+from property_data_service import (get_property_data_by_address, format_price, setup_property_data, schedule_property_refresh,
+                                   EXTENDED_DATA_KEYS)
+import enrichment_jobs
+import static_assets
+import scraping_client
 from ai_routes import init_ai_routes
+from product_search import setup_product_search, build_search_filter
+import recommendations
+import contractor_matching
+from pagination import InvalidCursor, MAX_PAGE_SIZE, decode_cursor, get_page_size, split_page
+from conditional_get import conditional_get, setup_conditional_get, init_app as init_conditional_get
 
 # Configure logging
 logging.basicConfig(
@@ -35,47 +46,44 @@ class DecimalEncoder(json.JSONEncoder):
             return float(o)
         return super(DecimalEncoder, self).default(o)
 
-app = Flask(__name__)
+# /static/ is served by serve_static() below, from the hashed build when there is one
+app = Flask(__name__, static_folder=None)
 app.secret_key = os.environ.get('FLASK_SECRET_KEY', 
 'glassrain-dev-secret-key')
 app.json_encoder = DecimalEncoder
 
+# Connection settings come from the environment only: DATABASE_URL, or the PG* variables
+if not os.environ.get('DATABASE_URL'):
+    db_pool.configure(
+        dbname=os.environ.get('PGDATABASE'),
+        user=os.environ.get('PGUSER'),
+        password=os.environ.get('PGPASSWORD'),
+        host=os.environ.get('PGHOST'),
+        port=os.environ.get('PGPORT'),
+        sslmode=os.environ.get('PGSSLMODE', 'require')
+    )
+# Return each request's pooled connection at teardown
+db_pool.init_app(app)
+# Hashed URLs for static files
+static_assets.init_app(app)
+
 def get_db_connection():
-    """Get a connection to the PostgreSQL database"""
-    try:
-    # Try direct connection using hardcoded values first since the environment variable approach has issues
-        dbname = "glassrain"
-        user = "glass"
-        password = "lcol1JTaQSXDSddMUELubDf7of0qq4e9"
-        host = "dpg-cvsqpdc9c44c73c3vr8g-a.ohio-postgres.render.com"
-        port = "5432"
-        # Connect with keyword parameters
-        conn = psycopg2.connect(
-        dbname=dbname,
-        user=user,
-        password=password,
-        host=host,
-        port=port,
-            sslmode='require'
-        )
-            conn.autocommit = True
-        logger.info("✅ Database connection successful (using direct parameters)")
-        return conn
-    except Exception as e:
-        logger.error(f"❌ Database connection error: {str(e)}")
-        logger.error(f"Error type: {type(e).__name__}")
-        return None
+    """Get a pooled connection to the PostgreSQL database"""
+    conn = db_pool.get_connection()
+    if conn is None:
+        logger.error("❌ Database connection error: no pooled connection available")
+    return conn
 
 def setup_database():
     """Setup the database tables if they don't exist"""
     try:
         logger.info("Running database setup...")
-            conn = get_db_connection()
+        conn = get_db_connection()
         if conn is None:
             logger.error("Failed to connect to the database, cannot set up tables")
-        return
-            with conn.cursor() as cur:
-    # User accounts table
+            return
+        with conn.cursor() as cur:
+            # User accounts table
             cur.execute('''
                 CREATE TABLE IF NOT EXISTS users (
         user_id SERIAL PRIMARY KEY,
@@ -467,7 +475,7 @@ installation', '/static/img/contractors/windowexperts.png',
             cur.execute('CREATE INDEX IF NOT EXISTS idx_service_requests_status ON service_requests(status)')
         # Commit all changes
         conn.commit()
-            logger.info("Database setup complete")
+        logger.info("Database setup complete")
     except Exception as e:
         logger.error(f"Error setting up database: {str(e)}")
         # Continue with application startup even if database setup fails
@@ -475,15 +483,182 @@ installation', '/static/img/contractors/windowexperts.png',
         if 'conn' in locals() and conn is not None:
             conn.close()
 
+def setup_contractor_review_stats():
+    """Keep contractor review counts and average ratings maintained by a trigger"""
+    conn = get_db_connection()
+    if conn is None:
+        logger.error("Failed to connect to the database, cannot set up review stats")
+        return
+    
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT EXISTS (
+                    SELECT FROM pg_trigger WHERE tgname = 'trg_contractor_review_stats'
+                )
+            """)
+            trigger_exists = cur.fetchone()[0]
+            cur.execute('ALTER TABLE contractors ADD COLUMN IF NOT EXISTS review_count INTEGER DEFAULT 0')
+            cur.execute('ALTER TABLE contractors ADD COLUMN IF NOT EXISTS average_rating DECIMAL(3, 2)')
+            cur.execute('CREATE INDEX IF NOT EXISTS idx_contractor_reviews_contractor_id ON contractor_reviews(contractor_id)')
+            # Recount only the contractor whose reviews changed
+            cur.execute("""
+                CREATE OR REPLACE FUNCTION refresh_contractor_review_stats() RETURNS trigger AS $$
+                BEGIN
+                    IF TG_OP <> 'INSERT' THEN
+                        UPDATE contractors SET
+                            review_count = (SELECT COUNT(*) FROM contractor_reviews
+                                            WHERE contractor_id = OLD.contractor_id),
+                            average_rating = (SELECT ROUND(AVG(rating), 2) FROM contractor_reviews
+                                              WHERE contractor_id = OLD.contractor_id)
+                        WHERE id = OLD.contractor_id;
+                    END IF;
+                    IF TG_OP <> 'DELETE' THEN
+                        UPDATE contractors SET
+                            review_count = (SELECT COUNT(*) FROM contractor_reviews
+                                            WHERE contractor_id = NEW.contractor_id),
+                            average_rating = (SELECT ROUND(AVG(rating), 2) FROM contractor_reviews
+                                              WHERE contractor_id = NEW.contractor_id)
+                        WHERE id = NEW.contractor_id;
+                    END IF;
+                    RETURN NULL;
+                END;
+                $$ LANGUAGE plpgsql
+            """)
+            if not trigger_exists:
+                cur.execute("""
+                    CREATE TRIGGER trg_contractor_review_stats
+                    AFTER INSERT OR UPDATE OR DELETE ON contractor_reviews
+                    FOR EACH ROW EXECUTE FUNCTION refresh_contractor_review_stats()
+                """)
+                # Backfill once; the trigger keeps the aggregate current from here on
+                cur.execute("""
+                    UPDATE contractors c
+                    SET review_count = stats.review_count,
+                        average_rating = stats.average_rating
+                    FROM (
+                        SELECT c2.id, COUNT(cr.contractor_id) as review_count,
+                               ROUND(AVG(cr.rating), 2) as average_rating
+                        FROM contractors c2
+                        LEFT JOIN contractor_reviews cr ON cr.contractor_id = c2.id
+                        GROUP BY c2.id
+                    ) stats
+                    WHERE c.id = stats.id
+                """)
+        conn.commit()
+        logger.info("Contractor review stats setup complete")
+    except Exception as e:
+        logger.error(f"Error setting up contractor review stats: {str(e)}")
+    finally:
+        conn.close()
+
+def setup_search():
+    """Install the product search vectors and indexes"""
+    conn = get_db_connection()
+    if conn is None:
+        logger.error("Failed to connect to the database, cannot set up product search")
+        return
+    
+    try:
+        with conn.cursor() as cur:
+            setup_product_search(cur)
+            recommendations.setup_recommendations(cur)
+        conn.commit()
+        recommendations.refresh_recommendations(conn)
+    except Exception as e:
+        logger.error(f"Error setting up product search: {str(e)}")
+    finally:
+        conn.close()
+
+def setup_contractor_matching():
+    """Install the contractor change log used by the in-memory match index"""
+    conn = get_db_connection()
+    if conn is None:
+        logger.error("Failed to connect to the database, cannot set up contractor matching")
+        return
+    
+    try:
+        with conn.cursor() as cur:
+            contractor_matching.setup_contractor_matching(cur)
+        conn.commit()
+    except Exception as e:
+        logger.error(f"Error setting up contractor matching: {str(e)}")
+    finally:
+        conn.close()
+
+def setup_listing_indexes():
+    """Create the indexes that back keyset pagination on the listing endpoints"""
+    conn = get_db_connection()
+    if conn is None:
+        logger.error("Failed to connect to the database, cannot create listing indexes")
+        return
+    
+    try:
+        with conn.cursor() as cur:
+            cur.execute('''
+                CREATE INDEX IF NOT EXISTS idx_contractors_listing ON contractors (
+                    (COALESCE(tier_level, '')) DESC, (COALESCE(rating, 0)) DESC, id DESC
+                )
+            ''')
+            cur.execute('CREATE INDEX IF NOT EXISTS idx_store_categories_name_id ON store_categories(name, id)')
+            cur.execute('CREATE INDEX IF NOT EXISTS idx_products_category_name ON products(category_id, name)')
+        conn.commit()
+    except Exception as e:
+        logger.error(f"Error creating listing indexes: {str(e)}")
+    finally:
+        conn.close()
+
+def setup_reference_data_versions():
+    """Track versions of the reference-data tables for conditional GET"""
+    conn = get_db_connection()
+    if conn is None:
+        logger.error("Failed to connect to the database, cannot set up reference data versions")
+        return
+    
+    try:
+        with conn.cursor() as cur:
+            setup_conditional_get(cur)
+        conn.commit()
+    except Exception as e:
+        logger.error(f"Error setting up reference data versions: {str(e)}")
+    finally:
+        conn.close()
+
+def setup_property_details():
+    """Create the property details, scrape failure and enrichment job tables"""
+    conn = get_db_connection()
+    if conn is None:
+        logger.error("Failed to connect to the database, cannot set up property details")
+        return
+    
+    try:
+        with conn.cursor() as cur:
+            setup_property_data(cur)
+            enrichment_jobs.setup_enrichment_jobs(cur)
+        conn.commit()
+    except Exception as e:
+        logger.error(f"Error setting up property details: {str(e)}")
+    finally:
+        conn.close()
+
 # Initialize database
 setup_database()
+setup_contractor_review_stats()
+setup_contractor_matching()
+setup_listing_indexes()
+setup_search()
+setup_reference_data_versions()
+setup_property_details()
+# Catalog versions are loaded and polled from startup, never during a request
+init_conditional_get(app)
 
 def add_headers(response):
     """Add headers to allow iframe embedding and CORS"""
     response.headers['X-Frame-Options'] = 'ALLOWALL'
     response.headers['Access-Control-Allow-Origin'] = '*'
-    response.headers['Access-Control-Allow-Headers'] = 'Content-Type'
+    response.headers['Access-Control-Allow-Headers'] = 'Content-Type, If-None-Match'
     response.headers['Access-Control-Allow-Methods'] = 'GET, POST, OPTIONS'
+    response.headers['Access-Control-Expose-Headers'] = 'X-Next-Cursor, ETag'
     return response
 
 # Apply CORS headers to all responses
@@ -510,6 +685,9 @@ def status():
         "status": "online",
         "version": "1.0.0",
         "database": db_status,
+        "db_pool": db_pool.pool_stats(),
+        "cache": cache.cache_stats(),
+        "scraping": scraping_client.host_stats(),
         "name": "GlassRain Unified API",
         "features": [
             "service_categories",
@@ -523,6 +701,7 @@ def status():
     })
 
 @app.route('/api/service-categories')
+@conditional_get('service_categories')
 def get_service_categories():
     """Return list of service categories with custom SVG icons"""
     conn = get_db_connection()
@@ -539,25 +718,25 @@ def get_service_categories():
         categories = cursor.fetchall()
         cursor.close()
         conn.close()
-        # Map category names to our custom SVG icons
+        # Map category names to our custom SVG icons (paths under static/)
         icon_mapping = {
-            'Lawn Care': '/static/icons/lawn.svg',
-            'Cleaning': '/static/icons/cleaning.svg',
-            'Plumbing': '/static/icons/plumbing.svg',
-            'HVAC': '/static/icons/hvac.svg',
-            'Electrical': '/static/icons/electrical.svg',
-            'Roofing': '/static/icons/roofing.svg',
-            'Painting': '/static/icons/painting.svg',
-            'Pest Control': '/static/icons/pest.svg',
-            'Windows & Doors': '/static/icons/windows.svg',
-            'Home Repair': '/static/icons/home-repair.svg'
+            'Lawn Care': 'icons/lawn.svg',
+            'Cleaning': 'icons/cleaning.svg',
+            'Plumbing': 'icons/plumbing.svg',
+            'HVAC': 'icons/hvac.svg',
+            'Electrical': 'icons/electrical.svg',
+            'Roofing': 'icons/roofing.svg',
+            'Painting': 'icons/painting.svg',
+            'Pest Control': 'icons/pest.svg',
+            'Windows & Doors': 'icons/windows.svg',
+            'Home Repair': 'icons/home-repair.svg'
         }
-        # Update icon URLs to use our custom SVG icons
+        # Update icon URLs to use our custom SVG icons (their hashed URLs once built)
         for category in categories:
             category_name = category['name']
             if category_name in icon_mapping:
-                category['icon_url'] = icon_mapping[category_name]
-            return jsonify(categories)
+                category['icon_url'] = static_assets.asset_url(icon_mapping[category_name])
+        return jsonify(categories)
     except Exception as e:
         logger.error(f"Error fetching service categories: {str(e)}")
         return jsonify({"error": str(e)}), 500
@@ -565,50 +744,61 @@ def get_service_categories():
 @app.route('/api/services')
 def get_services():
     """Return list of available services with categories and subcategories"""
+    category_id = request.args.get('category_id', type=int)
+    
     conn = get_db_connection()
     if not conn:
         return jsonify({"error": "Database connection failed"}), 500
     
     try:
         cursor = conn.cursor(cursor_factory=RealDictCursor)
-        # Get all categories
-        cursor.execute("""
-            SELECT id, name, description, icon as icon_url 
-            FROM service_categories 
-            ORDER BY name
-        """)
-        categories = cursor.fetchall()
-        # For each category, get its services
-        for category in categories:
-            cursor.execute("""
-                SELECT s.id, s.name, s.description, s.base_price, 
-                       COALESCE(s.base_price_per_sqft, 0) as base_price_per_sqft,
-                       COALESCE(s.min_price, 0) as min_price,
-                       COALESCE(s.unit, '') as unit
+        # Build the whole category -> service -> option tree in one round trip
+        query = """
+            SELECT sc.id, sc.name, sc.description, sc.icon as icon_url,
+                   COALESCE(svc.services, '[]'::json) as services
+            FROM service_categories sc
+            LEFT JOIN LATERAL (
+                SELECT json_agg(json_build_object(
+                           'id', s.id,
+                           'name', s.name,
+                           'description', s.description,
+                           'base_price', s.base_price,
+                           'base_price_per_sqft', COALESCE(s.base_price_per_sqft, 0),
+                           'min_price', COALESCE(s.min_price, 0),
+                           'unit', COALESCE(s.unit, ''),
+                           'options', COALESCE(opt.options, '[]'::json)
+                       ) ORDER BY s.name) as services
                 FROM services s
-                WHERE s.category_id = %s
-                ORDER BY s.name
-            """, (category['id'],))
-            services = cursor.fetchall()
-        # For each service, get its sub-services if any
-            for service in services:
-                cursor.execute("""
-                    SELECT id, name, description, price_adjustment, is_default
-                    FROM service_options
-                    WHERE service_id = %s
-                    ORDER BY name
-                """, (service['id'],))
-                options = cursor.fetchall()
-                service['options'] = options
-                category['services'] = services
-            cursor.close()
+                LEFT JOIN LATERAL (
+                    SELECT json_agg(json_build_object(
+                               'id', o.id,
+                               'name', o.name,
+                               'description', o.description,
+                               'price_adjustment', o.price_adjustment,
+                               'is_default', o.is_default
+                           ) ORDER BY o.name) as options
+                    FROM service_options o
+                    WHERE o.service_id = s.id
+                ) opt ON TRUE
+                WHERE s.category_id = sc.id
+            ) svc ON TRUE
+        """
+        params = []
+        if category_id is not None:
+            query += " WHERE sc.id = %s"
+            params.append(category_id)
+        query += " ORDER BY sc.name"
+        cursor.execute(query, params)
+        categories = cursor.fetchall()
+        cursor.close()
         conn.close()
-            return jsonify(categories)
+        return jsonify(categories)
     except Exception as e:
         logger.error(f"Error fetching services: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
 @app.route('/api/service-tiers')
+@conditional_get('service_tiers')
 def get_service_tiers():
     """Return service tiers with their multipliers"""
     conn = get_db_connection()
@@ -625,7 +815,7 @@ def get_service_tiers():
         tiers = cursor.fetchall()
         cursor.close()
         conn.close()
-            return jsonify(tiers)
+        return jsonify(tiers)
     except Exception as e:
         logger.error(f"Error fetching service tiers: {str(e)}")
         return jsonify({"error": str(e)}), 500
@@ -635,6 +825,11 @@ def get_contractors():
     """Return contractors, optionally filtered by service type"""
     service_id = request.args.get('service_id')
     zipcode = request.args.get('zipcode')
+    page_size = get_page_size(request.args)
+    try:
+        after = decode_cursor(request.args.get('cursor'), 3)
+    except InvalidCursor as e:
+        return jsonify({"error": str(e)}), 400
     
     conn = get_db_connection()
     if not conn:
@@ -642,16 +837,17 @@ def get_contractors():
     
     try:
         cursor = conn.cursor(cursor_factory=RealDictCursor)
-            query = """
+        # review_count and average_rating are maintained by trg_contractor_review_stats
+        query = """
             SELECT c.id, c.name, c.description, c.contact_email, 
                   c.contact_phone, c.website, c.logo_url, c.rating,
-                  c.tier_level, COUNT(cr.id) as review_count
+                  c.tier_level, COALESCE(c.review_count, 0) as review_count,
+                  c.average_rating
             FROM contractors c
-            LEFT JOIN contractor_reviews cr ON c.id = cr.contractor_id
         """
-            params = []
+        params = []
         where_clauses = []
-            if service_id:
+        if service_id:
             where_clauses.append("""
                 c.id IN (
                     SELECT contractor_id FROM contractor_services 
@@ -659,7 +855,7 @@ def get_contractors():
                 )
             """)
             params.append(service_id)
-            if zipcode:
+        if zipcode:
             where_clauses.append("""
                 c.id IN (
                     SELECT contractor_id FROM contractor_service_areas 
@@ -667,28 +863,53 @@ def get_contractors():
                 )
             """)
             params.append(zipcode)
-            if where_clauses:
+        # Keyset pagination over the idx_contractors_listing expression index
+        if after:
+            where_clauses.append("(COALESCE(c.tier_level, ''), COALESCE(c.rating, 0), c.id) < (%s, %s, %s)")
+            params.extend(after)
+        if where_clauses:
             query += " WHERE " + " AND ".join(where_clauses)
-            query += " GROUP BY c.id ORDER BY c.tier_level DESC, c.rating DESC"
-            cursor.execute(query, params)
-        contractors = cursor.fetchall()
-        # Get services for each contractor
-        for contractor in contractors:
+        query += " ORDER BY COALESCE(c.tier_level, '') DESC, COALESCE(c.rating, 0) DESC, c.id DESC"
+        query += " LIMIT %s"
+        params.append(page_size + 1)
+        cursor.execute(query, params)
+        contractors, next_cursor = split_page(
+            cursor.fetchall(), page_size,
+            lambda row: (row['tier_level'] or '', float(row['rating'] or 0), row['id'])
+        )
+        # Get services for all contractors in one pass and group them in memory
+        services_by_contractor = {contractor['id']: [] for contractor in contractors}
+        if services_by_contractor:
             cursor.execute("""
-                SELECT s.id, s.name, s.description, s.base_price
-                FROM services s
-                JOIN contractor_services cs ON s.id = cs.service_id
-                WHERE cs.contractor_id = %s
-            """, (contractor['id'],))
-            services = cursor.fetchall()
-            contractor['services'] = services
-            cursor.close()
+                SELECT cs.contractor_id, s.id, s.name, s.description, s.base_price
+                FROM contractor_services cs
+                JOIN services s ON s.id = cs.service_id
+                WHERE cs.contractor_id = ANY(%s)
+            """, (list(services_by_contractor.keys()),))
+            for service in cursor.fetchall():
+                contractor_id = service.pop('contractor_id')
+                services_by_contractor[contractor_id].append(service)
+        for contractor in contractors:
+            contractor['services'] = services_by_contractor[contractor['id']]
+        cursor.close()
         conn.close()
-            return jsonify(contractors)
+        # The body stays a plain list; the next page's cursor travels in a header
+        response = jsonify(contractors)
+        if next_cursor:
+            response.headers['X-Next-Cursor'] = next_cursor
+        return response
     except Exception as e:
         logger.error(f"Error fetching contractors: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
+def get_address_coordinates(cursor, address_id):
+    """Return (lat, lng) for a saved address, or (None, None)"""
+    cursor.execute("SELECT lat, lng FROM addresses WHERE id = %s", (address_id,))
+    address = cursor.fetchone()
+    if not address or address['lat'] is None or address['lng'] is None:
+        return None, None
+    return float(address['lat']), float(address['lng'])
+
 @app.route('/api/match-contractor', methods=['POST'])
 def match_contractor():
     """Match the best contractor for a specific service and location"""
@@ -697,9 +918,18 @@ def match_contractor():
     
     service_id = request.json.get('service_id')
     zipcode = request.json.get('zipcode')
+    tier = request.json.get('tier')
+    lat = request.json.get('lat')
+    lng = request.json.get('lng')
+    address_id = request.json.get('address_id')
+    has_coordinates = (lat is not None and lng is not None) or bool(address_id)
     
-    if not service_id or not zipcode:
-        return jsonify({"error": "service_id and zipcode are required"}), 400
+    if not service_id or not (zipcode or has_coordinates):
+        return jsonify({"error": "service_id and zipcode, lat/lng or address_id are required"}), 400
+    if lat is not None and lng is not None:
+        lat, lng = contractor_matching.parse_coordinates(lat, lng)
+        if lat is None:
+            return jsonify({"error": "lat and lng must be numbers within range"}), 400
     
     conn = get_db_connection()
     if not conn:
@@ -707,39 +937,28 @@ def match_contractor():
     
     try:
         cursor = conn.cursor(cursor_factory=RealDictCursor)
-        # Find best matching contractor
-        cursor.execute("""
-            SELECT c.id, c.name, c.description, c.contact_email, 
-                  c.contact_phone, c.website, c.logo_url, c.rating,
-                  c.tier_level
-            FROM contractors c
-            JOIN contractor_services cs ON c.id = cs.contractor_id
-            JOIN contractor_service_areas csa ON c.id = csa.contractor_id
-            WHERE cs.service_id = %s
-            AND csa.zipcode = %s
-            ORDER BY 
-                c.tier_level = 'Diamond' DESC,
-                c.tier_level = 'Gold' DESC,
-                c.tier_level = 'Standard' DESC,
-                c.rating DESC
-            LIMIT 1
-        """, (service_id, zipcode))
-            contractor = cursor.fetchone()
-            if not contractor:
-        return jsonify({
+        contractor = None
+        service = None
+        # Find best matching contractor in the worker's match index
+        if zipcode:
+            contractor, service = contractor_matching.find_match(cursor, service_id, zipcode, tier)
+        # Otherwise look for a contractor whose coverage radius includes the property
+        if not contractor and has_coordinates:
+            if lat is None or lng is None:
+                lat, lng = get_address_coordinates(cursor, address_id)
+            if lat is not None and lng is not None:
+                nearby = contractor_matching.find_nearby(cursor, service_id, lat, lng, tier)
+                if nearby:
+                    contractor = nearby[0]
+                    service = contractor_matching.find_service(cursor, service_id)
+        cursor.close()
+        conn.close()
+        if not contractor:
+            return jsonify({
                 "match_found": False,
                 "message": "No matching contractor found for this service in your area"
             })
-        # Get service details
-        cursor.execute("""
-            SELECT s.id, s.name, s.description, s.base_price
-            FROM services s
-            WHERE s.id = %s
-        """, (service_id,))
-        service = cursor.fetchone()
-            cursor.close()
-        conn.close()
-            return jsonify({
+        return jsonify({
             "match_found": True,
             "contractor": contractor,
             "service": service
@@ -748,7 +967,103 @@ def match_contractor():
         logger.error(f"Error matching contractor: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/contractors/nearby', methods=['GET'])
+def get_nearby_contractors():
+    """Return every contractor whose service area covers a location"""
+    service_id = request.args.get('service_id', type=int)
+    lat = request.args.get('lat', type=float)
+    lng = request.args.get('lng', type=float)
+    address_id = request.args.get('address_id', type=int)
+    tier = request.args.get('tier')
+    
+    if not service_id or ((lat is None or lng is None) and not address_id):
+        return jsonify({"error": "service_id and lat/lng or address_id are required"}), 400
+    if lat is not None and lng is not None:
+        lat, lng = contractor_matching.parse_coordinates(lat, lng)
+        if lat is None:
+            return jsonify({"error": "lat and lng must be numbers within range"}), 400
+    
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({"error": "Database connection failed"}), 500
+    
+    try:
+        cursor = conn.cursor(cursor_factory=RealDictCursor)
+        if lat is None or lng is None:
+            lat, lng = get_address_coordinates(cursor, address_id)
+            if lat is None:
+                cursor.close()
+                return jsonify({"error": "Address has no coordinates"}), 404
+        contractors = contractor_matching.find_nearby(cursor, service_id, lat, lng, tier)
+        cursor.close()
+        conn.close()
+        return jsonify({"contractors": contractors})
+    except Exception as e:
+        logger.error(f"Error fetching nearby contractors: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/match-contractor/batch', methods=['POST'])
+def match_contractors_batch():
+    """Match the best contractor for several services and locations at once"""
+    if not request.json:
+        return jsonify({"error": "No JSON data provided"}), 400
+    
+    items = request.json.get('items')
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "items must be a non-empty list"}), 400
+    if len(items) > contractor_matching.MATCH_BATCH_MAX_ITEMS:
+        return jsonify({"error": f"At most {contractor_matching.MATCH_BATCH_MAX_ITEMS} items per batch"}), 400
+    
+    # Items may be objects or [service_id, zipcode, tier] lists
+    requested = []
+    for item in items:
+        if isinstance(item, dict):
+            requested.append((item.get('service_id'), item.get('zipcode'), item.get('tier')))
+        elif isinstance(item, (list, tuple)):
+            padded = list(item) + [None] * 3
+            requested.append((padded[0], padded[1], padded[2]))
+        else:
+            requested.append((None, None, None))
+    valid = [(service_id, zipcode, tier) for service_id, zipcode, tier in requested if service_id and zipcode]
+    
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({"error": "Database connection failed"}), 500
+    
+    try:
+        cursor = conn.cursor(cursor_factory=RealDictCursor)
+        matches = iter(contractor_matching.find_matches(cursor, valid))
+        cursor.close()
+        conn.close()
+        results = []
+        for service_id, zipcode, tier in requested:
+            result = {"service_id": service_id, "zipcode": zipcode, "tier": tier}
+            if not service_id or not zipcode:
+                result.update({
+                    "match_found": False,
+                    "error": "service_id and zipcode are required"
+                })
+            else:
+                contractor, service = next(matches)
+                if contractor:
+                    result.update({
+                        "match_found": True,
+                        "contractor": contractor,
+                        "service": service
+                    })
+                else:
+                    result.update({
+                        "match_found": False,
+                        "message": "No matching contractor found for this service in your area"
+                    })
+            results.append(result)
+        return jsonify({"results": results})
+    except Exception as e:
+        logger.error(f"Error matching contractors: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
 @app.route('/api/stores')
+@conditional_get('stores')
 def get_stores():
     """Return list of stores"""
     conn = get_db_connection()
@@ -765,12 +1080,13 @@ def get_stores():
         stores = cursor.fetchall()
         cursor.close()
         conn.close()
-            return jsonify(stores)
+        return jsonify(stores)
     except Exception as e:
         logger.error(f"Error fetching stores: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
 @app.route('/api/store-categories')
+@conditional_get('store_categories')
 def get_store_categories():
     """Return list of store product categories"""
     conn = get_db_connection()
@@ -787,7 +1103,7 @@ def get_store_categories():
         categories = cursor.fetchall()
         cursor.close()
         conn.close()
-            return jsonify(categories)
+        return jsonify(categories)
     except Exception as e:
         logger.error(f"Error fetching store categories: {str(e)}")
         return jsonify({"error": str(e)}), 500
@@ -807,89 +1123,22 @@ def get_recommended_products():
     
     try:
         cursor = conn.cursor(cursor_factory=RealDictCursor)
-        # First approach: Try direct text matching on products
-        search_query = """
-            SELECT p.id, p.name, p.description, p.price, 
-                p.is_on_sale, p.sale_price, p.image_url,
-                p.product_url, p.external_id,
-                s.id as store_id, s.name as store_name, s.logo_url as store_logo,
-                sc.name as category_name
-            FROM products p
-            JOIN stores s ON p.store_id = s.id
-            JOIN store_categories sc ON p.category_id = sc.id
-            WHERE sc.name ILIKE %s
-            OR p.name ILIKE %s
-            OR p.description ILIKE %s
-            ORDER BY p.price DESC
-            LIMIT %s
-        """
-        # Use room type as search parameter
-        search_pattern = f"%{room_type}%"
-        params = [search_pattern, search_pattern, search_pattern, limit]
-            cursor.execute(search_query, params)
-        recommended_products = cursor.fetchall()
-        # If no direct matches, use room category mapping
-        if len(recommended_products) == 0:
-            logger.info(f"No direct matches for room type {room_type}, trying category mapping")
-        # Map room types to categories that would be relevant for that room
-            room_category_map = {
-                'living': ['Furniture', 'Lighting', 'Decor', 'Entertainment'],
-                'kitchen': ['Kitchen', 'Appliances', 'Dining'],
-                'bedroom': ['Furniture', 'Bedding', 'Lighting', 'Decor'],
-                'bathroom': ['Bath', 'Fixtures', 'Storage'],
-                'office': ['Office', 'Furniture', 'Electronics'],
-                'outdoor': ['Outdoor', 'Garden', 'Patio']
-            }
-        # Get categories relevant to this room type
-            relevant_categories = room_category_map.get(room_type.lower(), ['Furniture', 'Lighting', 'Decor'])
-                placeholders = ', '.join(['%s'] * len(relevant_categories))
-            category_query = f"""
-                SELECT p.id, p.name, p.description, p.price, 
-                      p.is_on_sale, p.sale_price, p.image_url,
-                      p.product_url, p.external_id,
-                      s.id as store_id, s.name as store_name, s.logo_url as store_logo,
-                      sc.name as category_name
-                FROM products p
-                JOIN stores s ON p.store_id = s.id
-                JOIN store_categories sc ON p.category_id = sc.id
-                WHERE sc.name ILIKE ANY(%s)
-                ORDER BY p.price DESC
-                LIMIT %s
-            """
-        # Build array of patterns for ILIKE ANY
-            category_patterns = [f"%{cat}%" for cat in relevant_categories]
-            cursor.execute(category_query, [category_patterns, limit])
-            recommended_products = cursor.fetchall()
-        # If still no results, return featured products
-        if len(recommended_products) == 0:
-            logger.info(f"No category matches for room type {room_type}, falling back to featured products")
-        # Fallback to random products
-            cursor.execute("""
-                SELECT p.id, p.name, p.description, p.price, 
-                    p.is_on_sale, p.sale_price, p.image_url,
-                    p.product_url, p.external_id,
-                    s.id as store_id, s.name as store_name, s.logo_url as store_logo,
-                    sc.name as category_name
-                FROM products p
-                JOIN stores s ON p.store_id = s.id
-                JOIN store_categories sc ON p.category_id = sc.id
-                ORDER BY RANDOM()
-                LIMIT %s
-            """, [limit])
-            recommended_products = cursor.fetchall()
+        # Precomputed per room type and rebuilt when the catalog changes
+        recommendations.ensure_refresher_started()
+        recommended_products = recommendations.get_recommended_products(cursor, room_type, limit)
         # Format the products for the response
         for product in recommended_products:
-    # Format for JSON serialization
+            # Format for JSON serialization
             if product['price'] is not None:
                 product['price'] = float(product['price'])
             if product['sale_price'] is not None:
                 product['sale_price'] = float(product['sale_price'])
-        # Add formatted data
+            # Add formatted data
             product['image_url'] = product['image_url'] or '/static/img/product-placeholder.jpg'
-        # Rename store_name to a more frontend-friendly property
+            # Rename store_name to a more frontend-friendly property
             product['store'] = product['store_name']
-            return jsonify({"products": recommended_products})
-        except Exception as e:
+        return jsonify({"products": recommended_products})
+    except Exception as e:
         logger.error(f"Error retrieving recommended products: {str(e)}")
         return jsonify({"error": "Failed to retrieve recommended products"}), 500
     
@@ -904,6 +1153,11 @@ def get_products():
     category_id = request.args.get('category_id')
     search_term = request.args.get('search')
     limit = request.args.get('limit', default=20, type=int)
+    page_size = get_page_size(request.args)
+    try:
+        after = decode_cursor(request.args.get('cursor'), 2)
+    except InvalidCursor as e:
+        return jsonify({"error": str(e)}), 400
     
     conn = get_db_connection()
     if not conn:
@@ -911,50 +1165,77 @@ def get_products():
     
     try:
         cursor = conn.cursor(cursor_factory=RealDictCursor)
-        # Get all categories first
-        cursor.execute("""
-            SELECT sc.id, sc.name
-            FROM store_categories sc
-            ORDER BY sc.name
-        """)
-        categories = cursor.fetchall()
-        # For each category, get its products (with filters applied)
-        for category in categories:
-            query = """
-                SELECT p.id, p.name, p.description, p.price, 
-                      p.is_on_sale, p.sale_price, p.image_url,
+        # Product filters, shared by the category page and the ranking below
+        product_clauses = []
+        product_params = []
+        if store_id:
+            product_clauses.append("p.store_id = %s")
+            product_params.append(store_id)
+        # Searches rank by relevance, plain listings alphabetically
+        order_sql = "p.name"
+        rank_params = []
+        if search_term:
+            search_sql, search_params, rank_sql, rank_params = build_search_filter(search_term)
+            product_clauses.append(search_sql)
+            product_params.extend(search_params)
+            order_sql = f"{rank_sql} DESC, p.name"
+        # Page through categories by (name, id) so each request only ranks its own categories;
+        # only categories with a matching product count toward the page, so pages are never short
+        category_clauses = [
+            "EXISTS (SELECT 1 FROM products p WHERE " + " AND ".join(["p.category_id = sc.id"] + product_clauses) + ")"
+        ]
+        category_params = list(product_params)
+        if category_id:
+            category_clauses.append("sc.id = %s")
+            category_params.append(category_id)
+        if after:
+            category_clauses.append("(sc.name, sc.id) > (%s, %s)")
+            category_params.extend(after)
+        category_query = ("SELECT sc.id, sc.name FROM store_categories sc WHERE " + " AND ".join(category_clauses)
+                          + " ORDER BY sc.name, sc.id")
+        category_query += " LIMIT %s"
+        category_params.append(page_size + 1)
+        cursor.execute(category_query, category_params)
+        page_categories, next_cursor = split_page(
+            cursor.fetchall(), page_size, lambda row: (row['name'], row['id'])
+        )
+        # Filters are applied once, before ranking products within each category
+        where_sql = "WHERE " + " AND ".join(["p.category_id = ANY(%s)"] + product_clauses)
+        params = [[category['id'] for category in page_categories]] + product_params
+        # Top `limit` products per category in one windowed query; the inner join
+        # drops categories without matching products
+        query = f"""
+            WITH ranked AS (
+                SELECT p.category_id, p.id, p.name, p.description,
+                      p.price::float8 as price, p.is_on_sale,
+                      p.sale_price::float8 as sale_price,
+                      COALESCE(NULLIF(p.image_url, ''), '/static/img/product-placeholder.jpg') as image_url,
                       p.product_url, p.external_id,
-                      s.id as store_id, s.name as store_name, s.logo_url as store_logo
+                      s.id as store_id, s.name as store_name, s.logo_url as store_logo,
+                      ROW_NUMBER() OVER (PARTITION BY p.category_id ORDER BY {order_sql}) as rn
                 FROM products p
                 JOIN stores s ON p.store_id = s.id
-                WHERE p.category_id = %s
-            """
-                params = [category['id']]
-                if store_id:
-                query += " AND p.store_id = %s"
-                params.append(store_id)
-                if search_term:
-                query += " AND (p.name ILIKE %s OR p.description ILIKE %s)"
-                search_pattern = f"%{search_term}%"
-                params.extend([search_pattern, search_pattern])
-                query += f" ORDER BY p.name LIMIT {limit}"
-                cursor.execute(query, params)
-            products = cursor.fetchall()
-        # Format the products for the response
-            for product in products:
-    # Format for JSON serialization
-                if product['price'] is not None:
-                    product['price'] = float(product['price'])
-                if product['sale_price'] is not None:
-                    product['sale_price'] = float(product['sale_price'])
-        # Add formatted data
-                product['image_url'] = product['image_url'] or '/static/img/product-placeholder.jpg'
-                category['products'] = products
-        # Filter out categories with no products
-        categories = [cat for cat in categories if cat['products']]
-            cursor.close()
+                {where_sql}
+            )
+            SELECT sc.id, sc.name,
+                   jsonb_agg(to_jsonb(r) - 'rn' - 'category_id' ORDER BY r.rn) as products
+            FROM ranked r
+            JOIN store_categories sc ON sc.id = r.category_id
+            WHERE r.rn <= %s
+            GROUP BY sc.id, sc.name
+            ORDER BY sc.name, sc.id
+        """
+        # The rank expression appears before the WHERE clause in the SQL text
+        params = rank_params + params + [min(max(limit, 1), MAX_PAGE_SIZE)]
+        cursor.execute(query, params)
+        categories = cursor.fetchall()
+        cursor.close()
         conn.close()
-            return jsonify(categories)
+        # The body stays a plain list; the next page's cursor travels in a header
+        response = jsonify(categories)
+        if next_cursor:
+            response.headers['X-Next-Cursor'] = next_cursor
+        return response
     except Exception as e:
         logger.error(f"Error fetching products: {str(e)}")
         return jsonify({"error": str(e)}), 500
@@ -967,29 +1248,43 @@ def mapbox_token():
 
 @app.route('/api/addresses', methods=['GET'])
 def get_addresses():
-    """Return all addresses for the current user"""
+    """Return addresses for the current user, newest first, one page at a time"""
+    page_size = get_page_size(request.args)
+    try:
+        after = decode_cursor(request.args.get('cursor'), 1)
+    except InvalidCursor as e:
+        return jsonify({"error": str(e)}), 400
+    
     try:
         conn = get_db_connection()
         if not conn:
-        return jsonify({"error": "Database connection failed"}), 500
-            cur = conn.cursor(cursor_factory=RealDictCursor)
-        # Get all addresses from the database
-        cur.execute("SELECT * FROM addresses ORDER BY id DESC")
-        addresses = cur.fetchall()
+            return jsonify({"error": "Database connection failed"}), 500
+        cur = conn.cursor(cursor_factory=RealDictCursor)
+        # Keyset pagination over the primary key
+        query = "SELECT * FROM addresses"
+        params = []
+        if after:
+            query += " WHERE id < %s"
+            params.append(after[0])
+        query += " ORDER BY id DESC"
+        query += " LIMIT %s"
+        params.append(page_size + 1)
+        cur.execute(query, params)
+        addresses, next_cursor = split_page(cur.fetchall(), page_size, lambda row: (row['id'],))
         cur.close()
         conn.close()
         # Convert addresses to a list of dictionaries
         address_list = []
         for address in addresses:
             address_dict = dict(address)
-    # Ensure lat/lng are properly formatted as floats
+            # Ensure lat/lng are properly formatted as floats
             if address_dict.get('lat') is not None:
                 address_dict['lat'] = float(address_dict['lat'])
             if address_dict.get('lng') is not None:
                 address_dict['lng'] = float(address_dict['lng'])
             address_list.append(address_dict)
-            return jsonify({"addresses": address_list})
-        except Exception as e:
+        return jsonify({"addresses": address_list, "next_cursor": next_cursor})
+    except Exception as e:
         logger.error(f"Error getting addresses: {str(e)}")
         return jsonify({"error": f"Failed to get addresses: {str(e)}"}), 500
 
@@ -998,72 +1293,63 @@ def address_entry():
     """Render the address entry page"""
     return render_template('address.html')
 
-@app.route('/dashboard')
-def dashboard():
-    """Render the main dashboard page"""
-    # Get address ID from request or use the most recent one
-    address_id = request.args.get('address_id')
-    
-    if not address_id:
-        # If no address ID provided, get the most recent address
-        conn = get_db_connection()
-        if conn:
-            try:
-                cursor = conn.cursor(cursor_factory=RealDictCursor)
-                cursor.execute("SELECT id FROM addresses ORDER BY created_at DESC LIMIT 1")
-                result = cursor.fetchone()
-                if result:
-                    address_id = result['id']
-                cursor.close()
-    except Exception as e:
-                logger.error(f"Error getting recent address: {e}")
-            finally:
-                conn.close()
-    
-    # Default property data if none is found
-    property_data = {
-    'year_built': 1972,   
+# Shown until an address has property details
+DEFAULT_PAGE_PROPERTY = {
+    'year_built': 1972,
     'square_feet': 2300,
-    'bedrooms': 4,   
+    'bedrooms': 4,
     'bathrooms': 2.5,
     'estimated_value': 650000,
     'energy_score': 72,
     'energy_color': '#C29E49'  # GlassRain Gold
 }
- 
-# If we have an address ID, get property data
-if address_id:
-    property_data = {
-        'year_built': 1972,
-        'square_feet': 2300,
-        'bedrooms': 4,
-        'bathrooms': 2.5,
-        'estimated_value': 650000,
-        'energy_score': 72,
-        'energy_color': '#C29E49'  # GlassRain Gold
-    }
+
+def get_page_property_data():
+    """
+    Get the property shown on the dashboard and Control tab
+    
+    Returns:
+    dict: DEFAULT_PAGE_PROPERTY updated with the requested address's data (or the most recent
+          address's, without an address_id parameter), plus its formatted value
     
-    # If we have an address ID, get property data
-    if address_id:
-        # Get property data from our service
+    The data is loaded in one query on the request's pooled connection (never scraped here; see
+    enrichment_jobs) and memoized for the rest of the request. Callers get a copy they may modify.
+    """
+    if 'page_property_data' not in g:
+        property_data = dict(DEFAULT_PAGE_PROPERTY)
         try:
-            address_property_data = get_property_data_by_address(address_id)
+            address_property_data = get_property_data_by_address(request.args.get('address_id') or None)
             if address_property_data:
-    # Update with real data but keep defaults for missing values
+                # Update with real data but keep defaults for missing values
                 for key in property_data.keys():
                     if key in address_property_data and address_property_data[key]:
                         property_data[key] = address_property_data[key]
-        # Format the estimated value for display
+                # Format the estimated value for display
                 if 'estimated_value' in address_property_data and address_property_data['estimated_value']:
                     property_data['formatted_value'] = format_price(address_property_data['estimated_value'])
-    except Exception as e:
+                # The full address line comes with the property data
+                if address_property_data.get('full_address'):
+                    property_data['address_line'] = address_property_data['full_address']
+                # Permits, systems and utility details, where the address has them
+                for key in EXTENDED_DATA_KEYS:
+                    if address_property_data.get(key) is not None:
+                        property_data[key] = address_property_data[key]
+                # Placeholder data is shown until the enrichment job finishes
+                property_data['data_status'] = address_property_data.get('data_status')
+                property_data['enrichment_job_id'] = address_property_data.get('enrichment_job_id')
+        except Exception as e:
             logger.error(f"Error getting property data: {e}")
-    
-    # Make sure we have a formatted value
-    if 'formatted_value' not in property_data:
-        property_data['formatted_value'] = format_price(property_data['estimated_value'])
-    
-    return render_template('dashboard.html', property=property_data)
+        
+        # Make sure we have a formatted value
+        if 'formatted_value' not in property_data:
+            property_data['formatted_value'] = format_price(property_data['estimated_value'])
+        g.page_property_data = property_data
+    return dict(g.page_property_data)
+
+@app.route('/dashboard')
+def dashboard():
+    """Render the main dashboard page"""
+    return render_template('dashboard.html', property=get_page_property_data())
 
 @app.route('/elevate')
 def elevate():
@@ -1083,64 +1369,7 @@ def diy():
 @app.route('/control')
 def control():
     """Render the Control tab with detailed home information"""
-    # Get address ID from request or use the most recent one
-    address_id = request.args.get('address_id')
-    
-    if not address_id:
-        # If no address ID provided, get the most recent address
-        conn = get_db_connection()
-        if conn:
-            try:
-                cursor = conn.cursor(cursor_factory=RealDictCursor)
-                cursor.execute("SELECT id FROM addresses ORDER BY created_at DESC LIMIT 1")
-                result = cursor.fetchone()
-                if result:
-                    address_id = result['id']
-                cursor.close()
-    except Exception as e:
-                logger.error(f"Error getting recent address: {e}")
-            finally:
-                conn.close()
-    
-    # Get property data using the same logic as the dashboard
-    property_data = {
-        'year_built': 1972,
-        'square_feet': 2300,
-        'bedrooms': 4,
-        'bathrooms': 2.5,
-        'estimated_value': 650000,
-        'energy_score': 72,
-        'energy_color': '#C29E49'  # GlassRain Gold
-    }
-    
-    # If we have an address ID, get property data
-    if address_id:
-        try:
-            address_property_data = get_property_data_by_address(address_id)
-            if address_property_data:
-    # Update with real data but keep defaults for missing values
-                for key in property_data.keys():
-                    if key in address_property_data and address_property_data[key]:
-                        property_data[key] = address_property_data[key]
-        # Format the estimated value for display
-                if 'estimated_value' in address_property_data and address_property_data['estimated_value']:
-                    property_data['formatted_value'] = format_price(address_property_data['estimated_value'])
-        # Get the full address line from database
-        conn = get_db_connection()
-                if conn:
-                    try:
-                        cursor = conn.cursor(cursor_factory=RealDictCursor)
-                        cursor.execute("SELECT full_address FROM addresses WHERE id = %s", (address_id,))
-                        address_result = cursor.fetchone()
-                        if address_result:
-                            property_data['address_line'] = address_result['full_address']
-                        cursor.close()
-    except Exception as e:
-                        logger.error(f"Error getting address: {e}")
-                    finally:
-                        conn.close()
-        except Exception as e:
-            logger.error(f"Error getting property data: {e}")
+    property_data = get_page_property_data()
     
     # Add extended property data for the Control tab
     if 'recent_updates' not in property_data:
@@ -1165,10 +1394,6 @@ def control():
             {'name': 'Refrigerator', 'details': 'Samsung, model RF28R7351SR, 2022'}
         ]
     
-    # Add other fields needed for the template
-    if 'formatted_value' not in property_data:
-        property_data['formatted_value'] = format_price(property_data['estimated_value'])
-    
     return render_template('control.html', property=property_data)
 
 @app.route('/api/process-address', methods=['POST'])
@@ -1180,51 +1405,11 @@ def process_address():
     address_data = request.json
     
     # Check for the different format from updated template
-    if 'address' in address_data:  
+    if 'address' in address_data:
         # This is from the updated template which just sends the full address string
-        # We need to geocode it to get the details   
+        # We need to geocode it to get the details
         full_address = address_data['address']
-        # Get geocoding from Mapbox
-        # ... additional code for this case
-    
-    # Save address to database
-    conn = get_db_connection()
-    if not conn:
-        return jsonify({"error": "Database connection failed"}), 500
-    
-    try:
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
-        # Add address
-        cursor.execute("""
-            INSERT INTO addresses ( 
-                street, city, state, zip, country,
-                lat, lng, full_address, created_at
-            ) VALUES (
-                %s, %s, %s, %s, %s, %s, %s, %s, NOW()
-            ) RETURNING id
-        """, (
-            address_data.get('street', ''),   
-            address_data.get('city', ''),
-            address_data.get('state', ''),
-            address_data.get('zip', ''),
-            address_data.get('country', 'USA'),
-            address_data.get('lat', 0),
-            address_data.get('lng', 0),
-            address_data.get('full_address', ''),
-        ))
-        address_id = cursor.fetchone()['id']
-        conn.commit()
-        cursor.close()
-        conn.close()
-            return jsonify({
-            "success": True,  
-            "address_id": address_id,  # Changed from "id" to "address_id"
-            "message": "Address saved successfully"
-        })
-    except Exception as e:
-        logger.error(f"Error saving address: {str(e)}")
-        return jsonify({"error": str(e)}), 500
-
+        
         # Get geocoding from Mapbox
         mapbox_token = os.environ.get('MAPBOX_API_KEY')
         if not mapbox_token:
@@ -1233,25 +1418,28 @@ def process_address():
         # Geocode the address using Mapbox
         try:
             import requests
-            geocode_url = f"https://api.mapbox.com/geocoding/v5/mapbox.places/{full_address}.json?access_token={mapbox_token}&country=US&types=address"
-            response = requests.get(geocode_url)
+            from urllib.parse import quote
+            geocode_url = f"https://api.mapbox.com/geocoding/v5/mapbox.places/{quote(full_address)}.json?access_token={mapbox_token}&country=US&types=address"
+            response = requests.get(geocode_url, timeout=10)
             geocode_data = response.json()
-                if not geocode_data['features'] or len(geocode_data['features']) == 0:
-        return jsonify({"error": "Could not geocode the address"}), 400
-        # Get the first feature (most relevant match)
+            if not geocode_data.get('features'):
+                return jsonify({"error": "Could not geocode the address"}), 400
+            
+            # Get the first feature (most relevant match)
             feature = geocode_data['features'][0]
-        # Extract components from the context and place_name
+            
+            # Extract components from the context and place_name
             context = feature.get('context', [])
-            place_name_parts = feature.get('place_name', '').split(', ')
-                street = feature.get('text', '')
+            street = feature.get('text', '')
             address_number = feature.get('address', '')
             if address_number:
                 street = f"{address_number} {street}"
-                city = ""
+            city = ""
             state = ""
             country = "USA"
             postal_code = ""
-        # Extract information from context
+            
+            # Extract information from context
             for item in context:
                 if item.get('id', '').startswith('place'):
                     city = item.get('text', '')
@@ -1261,124 +1449,6 @@ def process_address():
                     country = item.get('text', '')
                 elif item.get('id', '').startswith('postcode'):
                     postal_code = item.get('text', '')
-        # Build standardized address_data
-            coordinates = feature.get('center', [0, 0])
-            address_data = {
-                'street': street,
-                'city': city,
-                'state': state,
-                'zip': postal_code,
-                'country': country,
-                'lat': coordinates[1],  # Mapbox returns [longitude, latitude]
-                'lng': coordinates[0],
-                'full_address': feature.get('place_name', full_address)
-            }
-        except Exception as e:
-            logger.error(f"Error geocoding address: {str(e)}")
-            return jsonify({"error": "Failed to process address information"}), 500
-    else:
-        # This is from the original template with individual fields
-        # Validate required fields
-        required_fields = ['street', 'city', 'state', 'zip', 'country']
-        for field in required_fields:
-            if field not in address_data or not address_data[field]:
-                return jsonify({"error": f"Missing required field: {field}"}), 400
-            
-        # Get geocoding from Mapbox
-        mapbox_token = os.environ.get('MAPBOX_API_KEY')
-        if not mapbox_token:
-            return jsonify({"error": "Mapbox API key not configured"}), 500
-            
-    # Save address to database
-    conn = get_db_connection()
-    if not conn:
-        return jsonify({"error": "Database connection failed"}), 500
-            
-    try:
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
-        # Add address
-        cursor.execute("""
-            INSERT INTO addresses (
-                street, city, state, zip, country,
-                lat, lng, full_address, created_at   
-            ) VALUES (
-                %s, %s, %s, %s, %s, %s, %s, %s, NOW()
-            ) RETURNING id
-        """, (
-            address_data['street'],
-            address_data['city'],
-            address_data['state'],
-            address_data['zip'],
-            address_data['country'],
-            address_data.get('lat', 0),
-            address_data.get('lng', 0),
-            f"{address_data['street']}, {address_data['city']}, {address_data['state']} {address_data['zip']}, {address_data['country']}",
-        ))
-            address_id = cursor.fetchone()['id']
-        # Link to user if user_id is provided
-        if 'user_id' in address_data and address_data['user_id']:
-            cursor.execute("""
-                INSERT INTO user_addresses (
-        user_id, address_id, is_primary, created_at
-                ) VALUES (   
-                    %s, %s, true, NOW()
-                )
-            """, (
-                address_data['user_id'],
-                address_id
-            ))
-            conn.commit()
-        cursor.close()
-        conn.close()
-            return jsonify({
-            "success": True,
-            "address_id": address_id,
-            "message": "Address saved successfully"
-        })
-    except Exception as e:
-        logger.error(f"Error saving address: {str(e)}")
-        return jsonify({"error": str(e)}), 500            
-        # Get geocoding from Mapbox
-        mapbox_token = os.environ.get('MAPBOX_API_KEY')
-        if not mapbox_token:
-            return jsonify({"error": "Mapbox API key not configured"}), 500
-            
-    # Save address to database
-    conn = get_db_connection()
-    if not conn:
-        return jsonify({"error": "Database connection failed"}), 500
-            
-# Save address to database
-conn = get_db_connection()
-if not conn:
-    return jsonify({"error": "Database connection failed"}), 500
-
-# This line has too much indentation - should be at the same level as the code above
-feature = geocode_data['features'][0]
-
-# Extract components from the context and place_name
-context = feature.get('context', [])
-place_name_parts = feature.get('place_name', '').split(', ')
-
-street = feature.get('text', '')
-address_number = feature.get('address', '')
-if address_number:
-    street = f"{address_number} {street}"                
-    city = ""
-    state = ""
-    country = "USA"
-    postal_code = ""
-            
-    # Extract information from context
-    for item in context:
-        if item.get('id', '').startswith('place'):
-            city = item.get('text', '')
-        elif item.get('id', '').startswith('region'):
-            state = item.get('text', '')
-        elif item.get('id', '').startswith('country'):
-            country = item.get('text', '')
-        elif item.get('id', '').startswith('postcode'):
-            postal_code = item.get('text', '')
             
             # Build standardized address_data
             coordinates = feature.get('center', [0, 0])
@@ -1390,9 +1460,9 @@ if address_number:
                 'country': country,
                 'lat': coordinates[1],  # Mapbox returns [longitude, latitude]
                 'lng': coordinates[0],
-                'full_address': feature.get('place_name', full_address)
+                'full_address': feature.get('place_name', full_address),
+                'user_id': request.json.get('user_id')
             }
-            
         except Exception as e:
             logger.error(f"Error geocoding address: {str(e)}")
             return jsonify({"error": "Failed to process address information"}), 500
@@ -1403,11 +1473,6 @@ if address_number:
         for field in required_fields:
             if field not in address_data or not address_data[field]:
                 return jsonify({"error": f"Missing required field: {field}"}), 400
-        
-        # Get geocoding from Mapbox
-        mapbox_token = os.environ.get('MAPBOX_API_KEY')
-        if not mapbox_token:
-            return jsonify({"error": "Mapbox API key not configured"}), 500
     
     # Save address to database
     conn = get_db_connection()
@@ -1415,93 +1480,92 @@ if address_number:
         return jsonify({"error": "Database connection failed"}), 500
     
     try:
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
-        # Add address
-        cursor.execute("""
-            INSERT INTO addresses (
-                street, city, state, zip, country,
-                lat, lng, full_address, created_at
-            ) VALUES (
-                %s, %s, %s, %s, %s, %s, %s, %s, NOW()
-            ) RETURNING id
-        """, (
-            address_data['street'],
-            address_data['city'],
-            address_data['state'],
-            address_data['zip'],
-            address_data['country'],
-            address_data.get('lat', 0),
-            address_data.get('lng', 0),
-            f"{address_data['street']}, {address_data['city']}, {address_data['state']} {address_data['zip']}, {address_data['country']}",
-        ))
-            address_id = cursor.fetchone()['id']
-        # Link to user if user_id is provided
-        if 'user_id' in address_data and address_data['user_id']:
+        # The address and its user link are saved together or not at all
+        with db_pool.transaction(conn):
+            cursor = conn.cursor(cursor_factory=RealDictCursor)
+            # Add address
             cursor.execute("""
-                INSERT INTO user_addresses (
-        user_id, address_id, is_primary, created_at
+                INSERT INTO addresses (
+                    street, city, state, zip, country,
+                    lat, lng, full_address, created_at
                 ) VALUES (
-                    %s, %s, true, NOW()
-                )
+                    %s, %s, %s, %s, %s, %s, %s, %s, NOW()
+                ) RETURNING id
             """, (
-                address_data['user_id'],
-                address_id
+                address_data['street'],
+                address_data['city'],
+                address_data['state'],
+                address_data['zip'],
+                address_data['country'],
+                address_data.get('lat', 0),
+                address_data.get('lng', 0),
+                address_data.get('full_address') or f"{address_data['street']}, {address_data['city']}, {address_data['state']} {address_data['zip']}, {address_data['country']}",
             ))
-            conn.commit()
+            address_id = cursor.fetchone()['id']
+            # Link to user if user_id is provided
+            if 'user_id' in address_data and address_data['user_id']:
+                cursor.execute("""
+                    INSERT INTO user_addresses (
+                        user_id, address_id, is_primary, created_at
+                    ) VALUES (
+                        %s, %s, true, NOW()
+                    )
+                """, (
+                    address_data['user_id'],
+                    address_id
+                ))
         cursor.close()
         conn.close()
-            return jsonify({
+        
+        # Scrape property data in the background; pages show placeholders until the job is done
+        enrichment_job_id = schedule_property_refresh(address_id)
+        
+        return jsonify({
             "success": True,
             "address_id": address_id,
+            "enrichment_job_id": enrichment_job_id,
             "message": "Address saved successfully"
         })
     except Exception as e:
-         logger.error(f"Error saving address: {str(e)}")
-         return jsonify({"error": str(e)}), 500
+        logger.error(f"Error saving address: {str(e)}")
+        return jsonify({"error": str(e)}), 500
 
-@app.route('/api/addresses', methods=['GET'])
-def get_all_addresses():
-    """Get saved addresses for current user"""
+@app.route('/api/enrichment-jobs/<int:job_id>')
+def get_enrichment_job(job_id):
+    """Return the status of a background enrichment job"""
     try:
-    # In a real app, we would use user authentication to get only addresses
-    # for the current user. For this demo, we'll return all addresses.
-        conn = get_db_connection()
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
-            cursor.execute("""
-            SELECT 
-                id, street, city, state, zip, country, 
-                lat, lng, full_address, created_at
-            FROM addresses
-            ORDER BY created_at DESC
-            LIMIT 5
-        """)
-            addresses = cursor.fetchall()
-        cursor.close()
-        conn.close()
-            return jsonify({"addresses": addresses})
+        job = enrichment_jobs.get_job(job_id)
     except Exception as e:
-        logger.error(f"Error retrieving addresses: {str(e)}")
+        logger.error(f"Error getting enrichment job: {str(e)}")
         return jsonify({"error": str(e)}), 500
-
+    
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+    
+    for key in ['created_at', 'started_at', 'finished_at']:
+        if job[key] is not None:
+            job[key] = job[key].isoformat()
+    job['ready'] = job['status'] == 'done'
+    return jsonify(job)
 
 @app.route('/api/verify-profile', methods=['POST'])
 def verify_profile():
     """Update email and password for user profile"""
     try:
         data = request.get_json()
-            if not data or 'email' not in data or 'password' not in data:
-        return jsonify({"error": "Email and password are required"}), 400
-            email = data['email']
+        if not data or 'email' not in data or 'password' not in data:
+            return jsonify({"error": "Email and password are required"}), 400
+        email = data['email']
         password = data['password']
         # Validate email format
         if not re.match(r"[^@]+@[^@]+\.[^@]+", email):
-        return jsonify({"error": "Invalid email format"}), 400
+            return jsonify({"error": "Invalid email format"}), 400
         # In a real app, we would hash the password before storing
-    # Here, we'll just check if it meets minimum requirements
+        # Here, we'll just check if it meets minimum requirements
         if len(password) < 6:
-        return jsonify({"error": "Password must be at least 6 characters"}), 400
+            return jsonify({"error": "Password must be at least 6 characters"}), 400
         # In a real app, we would store this in a users table
-    # For now, we'll store it in a profiles table
+        # For now, we'll store it in a profiles table
         conn = get_db_connection()
         cursor = conn.cursor()
         # Check if the profiles table exists, create if not
@@ -1509,7 +1573,7 @@ def verify_profile():
             CREATE TABLE IF NOT EXISTS profiles (
                 id SERIAL PRIMARY KEY,
                 email VARCHAR(255) UNIQUE NOT NULL,
-        password_hash VARCHAR(255) NOT NULL,
+                password_hash VARCHAR(255) NOT NULL,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
         """)
@@ -1517,31 +1581,31 @@ def verify_profile():
         # Check if this email is already registered
         cursor.execute("SELECT id FROM profiles WHERE email = %s", (email,))
         existing = cursor.fetchone()
-            if existing:
-    # Update existing profile
+        if existing:
+            # Update existing profile
             cursor.execute(
                 "UPDATE profiles SET password_hash = %s WHERE email = %s",
                 (password, email)
             )
         else:
-    # Create new profile
+            # Create new profile
             cursor.execute(
                 "INSERT INTO profiles (email, password_hash) VALUES (%s, %s)",
                 (email, password)
             )
-            conn.commit()
+        conn.commit()
         cursor.close()
         conn.close()
-            return jsonify({"success": True, "message": "Profile updated successfully"})
-        except Exception as e:
+        return jsonify({"success": True, "message": "Profile updated successfully"})
+    except Exception as e:
         logger.error(f"Error updating profile: {str(e)}")
         return jsonify({"success": False, "error": str(e)}), 500
 
 
-@app.route('/static/<path:filename>')
+@app.route('/static/<path:filename>', endpoint='static')
 def serve_static(filename):
-    """Serve static files"""
-    return send_from_directory('static', filename)
+    """Serve static files (precompressed and cached for good when the URL is hashed)"""
+    return static_assets.send_asset(filename)
 
 
 
@@ -1554,7 +1618,7 @@ def get_product(product_id):
     
     try:
         cursor = conn.cursor(cursor_factory=RealDictCursor)
-            cursor.execute("""
+        cursor.execute("""
             SELECT p.id, p.name, p.description, p.price, 
                 p.is_on_sale, p.sale_price, p.image_url,
                 p.product_url, p.external_id,
@@ -1565,9 +1629,9 @@ def get_product(product_id):
             JOIN store_categories sc ON p.category_id = sc.id
             WHERE p.id = %s
         """, [product_id])
-            product = cursor.fetchone()
-            if not product:
-        return jsonify({"error": "Product not found"}), 404
+        product = cursor.fetchone()
+        if not product:
+            return jsonify({"error": "Product not found"}), 404
         # Format the product for the response
         if product['price'] is not None:
             product['price'] = float(product['price'])
@@ -1575,8 +1639,8 @@ def get_product(product_id):
             product['sale_price'] = float(product['sale_price'])
         # Add formatted data
         product['image_url'] = product['image_url'] or '/static/img/product-placeholder.jpg'
-            return jsonify(product)
-        except Exception as e:
+        return jsonify(product)
+    except Exception as e:
         logger.error(f"Error getting product: {str(e)}")
         return jsonify({"error": f"Failed to get product: {str(e)}"}), 500
     
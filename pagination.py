@@ -0,0 +1,90 @@
+"""
+Keyset Pagination
+
+This module provides cursor-based pagination helpers for the listing endpoints.
+A cursor is an opaque, URL-safe token holding the sort key of the last row on the previous page,
+so every page is an indexed range scan (`WHERE key < last_key ORDER BY key LIMIT n`) and the cost
+of a page does not grow with the table or with how deep the client has paged.
+"""
+
+import os
+import json
+import base64
+
+DEFAULT_PAGE_SIZE = int(os.environ.get('DEFAULT_PAGE_SIZE', 50))
+MAX_PAGE_SIZE = int(os.environ.get('MAX_PAGE_SIZE', 200))
+
+
+class InvalidCursor(ValueError):
+    """Raised when a client sends a cursor this server did not issue"""
+
+
+def encode_cursor(*key_values):
+    """
+    Encode the sort key of the last row on a page as an opaque cursor
+
+    Parameters:
+    *key_values: JSON-serializable sort key values, in ORDER BY order
+
+    Returns:
+    str: A URL-safe cursor token
+    """
+    payload = json.dumps(list(key_values), separators=(',', ':'), default=str)
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token, key_length):
+    """
+    Decode a cursor produced by encode_cursor
+
+    Parameters:
+    token (str): The cursor from the request, or None for the first page
+    key_length (int): Number of sort key values the endpoint expects
+
+    Returns:
+    list: The sort key values, or None for the first page
+    """
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        key_values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+    except Exception:
+        raise InvalidCursor("Invalid cursor")
+    if not isinstance(key_values, list) or len(key_values) != key_length:
+        raise InvalidCursor("Invalid cursor")
+    return key_values
+
+
+def get_page_size(args):
+    """
+    Read page_size from the request arguments, clamped to MAX_PAGE_SIZE
+
+    Parameters:
+    args: The request's query arguments (request.args)
+
+    Returns:
+    int: The number of rows to return
+    """
+    page_size = args.get('page_size', default=DEFAULT_PAGE_SIZE, type=int)
+    if page_size is None or page_size < 1:
+        page_size = DEFAULT_PAGE_SIZE
+    return min(page_size, MAX_PAGE_SIZE)
+
+
+def split_page(rows, page_size, key_func):
+    """
+    Trim a page fetched with LIMIT page_size + 1 and build its next cursor
+
+    Parameters:
+    rows (list): Rows fetched with one extra row to detect a following page
+    page_size (int): The requested page size
+    key_func (callable): Returns the sort key values (as a tuple) for a row
+
+    Returns:
+    tuple: (rows for this page, next_cursor or None)
+    """
+    if len(rows) <= page_size:
+        return rows, None
+    rows = rows[:page_size]
+    return rows, encode_cursor(*key_func(rows[-1]))
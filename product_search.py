@@ -0,0 +1,119 @@
+"""
+Product Search
+
+This module provides indexed product search for the store endpoints.
+Each product carries a maintained `search_vector` (name, description and category name) backed by a
+GIN index, and `pg_trgm` trigram indexes catch misspellings that full-text search misses. Every
+word of a plain search also matches as a prefix ("lam" finds "lamp"), as the old '%term%' ILIKE
+did for word beginnings; fragments from the middle of a word ("amp") no longer match. Searches
+using web search syntax (quotes, -word, or) are parsed by websearch_to_tsquery instead. Matches
+are ranked by relevance instead of scanning the table with ILIKE.
+"""
+
+import re
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Text search configuration used for both the stored vectors and the queries
+SEARCH_CONFIG = 'english'
+# Shortest word matched as a prefix; a one-letter prefix would match most of the catalog
+MIN_PREFIX_LENGTH = 2
+# Quotes, a leading '-' or a standalone 'or' make a search web search syntax, not plain words
+WEBSEARCH_SYNTAX_RE = re.compile(r'"|(?:^|\s)-|(?:^|\s)or(?:\s|$)', re.IGNORECASE)
+
+
+def _trigger_exists(cursor, trigger_name):
+    """Check whether a trigger with this name is already installed"""
+    cursor.execute("SELECT EXISTS (SELECT FROM pg_trigger WHERE tgname = %s)", (trigger_name,))
+    return cursor.fetchone()[0]
+
+
+def setup_product_search(cursor):
+    """
+    Create the search column, triggers and indexes on the products table
+
+    Parameters:
+    cursor: An open database cursor (the caller commits)
+
+    Safe to run on every startup; existing rows are only backfilled once.
+    """
+    cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    cursor.execute("ALTER TABLE products ADD COLUMN IF NOT EXISTS search_vector tsvector")
+
+    # Keep the vector current whenever a product's searchable fields change
+    cursor.execute(f"""
+        CREATE OR REPLACE FUNCTION products_search_vector_update() RETURNS trigger AS $$
+        BEGIN
+            NEW.search_vector :=
+                setweight(to_tsvector('{SEARCH_CONFIG}', COALESCE(NEW.name, '')), 'A') ||
+                setweight(to_tsvector('{SEARCH_CONFIG}', COALESCE(NEW.description, '')), 'B') ||
+                setweight(to_tsvector('{SEARCH_CONFIG}', COALESCE(
+                    (SELECT name FROM store_categories WHERE id = NEW.category_id), '')), 'C');
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    if not _trigger_exists(cursor, 'trg_products_search_vector'):
+        cursor.execute("""
+            CREATE TRIGGER trg_products_search_vector
+            BEFORE INSERT OR UPDATE OF name, description, category_id ON products
+            FOR EACH ROW EXECUTE FUNCTION products_search_vector_update()
+        """)
+
+    # Renaming a category re-indexes its products
+    cursor.execute("""
+        CREATE OR REPLACE FUNCTION store_categories_search_refresh() RETURNS trigger AS $$
+        BEGIN
+            UPDATE products SET category_id = category_id WHERE category_id = NEW.id;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    if not _trigger_exists(cursor, 'trg_store_categories_search_refresh'):
+        cursor.execute("""
+            CREATE TRIGGER trg_store_categories_search_refresh
+            AFTER UPDATE OF name ON store_categories
+            FOR EACH ROW WHEN (OLD.name IS DISTINCT FROM NEW.name)
+            EXECUTE FUNCTION store_categories_search_refresh()
+        """)
+
+    # Backfill rows written before the trigger existed (checked first so an empty
+    # backfill does not count as a catalog change)
+    cursor.execute("SELECT EXISTS (SELECT FROM products WHERE search_vector IS NULL)")
+    if cursor.fetchone()[0]:
+        cursor.execute("UPDATE products SET name = name WHERE search_vector IS NULL")
+
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_products_search_vector ON products USING GIN (search_vector)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_products_name_trgm ON products USING GIN (name gin_trgm_ops)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_store_categories_name_trgm ON store_categories USING GIN (name gin_trgm_ops)")
+    logger.info("Product search setup complete")
+
+
+def build_search_filter(search_term, product_alias='p'):
+    """
+    Build the WHERE fragment and relevance expression for a product search
+
+    Parameters:
+    search_term (str): The user's search text
+    product_alias (str): Alias of the products table in the surrounding query
+
+    Returns:
+    tuple: (where_sql, where_params, rank_sql, rank_params) to splice into a query
+    """
+    p = product_alias
+    # Plain words each match the words they begin ('lam:* & tab:*'); \w+ keeps tsquery syntax out.
+    # One tsquery, not an OR with websearch_to_tsquery, which would rank every match twice.
+    words = re.findall(r'\w+', search_term.lower())
+    if words and not WEBSEARCH_SYNTAX_RE.search(search_term):
+        tsquery_sql = f"to_tsquery('{SEARCH_CONFIG}', %s)"
+        tsquery_param = ' & '.join(f"{word}:*" if len(word) >= MIN_PREFIX_LENGTH else word for word in words)
+    else:
+        tsquery_sql = f"websearch_to_tsquery('{SEARCH_CONFIG}', %s)"
+        tsquery_param = search_term
+    # '<%%' is pg_trgm's word similarity operator escaped for psycopg2: it compares the term with
+    # the closest run of words in the name, so a misspelled word still matches a long name.
+    # It is served by the same gin_trgm_ops index as plain similarity.
+    where_sql = f"({p}.search_vector @@ {tsquery_sql} OR %s <%% {p}.name)"
+    rank_sql = f"(ts_rank_cd({p}.search_vector, {tsquery_sql}) + word_similarity(%s, {p}.name))"
+    return where_sql, [tsquery_param, search_term], rank_sql, [tsquery_param, search_term]
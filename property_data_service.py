@@ -7,32 +7,97 @@ It uses a combination of direct API access (where available) and web scraping to
 
 import os
 import json
+import math
 import logging
-import requests
 from bs4 import BeautifulSoup
+from bs4.filter import ElementFilter
 import re
 import time
 from urllib.parse import quote
 import psycopg2
+import psycopg2.errors
 from psycopg2.extras import RealDictCursor
+import db_pool
+import cache
+import enrichment_jobs
+import scraping_client
+import geo_factors
+import zip_climate
+from property_sources import property_source, fetch_property_data
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Seconds a property's combined data is served from the cache
+PROPERTY_DATA_CACHE_TTL = int(os.environ.get('PROPERTY_DATA_CACHE_TTL', 300))
+
+# Seconds before stored property details are refreshed in the background
+PROPERTY_DATA_MAX_AGE = int(os.environ.get('PROPERTY_DATA_MAX_AGE', 30 * 86400))
+# Seconds to wait after a failed scrape, doubled per consecutive failure up to the maximum
+PROPERTY_SCRAPE_RETRY_BASE = int(os.environ.get('PROPERTY_SCRAPE_RETRY_BASE', 3600))
+PROPERTY_SCRAPE_RETRY_MAX = int(os.environ.get('PROPERTY_SCRAPE_RETRY_MAX', 7 * 86400))
+
+# Enrichment job kind that scrapes an address
+PROPERTY_DATA_JOB = 'property_data'
+
+# Seconds the detected extended-data schema is trusted before get_extended_property_data checks it again
+EXTENDED_SCHEMA_TTL = int(os.environ.get('EXTENDED_SCHEMA_TTL', 300))
+
+# Optional per-address lists shown on the Control tab: result key -> (table, query correlated on a.id)
+_EXTENDED_LISTS = {
+    'permits': ('property_permits', """
+        SELECT date, type, description, permit_number
+        FROM property_permits
+        WHERE address_id = a.id
+        ORDER BY date DESC
+        LIMIT 10"""),
+    'recent_updates': ('property_updates', """
+        SELECT date, description, type
+        FROM property_updates
+        WHERE address_id = a.id
+        ORDER BY date DESC
+        LIMIT 5"""),
+    'systems': ('property_systems', """
+        SELECT name, details, installation_date, expected_lifespan
+        FROM property_systems
+        WHERE address_id = a.id
+        ORDER BY name""")
+}
+# Optional utility columns of property_details shown on the Control tab
+_UTILITY_COLUMNS = ['property_type', 'lot_size', 'heating_type', 'cooling_type',
+                    'avg_electric_bill', 'avg_gas_bill', 'avg_water_bill']
+# Keys get_property_data_by_address adds for the Control tab, when the data exists
+EXTENDED_DATA_KEYS = tuple(_EXTENDED_LISTS) + tuple(_UTILITY_COLUMNS)
+# (detected at, available list keys, available utility columns), set by load_extended_schema
+_extended_schema = None
+
+# Version of the energy scoring rules; bump it whenever they change and run
+# scripts/recompute_energy_scores.py to rescore the stored properties
+# (2: ZIP climate scores come from the ZIP prefix table instead of the first digit)
+ENERGY_SCORE_VERSION = 2
+
+# Fingerprint of the stored columns an energy score is computed from (a is the addresses row).
+# Format year_built and square_feet with the column or parameter to fingerprint.
+ENERGY_SCORE_INPUTS_SQL = (
+    "md5(concat_ws('|', coalesce(({year_built})::text, ''), coalesce(({square_feet})::text, ''), "
+    "coalesce(a.lat::text, ''), coalesce(a.lng::text, ''), coalesce(a.zip::text, '')))"
+)
+
+def _property_data_cache_key(address_id):
+    """Cache key for get_property_data_by_address"""
+    return f"property_data:{str(address_id).strip()}"
+
+def _scrape_backoff_cache_key(address_id):
+    """Cache key marking an address whose last scrape failed recently"""
+    return f"property_scrape_backoff:{str(address_id).strip()}"
+
 def get_db_connection():
-    """Get a connection to the PostgreSQL database"""
-    db_url = os.environ.get('DATABASE_URL')
-    if not db_url:
-        logger.error("DATABASE_URL environment variable not set")
-        return None
-    
-    try:
-        conn = psycopg2.connect(db_url)
-        return conn
-    except Exception as e:
-        logger.error(f"Error connecting to database: {str(e)}")
-        return None
+    """Get a connection from the shared database pool"""
+    conn = db_pool.get_connection()
+    if not conn:
+        logger.error("Error connecting to database: no pooled connection available")
+    return conn
 
 def format_address_for_zillow(address):
     """Format address for Zillow search"""
@@ -42,109 +107,159 @@ def format_address_for_zillow(address):
     address = address.strip().replace(' ', '-')
     return quote(address)
 
-def scrape_zillow_property_data(address, zip_code=None):
+# Parser backend for Zillow pages; 'lxml' is faster when installed
+ZILLOW_PARSER = os.environ.get('ZILLOW_PARSER', 'html.parser')
+
+_ZESTIMATE_RE = re.compile(r'\$([0-9,]+)')
+_YEAR_BUILT_RE = re.compile(r'year built:?\s*(\d{4})', re.IGNORECASE)
+_SQFT_RE = re.compile(r'([\d,]+)\s*sq\s*ft', re.IGNORECASE)
+_BEDS_RE = re.compile(r'(\d+)\s*bed', re.IGNORECASE)
+_BATHS_RE = re.compile(r'(\d+(?:\.\d+)?)\s*bath', re.IGNORECASE)
+
+class _ZillowDataFilter(ElementFilter):
+    """Build the tree from the Zestimate chip, fact list and JSON-LD only, skipping the rest of the page"""
+
+    def allow_tag_creation(self, nsprefix, name, attrs):
+        # Only consulted for top-level tags; everything inside an allowed tag is kept
+        attrs = attrs or {}
+        if name == 'script':
+            return attrs.get('type') == 'application/ld+json'
+        if attrs.get('data-testid') == 'home-details-chip-container':
+            return True
+        classes = attrs.get('class') or ''
+        if isinstance(classes, str):
+            classes = classes.split()
+        return 'ds-home-fact-list' in classes
+
+    def allow_string_creation(self, string):
+        return False
+
+_ZILLOW_FILTER = _ZillowDataFilter()
+
+def zillow_url(address, zip_code=None):
+    """Build the Zillow search URL for an address"""
+    # Format the address for Zillow's URL structure
+    formatted_address = format_address_for_zillow(address)
+    
+    # Add ZIP code if provided
+    if zip_code:
+        search_term = f"{formatted_address}-{zip_code}"
+    else:
+        search_term = formatted_address
+    return f"https://www.zillow.com/homes/{search_term}_rb/"
+
+def parse_zillow_page(content, address, full_parse=False, parser=None):
+    """
+    Extract property data from a Zillow page
+    
+    Parameters:
+    content (bytes or str): The page HTML
+    address (str): The property address
+    full_parse (bool): Build the whole document tree instead of only the data elements
+    parser (str, optional): BeautifulSoup parser backend (ZILLOW_PARSER if None)
+    
+    Returns:
+    dict: Property data including value, year built, square footage, etc.
+    """
+    parser = parser or ZILLOW_PARSER
+    if full_parse:
+        soup = BeautifulSoup(content, parser)
+    else:
+        soup = BeautifulSoup(content, parser, parse_only=_ZILLOW_FILTER)
+    
+    # Extract the data from the page
+    property_data = {
+        'source': 'zillow',
+        'address': address
+    }
+    
+    # Look for the property value (Zestimate)
+    value_element = soup.select_one('[data-testid="home-details-chip-container"] span')
+    if value_element:
+        value_text = value_element.text.strip()
+        # Extract numeric value from formats like "$650,000"
+        value_match = _ZESTIMATE_RE.search(value_text)
+        if value_match:
+            property_data['estimated_value'] = value_match.group(1).replace(',', '')
+    
+    # Extract other property details
+    details = soup.select('.ds-home-fact-list li')
+    for detail in details:
+        text = detail.text.strip().lower()
+        
+        # Year built
+        if 'year built' in text:
+            year_match = _YEAR_BUILT_RE.search(text)
+            if year_match:
+                property_data['year_built'] = year_match.group(1)
+        
+        # Square footage
+        elif 'square feet' in text or 'sqft' in text:
+            sqft_match = _SQFT_RE.search(text)
+            if sqft_match:
+                property_data['square_feet'] = sqft_match.group(1).replace(',', '')
+        
+        # Bedrooms
+        elif 'bed' in text:
+            bed_match = _BEDS_RE.search(text)
+            if bed_match:
+                property_data['bedrooms'] = bed_match.group(1)
+        
+        # Bathrooms
+        elif 'bath' in text:
+            bath_match = _BATHS_RE.search(text)
+            if bath_match:
+                property_data['bathrooms'] = bath_match.group(1)
+    
+    # If we didn't find the data in the expected place, try to extract it from the JSON-LD script
+    if not property_data.get('estimated_value'):
+        scripts = soup.select('script[type="application/ld+json"]')
+        for script in scripts:
+            try:
+                if script.string:  # Check if string attribute exists and is not None
+                    data = json.loads(script.string)
+                    if isinstance(data, dict) and data.get('@type') == 'SingleFamilyResidence':
+                        floor_size = data.get('floorSize')
+                        if isinstance(floor_size, dict) and floor_size.get('value'):
+                            property_data['square_feet'] = floor_size.get('value')
+                        # numberOfRooms counts every room, not bedrooms, so it is not read
+                        # Add more field extractions as needed
+            except Exception as e:
+                logger.warning(f"Error parsing JSON-LD: {str(e)}")
+    
+    return property_data
+
+def scrape_zillow_property_data(address, zip_code=None, deadline=None):
     """
     Scrape property data from Zillow
     
     Parameters:
     address (str): The property address
     zip_code (str, optional): ZIP code to improve search accuracy
+    deadline (float, optional): time.monotonic() value after which no request is started
     
     Returns:
     dict: Property data including value, year built, square footage, etc.
     """
     logger.info(f"Scraping Zillow data for: {address}")
     
-    # Format the address for Zillow's URL structure
-    formatted_address = format_address_for_zillow(address)
-    
-    # Add ZIP code if provided
-    if zip_code:
-        search_term = f"{formatted_address}-{zip_code}"
-    else:
-        search_term = formatted_address
-        
-    # Zillow requires specific headers to avoid being blocked
+    # Zillow requires specific headers to avoid being blocked (the browser
+    # User-Agent and language come from the scraping client's defaults)
     headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-        'Accept-Language': 'en-US,en;q=0.9',
         'Accept-Encoding': 'gzip, deflate, br',
-        'Connection': 'keep-alive',
         'Upgrade-Insecure-Requests': '1'
     }
     
     try:
         # Attempt to search for the property on Zillow
-        url = f"https://www.zillow.com/homes/{search_term}_rb/"
-        response = requests.get(url, headers=headers, timeout=10)
+        url = zillow_url(address, zip_code)
+        response = scraping_client.get(url, headers=headers, timeout=10, deadline=deadline)
         
         if response.status_code != 200:
             logger.error(f"Failed to retrieve Zillow data: Status {response.status_code}")
             return None
         
-        # Parse the HTML content
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        # Extract the data from the page
-        property_data = {
-            'source': 'zillow',
-            'address': address
-        }
-        
-        # Look for the property value (Zestimate)
-        value_element = soup.select_one('[data-testid="home-details-chip-container"] span')
-        if value_element:
-            value_text = value_element.text.strip()
-            # Extract numeric value from formats like "$650,000"
-            value_match = re.search(r'\$([0-9,]+)', value_text)
-            if value_match:
-                property_data['estimated_value'] = value_match.group(1).replace(',', '')
-        
-        # Extract other property details
-        details = soup.select('.ds-home-fact-list li')
-        for detail in details:
-            text = detail.text.strip().lower()
-            
-            # Year built
-            if 'year built' in text:
-                year_match = re.search(r'year built:?\s*(\d{4})', text, re.IGNORECASE)
-                if year_match:
-                    property_data['year_built'] = year_match.group(1)
-            
-            # Square footage
-            elif 'square feet' in text or 'sqft' in text:
-                sqft_match = re.search(r'([\d,]+)\s*sq\s*ft', text, re.IGNORECASE)
-                if sqft_match:
-                    property_data['square_feet'] = sqft_match.group(1).replace(',', '')
-            
-            # Bedrooms
-            elif 'bed' in text:
-                bed_match = re.search(r'(\d+)\s*bed', text, re.IGNORECASE)
-                if bed_match:
-                    property_data['bedrooms'] = bed_match.group(1)
-            
-            # Bathrooms
-            elif 'bath' in text:
-                bath_match = re.search(r'(\d+(?:\.\d+)?)\s*bath', text, re.IGNORECASE)
-                if bath_match:
-                    property_data['bathrooms'] = bath_match.group(1)
-        
-        # If we didn't find the data in the expected place, try to extract it from the JSON-LD script
-        if not property_data.get('estimated_value'):
-            scripts = soup.select('script[type="application/ld+json"]')
-            for script in scripts:
-                try:
-                    if script.string:  # Check if string attribute exists and is not None
-                        data = json.loads(script.string)
-                        if isinstance(data, dict) and data.get('@type') == 'SingleFamilyResidence':
-                            floor_size = data.get('floorSize')
-                            if isinstance(floor_size, dict) and floor_size.get('value'):
-                                property_data['square_feet'] = floor_size.get('value')
-                            if data.get('numberOfRooms'):
-                                property_data['bedrooms'] = data.get('numberOfRooms')
-                            # Add more field extractions as needed
-                except Exception as e:
-                    logger.warning(f"Error parsing JSON-LD: {str(e)}")
+        property_data = parse_zillow_page(response.content, address)
         
         logger.info(f"Successfully scraped Zillow data: {property_data}")
         return property_data
@@ -153,19 +268,97 @@ def scrape_zillow_property_data(address, zip_code=None):
         logger.error(f"Error scraping Zillow: {str(e)}")
         return None
 
-def scrape_redfin_property_data(address):
+def scrape_redfin_property_data(address, deadline=None):
     """
     Scrape property data from Redfin
     
     Parameters:
     address (str): The property address
+    deadline (float, optional): time.monotonic() value after which no request is started
     
     Returns:
     dict: Property data including value, year built, square footage, etc.
     """
-    # Implementation similar to Zillow scraper but for Redfin
-    # This is a placeholder - would need similar header configurations and parsing
-    return None
+    logger.info(f"Scraping Redfin data for: {address}")
+    
+    try:
+        # Resolve the address to a property page with Redfin's location autocomplete
+        response = scraping_client.get(
+            "https://www.redfin.com/stingray/do/location-autocomplete",
+            params={'location': address, 'v': 2},
+            timeout=10,
+            deadline=deadline
+        )
+        if response.status_code != 200:
+            logger.error(f"Failed to look up Redfin address: Status {response.status_code}")
+            return None
+        
+        # Stingray responses are JSON behind a '{}&&' prefix
+        payload = json.loads(response.text.split('&&', 1)[-1]).get('payload', {})
+        exact_match = payload.get('exactMatch') or {}
+        property_path = exact_match.get('url')
+        if not property_path:
+            logger.info(f"No Redfin property match for: {address}")
+            return None
+        
+        response = scraping_client.get(f"https://www.redfin.com{property_path}", timeout=10, deadline=deadline)
+        if response.status_code != 200:
+            logger.error(f"Failed to retrieve Redfin data: Status {response.status_code}")
+            return None
+        
+        soup = BeautifulSoup(response.content, 'html.parser')
+        property_data = {
+            'source': 'redfin',
+            'address': address
+        }
+        
+        # Key facts at the top of the listing
+        stats = {
+            'estimated_value': '[data-rf-test-id="abp-price"] .statsValue',
+            'bedrooms': '[data-rf-test-id="abp-beds"] .statsValue',
+            'bathrooms': '[data-rf-test-id="abp-baths"] .statsValue',
+            'square_feet': '[data-rf-test-id="abp-sqFt"] .statsValue'
+        }
+        for field, selector in stats.items():
+            element = soup.select_one(selector)
+            if element:
+                number_match = re.search(r'[\d,]+(?:\.\d+)?', element.text)
+                if number_match:
+                    property_data[field] = number_match.group(0).replace(',', '')
+        
+        # Year built appears in the listing's key details
+        year_match = re.search(r'Built in (\d{4})', soup.get_text(' '), re.IGNORECASE)
+        if year_match:
+            property_data['year_built'] = year_match.group(1)
+        
+        # Fill gaps from the JSON-LD description of the home (its numberOfRooms counts every
+        # room, not bedrooms, so bedrooms only come from the listing stats)
+        for script in soup.select('script[type="application/ld+json"]'):
+            try:
+                if not script.string:
+                    continue
+                data = json.loads(script.string)
+                for item in data if isinstance(data, list) else [data]:
+                    if not isinstance(item, dict):
+                        continue
+                    floor_size = item.get('floorSize')
+                    if 'square_feet' not in property_data and isinstance(floor_size, dict) and floor_size.get('value'):
+                        property_data['square_feet'] = str(floor_size.get('value')).replace(',', '')
+                    if 'year_built' not in property_data and item.get('yearBuilt'):
+                        property_data['year_built'] = str(item.get('yearBuilt'))
+            except Exception as e:
+                logger.warning(f"Error parsing Redfin JSON-LD: {str(e)}")
+        
+        if len(property_data) == 2:
+            logger.info(f"No property details found on Redfin for: {address}")
+            return None
+        
+        logger.info(f"Successfully scraped Redfin data: {property_data}")
+        return property_data
+        
+    except Exception as e:
+        logger.error(f"Error scraping Redfin: {str(e)}")
+        return None
 
 def get_property_age_group(year_built):
     """Determine the property age group based on construction year"""
@@ -227,7 +420,7 @@ def calculate_energy_score(property_data):
     
     # Factor: Square footage (larger homes are typically less efficient per square foot)
     if 'square_feet' in property_data and property_data['square_feet']:
-        sqft = int(property_data['square_feet'].replace(',', ''))
+        sqft = int(str(property_data['square_feet']).replace(',', ''))
         
         if sqft < 1000:
             base_score += 10
@@ -302,20 +495,8 @@ def calculate_climate_score(lat, lng):
         score += 5  # Lower energy use for heating, higher for cooling
     
     # Coastal vs. continental adjustments (based on proximity to oceans)
-    # Check if location is coastal (simplified)
-    is_coastal = False
-    
-    # US West Coast
-    if -125 < lng < -115 and 32 < lat < 49:
-        is_coastal = True
-    # US East Coast
-    elif -82 < lng < -65 and 25 < lat < 47:
-        is_coastal = True
-    # Gulf Coast
-    elif -98 < lng < -80 and 25 < lat < 31:
-        is_coastal = True
-    
-    if is_coastal:
+    # Coastal regions (US West, East and Gulf Coasts) come from the geo factor grid
+    if geo_factors.factors_at(lat, lng) & geo_factors.COASTAL:
         score += 3  # Coastal areas typically have more moderate temperatures
     
     return score
@@ -350,17 +531,18 @@ def calculate_solar_exposure(lat, lng, property_data):
         score += 0  # Lower solar potential
     
     # Adjust for cloud cover by region (simplified)
+    factors = geo_factors.factors_at(lat, lng)
     # Pacific Northwest (cloudy)
-    if -125 < lng < -115 and 42 < lat < 49:
+    if factors & geo_factors.PACIFIC_NORTHWEST:
         score -= 5
     # Southwest (sunny)
-    elif -120 < lng < -100 and 30 < lat < 42:
+    elif factors & geo_factors.SOUTHWEST:
         score += 5
     # Southeast (mixed)
-    elif -90 < lng < -75 and 25 < lat < 36:
+    elif factors & geo_factors.SOUTHEAST:
         score += 2
     # Northeast (varied seasons)
-    elif -80 < lng < -65 and 37 < lat < 47:
+    elif factors & geo_factors.NORTHEAST:
         score -= 2
     
     # If we have info about home orientation, factor that in
@@ -372,8 +554,9 @@ def calculate_solar_exposure(lat, lng, property_data):
             score -= 2  # Suboptimal for northern hemisphere
     
     # If we have info about window square footage, factor that in
-    if 'window_sqft' in property_data:
-        window_ratio = property_data['window_sqft'] / property_data['square_feet']
+    if property_data.get('window_sqft') and property_data.get('square_feet'):
+        square_feet = int(str(property_data['square_feet']).replace(',', ''))
+        window_ratio = float(property_data['window_sqft']) / square_feet if square_feet else 0
         if window_ratio > 0.15:
             score += 3  # More natural light
     
@@ -395,9 +578,10 @@ def calculate_weather_resilience(lat, lng, property_data):
     score = 0
     
     # Check for properties in extreme weather zones
+    factors = geo_factors.factors_at(lat, lng)
     
     # Hurricane zones (US East/Gulf Coast)
-    if (-98 < lng < -65 and 25 < lat < 40):
+    if factors & geo_factors.HURRICANE_ZONE:
         score -= 5
         
         # But newer homes in these areas are built to better standards
@@ -407,11 +591,11 @@ def calculate_weather_resilience(lat, lng, property_data):
                 score += 3  # Modern hurricane building codes
     
     # Tornado alley
-    if (-105 < lng < -88 and 32 < lat < 42):
+    if factors & geo_factors.TORNADO_ALLEY:
         score -= 4
     
     # Extreme cold regions
-    if (lat > 43 and lng < -90):
+    if factors & geo_factors.EXTREME_COLD:
         score -= 3
         
         # Newer homes have better insulation
@@ -421,7 +605,7 @@ def calculate_weather_resilience(lat, lng, property_data):
                 score += 4  # Modern energy codes for cold climates
     
     # Desert/extreme heat regions (Southwest)
-    if (-115 < lng < -105 and 31 < lat < 37):
+    if factors & geo_factors.EXTREME_HEAT:
         score -= 3
         
         # Newer homes have better cooling efficiency
@@ -443,49 +627,86 @@ def calculate_zip_climate_score(zip_code):
     Returns:
     int: Score adjustment from -10 to +10
     """
-    # First digit of ZIP code gives a general region in the US
     if not zip_code or len(zip_code) < 5:
         return 0
     
+    # Looked up by 3-digit prefix (or 5-digit override) in the ZIP climate table
     try:
-        first_digit = int(zip_code[0])
-        
-        # Very simplified regional adjustments based on first digit of ZIP
-        # 0: Northeast (mixed climate, older buildings)
-        if first_digit == 0:
-            return -2
-        # 1: Northeast/Mid-Atlantic (cold winters, humid summers)
-        elif first_digit == 1:
-            return -3
-        # 2: Southeast/Coastal (hot, humid)
-        elif first_digit == 2:
-            return -2
-        # 3: Southeast/Gulf (hot, humid, storm risk)
-        elif first_digit == 3:
-            return -4
-        # 4: Great Lakes (cold winters, humidity)
-        elif first_digit == 4:
-            return -3
-        # 5: Midwest (temperature extremes)
-        elif first_digit == 5:
-            return -1
-        # 6: Central (varied climate)
-        elif first_digit == 6:
-            return 0
-        # 7: South Central (hot, storm risk)
-        elif first_digit == 7:
-            return -2
-        # 8: Mountain/Desert (dry, temperature extremes)
-        elif first_digit == 8:
-            return 2
-        # 9: West Coast (mild, varied by elevation)
-        elif first_digit == 9:
-            return 4
-        else:
-            return 0
-    except:
+        return zip_climate.zip_climate_score(zip_code)
+    except Exception as e:
+        logger.warning(f"Error scoring ZIP code {zip_code}: {str(e)}")
         return 0
 
+def energy_score_inputs(year_built, square_feet, lat, lng, zip_code):
+    """
+    Build the property dict calculate_energy_score() reads from stored columns
+    
+    Stored scores depend only on these columns, so they can be recomputed when the rules change.
+    
+    Parameters:
+    year_built (int): property_details.year_built
+    square_feet (int): property_details.square_feet
+    lat (float): addresses.lat
+    lng (float): addresses.lng
+    zip_code (str): addresses.zip
+    
+    Returns:
+    dict: Property data for calculate_energy_score()
+    """
+    property_data = {'year_built': year_built, 'square_feet': square_feet, 'zip_code': zip_code}
+    # Addresses saved without coordinates have lat/lng 0
+    if lat is not None and lng is not None and (float(lat), float(lng)) != (0.0, 0.0):
+        property_data['latitude'] = float(lat)
+        property_data['longitude'] = float(lng)
+    return property_data
+
+def _parse_number(property_data, key, convert=int):
+    """
+    Read a scraped or imported number such as '3', '3.0', '2,300' or '$350,000.00'
+
+    Returns None for missing values, and for malformed ones after logging them, so one bad
+    field never fails the whole record.
+    """
+    value = property_data.get(key)
+    # 0 is a real value (a studio has 0 bedrooms); only absent or empty fields are missing
+    if value is None or value == '':
+        return None
+    try:
+        number = float(str(value).replace(',', '').replace('$', '').strip())
+    except ValueError:
+        number = float('nan')
+    if not math.isfinite(number):
+        logger.warning(f"Ignoring malformed {key} value {value!r}")
+        return None
+    return convert(number)
+
+def prepare_property_details(property_data, address=None):
+    """
+    Convert scraped property data to property_details column values
+    
+    Parameters:
+    property_data (dict): The scraped (or merged) property data
+    address (dict, optional): The address row (lat, lng, zip) used for the energy score
+    
+    Returns:
+    tuple: (year_built, square_feet, bedrooms, bathrooms, estimated_value,
+            energy_score, property_age_group)
+    """
+    year_built = _parse_number(property_data, 'year_built')
+    square_feet = _parse_number(property_data, 'square_feet')
+    bedrooms = _parse_number(property_data, 'bedrooms')
+    bathrooms = _parse_number(property_data, 'bathrooms', float)
+    estimated_value = _parse_number(property_data, 'estimated_value')
+    
+    # Calculate derived fields
+    address = address or {}
+    energy_score = calculate_energy_score(energy_score_inputs(
+        year_built, square_feet, address.get('lat'), address.get('lng'), address.get('zip')
+    ))
+    property_age_group = get_property_age_group(year_built)
+    return (year_built, square_feet, bedrooms, bathrooms, estimated_value,
+            energy_score, property_age_group)
+
 def store_property_data(property_id, property_data):
     """
     Store the property data in the database
@@ -504,37 +725,22 @@ def store_property_data(property_id, property_data):
     try:
         cursor = conn.cursor()
         
-        # Check if the property_details table exists, if not create it
+        # The table itself is created once at startup by setup_property_data()
+        # Check if we already have data for this property, and get the location it is scored with
         cursor.execute("""
-            CREATE TABLE IF NOT EXISTS property_details (
-                id SERIAL PRIMARY KEY,
-                address_id INTEGER REFERENCES addresses(id),
-                year_built INTEGER,
-                square_feet INTEGER,
-                bedrooms INTEGER,
-                bathrooms NUMERIC(3,1),
-                estimated_value INTEGER,
-                energy_score INTEGER,
-                property_age_group VARCHAR(50),
-                data_source VARCHAR(50),
-                last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        # Check if we already have data for this property
-        cursor.execute("SELECT id FROM property_details WHERE address_id = %s", (property_id,))
-        existing_record = cursor.fetchone()
-        
-        # Prepare the data
-        year_built = int(property_data.get('year_built', 0)) if property_data.get('year_built') else None
-        square_feet = int(property_data.get('square_feet', 0).replace(',', '')) if property_data.get('square_feet') else None
-        bedrooms = int(property_data.get('bedrooms', 0)) if property_data.get('bedrooms') else None
-        bathrooms = float(property_data.get('bathrooms', 0)) if property_data.get('bathrooms') else None
-        estimated_value = int(property_data.get('estimated_value', 0)) if property_data.get('estimated_value') else None
+            SELECT a.lat, a.lng, a.zip,
+                   (SELECT id FROM property_details WHERE address_id = a.id LIMIT 1) AS details_id
+            FROM addresses a
+            WHERE a.id = %s
+        """, (property_id,))
+        address_row = cursor.fetchone()
+        address = dict(zip(['lat', 'lng', 'zip'], address_row[:3])) if address_row else None
+        existing_record = address_row[3] if address_row else None
         
-        # Calculate derived fields
-        energy_score = calculate_energy_score(property_data)
-        property_age_group = get_property_age_group(year_built)
+        # Prepare the data and calculate derived fields
+        (year_built, square_feet, bedrooms, bathrooms, estimated_value,
+         energy_score, property_age_group) = prepare_property_details(property_data, address)
+        inputs_sql = ENERGY_SCORE_INPUTS_SQL.format(year_built='%s::integer', square_feet='%s::integer')
         
         if existing_record:
             # Update existing record
@@ -546,13 +752,16 @@ def store_property_data(property_id, property_data):
                     bathrooms = %s,
                     estimated_value = %s,
                     energy_score = %s,
+                    energy_score_version = %s,
+                    energy_score_inputs = (SELECT {inputs_sql} FROM addresses a WHERE a.id = %s),
                     property_age_group = %s,
                     data_source = %s,
                     last_updated = CURRENT_TIMESTAMP
                 WHERE address_id = %s
-            """, (
+            """.format(inputs_sql=inputs_sql), (
                 year_built, square_feet, bedrooms, bathrooms, estimated_value,
-                energy_score, property_age_group, property_data.get('source', 'unknown'),
+                energy_score, ENERGY_SCORE_VERSION, year_built, square_feet, property_id,
+                property_age_group, property_data.get('source', 'unknown'),
                 property_id
             ))
         else:
@@ -560,14 +769,18 @@ def store_property_data(property_id, property_data):
             cursor.execute("""
                 INSERT INTO property_details (
                     address_id, year_built, square_feet, bedrooms, bathrooms, 
-                    estimated_value, energy_score, property_age_group, data_source
-                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """, (
+                    estimated_value, energy_score, energy_score_version, energy_score_inputs,
+                    property_age_group, data_source
+                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s,
+                          (SELECT {inputs_sql} FROM addresses a WHERE a.id = %s), %s, %s)
+            """.format(inputs_sql=inputs_sql), (
                 property_id, year_built, square_feet, bedrooms, bathrooms,
-                estimated_value, energy_score, property_age_group, property_data.get('source', 'unknown')
+                estimated_value, energy_score, ENERGY_SCORE_VERSION, year_built, square_feet, property_id,
+                property_age_group, property_data.get('source', 'unknown')
             ))
         
         conn.commit()
+        cache.delete(_property_data_cache_key(property_id))
         logger.info(f"Successfully stored property data for address ID {property_id}")
         return True
         
@@ -580,71 +793,296 @@ def store_property_data(property_id, property_data):
         if conn:
             conn.close()
 
-def get_property_data_by_address(address_id):
+def setup_property_data(cursor):
+    """
+    Create the property details and scrape tracking tables
+
+    Parameters:
+    cursor: An open database cursor (the caller commits)
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS property_details (
+            id SERIAL PRIMARY KEY,
+            address_id INTEGER REFERENCES addresses(id),
+            year_built INTEGER,
+            square_feet INTEGER,
+            bedrooms INTEGER,
+            bathrooms NUMERIC(3,1),
+            estimated_value INTEGER,
+            energy_score INTEGER,
+            property_age_group VARCHAR(50),
+            data_source TEXT,
+            last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_property_details_address_id ON property_details(address_id)")
+    # Failed scrapes, so an unscrapable address is retried with backoff instead of on every view
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS property_scrape_failures (
+            address_id INTEGER PRIMARY KEY REFERENCES addresses(id) ON DELETE CASCADE,
+            failure_count INTEGER NOT NULL DEFAULT 0,
+            last_attempt_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            next_attempt_at TIMESTAMP NOT NULL,
+            last_error TEXT
+        )
+    """)
+    # data_source holds per-field provenance (JSON), which outgrows VARCHAR(50); the ALTER locks
+    # the whole table, so it only runs on a database that has not been migrated yet
+    cursor.execute("""
+        SELECT data_type FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = 'property_details' AND column_name = 'data_source'
+    """)
+    row = cursor.fetchone()
+    if row and (row['data_type'] if isinstance(row, dict) else row[0]) != 'text':
+        cursor.execute("ALTER TABLE property_details ALTER COLUMN data_source TYPE TEXT")
+    # The scoring rules and inputs each score was computed with, so stale scores can be found;
+    # ADD COLUMN IF NOT EXISTS locks the table even when the columns exist, so check first
+    cursor.execute("""
+        SELECT COUNT(*) FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = 'property_details'
+        AND column_name IN ('energy_score_version', 'energy_score_inputs')
+    """)
+    row = cursor.fetchone()
+    if (row['count'] if isinstance(row, dict) else row[0]) < 2:
+        cursor.execute("""
+            ALTER TABLE property_details
+                ADD COLUMN IF NOT EXISTS energy_score_version INTEGER,
+                ADD COLUMN IF NOT EXISTS energy_score_inputs TEXT
+        """)
+    # Detect the optional extended-data tables now rather than on the first page view
+    load_extended_schema(cursor)
+
+def _full_address(address):
+    """Format an address row as a single line for the scrapers"""
+    return address.get('full_address') or f"{address.get('street')}, {address.get('city')}, {address.get('state')} {address.get('zip')}"
+
+@property_source('zillow', priority=10)
+def _fetch_zillow(address, deadline):
+    """Zillow source for the concurrent property lookup"""
+    return scrape_zillow_property_data(_full_address(address), address.get('zip'), deadline=deadline)
+
+@property_source('redfin', priority=20)
+def _fetch_redfin(address, deadline):
+    """Redfin source for the concurrent property lookup"""
+    return scrape_redfin_property_data(_full_address(address), deadline=deadline)
+
+def _scrape_property_data(address):
+    """Query every property source concurrently and merge their fields"""
+    return fetch_property_data(address)
+
+def _record_scrape_failure(cursor, address_id, error):
+    """Remember a failed scrape and return the seconds until the next attempt"""
+    cursor.execute("""
+        INSERT INTO property_scrape_failures AS f (address_id, failure_count, last_attempt_at, next_attempt_at, last_error)
+        VALUES (%s, 1, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP + %s * INTERVAL '1 second', %s)
+        ON CONFLICT (address_id) DO UPDATE SET
+            failure_count = f.failure_count + 1,
+            last_attempt_at = CURRENT_TIMESTAMP,
+            next_attempt_at = CURRENT_TIMESTAMP + LEAST(%s * POWER(2, f.failure_count), %s) * INTERVAL '1 second',
+            last_error = EXCLUDED.last_error
+        RETURNING EXTRACT(EPOCH FROM next_attempt_at - CURRENT_TIMESTAMP) AS retry_in
+    """, (address_id, PROPERTY_SCRAPE_RETRY_BASE, error,
+          PROPERTY_SCRAPE_RETRY_BASE, PROPERTY_SCRAPE_RETRY_MAX))
+    return float(cursor.fetchone()['retry_in'])
+
+def refresh_property_data(address_id):
+    """
+    Scrape an address and store the result, honoring the failure backoff
+
+    Parameters:
+    address_id (int): The address to refresh
+
+    Returns:
+    bool: True if fresh property details were stored
+
+    Runs as the PROPERTY_DATA_JOB enrichment job; the unique index on active jobs already keeps two
+    workers from refreshing the same address. No pooled connection is held during the scrape:
+    the address is read on one checkout and the outcome written on fresh ones.
+    """
+    conn = get_db_connection()
+    if not conn:
+        return False
+    
+    try:
+        cursor = conn.cursor(cursor_factory=RealDictCursor)
+        cursor.execute("""
+            SELECT EXTRACT(EPOCH FROM next_attempt_at - CURRENT_TIMESTAMP) AS retry_in
+            FROM property_scrape_failures
+            WHERE address_id = %s AND next_attempt_at > CURRENT_TIMESTAMP
+        """, (address_id,))
+        failure = cursor.fetchone()
+        address = None
+        if not failure:
+            cursor.execute("SELECT * FROM addresses WHERE id = %s", (address_id,))
+            address = cursor.fetchone()
+        cursor.close()
+    except Exception as e:
+        logger.error(f"Error refreshing property data for address ID {address_id}: {str(e)}")
+        return False
+    finally:
+        conn.close()
+    
+    if failure:
+        cache.set(_scrape_backoff_cache_key(address_id), True, max(1, int(failure['retry_in'])))
+        return False
+    if not address:
+        return False
+    
+    property_data = None
+    error = None
+    try:
+        property_data = _scrape_property_data(address)
+    except Exception as e:
+        error = str(e)
+    
+    if property_data and store_property_data(address_id, property_data):
+        _record_scrape_outcome(address_id)
+        return True
+    _record_scrape_outcome(address_id, error or 'No property data found')
+    return False
+
+def _record_scrape_outcome(address_id, error=None):
+    """Clear the failure backoff after a successful scrape, or extend it after a failed one"""
+    conn = get_db_connection()
+    if not conn:
+        return
+    
+    try:
+        cursor = conn.cursor(cursor_factory=RealDictCursor)
+        if error is None:
+            cursor.execute("DELETE FROM property_scrape_failures WHERE address_id = %s", (address_id,))
+            conn.commit()
+            cache.delete(_scrape_backoff_cache_key(address_id))
+            return
+        retry_in = _record_scrape_failure(cursor, address_id, error)
+        conn.commit()
+        cache.set(_scrape_backoff_cache_key(address_id), True, max(1, int(retry_in)))
+        logger.warning(f"Scrape failed for address ID {address_id}, next attempt in {int(retry_in)}s")
+    except Exception as e:
+        logger.error(f"Error recording scrape outcome for address ID {address_id}: {str(e)}")
+        conn.rollback()
+    finally:
+        conn.close()
+
+def schedule_property_refresh(address_id):
+    """
+    Queue a background enrichment job that refreshes an address's property data
+
+    Parameters:
+    address_id (int): The address to refresh
+
+    Returns:
+    int: The enrichment job id, or None if the address is backing off after a failed scrape
+    """
+    if cache.get(_scrape_backoff_cache_key(address_id)):
+        return None
+    return enrichment_jobs.enqueue(PROPERTY_DATA_JOB, int(address_id))
+
+enrichment_jobs.register_handler(PROPERTY_DATA_JOB, refresh_property_data)
+
+def _property_data_query(list_keys, latest=False):
+    """Build the single query that reads an address, its property details, refresh status and extended lists"""
+    address_filter = "ORDER BY created_at DESC LIMIT 1" if latest else "WHERE id = %(address_id)s"
+    lists = ''.join(
+        f",\n               (SELECT json_agg(r) FROM ({_EXTENDED_LISTS[key][1]}) r) AS {key}"
+        for key in list_keys
+    )
+    # The marker columns split each row into the address, its details and the rest
+    return f"""
+        SELECT a.*, NULL AS details_start, pd.*, NULL AS details_end,
+               pd.last_updated IS NULL
+               OR pd.last_updated < CURRENT_TIMESTAMP - %(max_age)s * INTERVAL '1 second' AS is_stale,
+               f.address_id IS NOT NULL AS backing_off{lists}
+        FROM (SELECT * FROM addresses {address_filter}) a
+        LEFT JOIN LATERAL (
+            SELECT * FROM property_details
+            WHERE address_id = a.id
+            ORDER BY id DESC
+            LIMIT 1
+        ) pd ON TRUE
+        LEFT JOIN property_scrape_failures f
+            ON f.address_id = a.id AND f.next_attempt_at > CURRENT_TIMESTAMP
+    """
+
+def get_property_data_by_address(address_id=None):
     """
     Get property data from the database
     
     Parameters:
-    address_id (int): The address ID to look up
+    address_id (int, optional): The address ID to look up; the most recently added address if None
     
     Returns:
-    dict: The property data
+    dict: The property data (a copy, so callers may modify it)
+    
+    Never scrapes inline: missing or stale details are served as-is (or as defaults) while a
+    background enrichment job runs. 'data_status' reports whether the details are fresh, stale or
+    pending, and 'enrichment_job_id' identifies the refresh job, if one was queued.
+    
+    The address, its details, their refresh status and the extended data are read in one query
+    on the request's pooled connection.
     """
+    if address_id is not None:
+        cached_data = cache.get(_property_data_cache_key(address_id))
+        if cached_data is not None:
+            return dict(cached_data)
+    
     conn = get_db_connection()
     if not conn:
         return None
     
     try:
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
+        cursor = conn.cursor()
         
-        # First get the address details
-        cursor.execute("SELECT * FROM addresses WHERE id = %s", (address_id,))
-        address = cursor.fetchone()
+        schema = _extended_schema
+        if schema is None or time.monotonic() - schema[0] > EXTENDED_SCHEMA_TTL:
+            list_keys, _ = load_extended_schema(cursor)
+        else:
+            _, list_keys, _ = schema
         
-        if not address:
-            logger.error(f"Address not found with ID {address_id}")
+        params = {'address_id': address_id, 'max_age': PROPERTY_DATA_MAX_AGE}
+        try:
+            cursor.execute(_property_data_query(list_keys, latest=address_id is None), params)
+        except (psycopg2.errors.UndefinedTable, psycopg2.errors.UndefinedColumn) as e:
+            # An extended-data table was dropped since the schema was detected
+            logger.warning(f"Extended data schema changed, detecting it again: {str(e)}")
+            conn.rollback()
+            list_keys, _ = load_extended_schema(cursor)
+            cursor.execute(_property_data_query(list_keys, latest=address_id is None), params)
+        row = cursor.fetchone()
+        
+        if not row:
+            if address_id is not None:
+                logger.error(f"Address not found with ID {address_id}")
             return None
         
-        # Check if we already have property details
-        cursor.execute("SELECT * FROM property_details WHERE address_id = %s", (address_id,))
-        property_details = cursor.fetchone()
-        
-        # If we don't have property details yet, try to scrape them
-        if not property_details:
-            # Format the full address
-            full_address = address.get('full_address') or f"{address.get('street')}, {address.get('city')}, {address.get('state')} {address.get('zip')}"
-            
-            # Try to scrape from Zillow
-            property_data = scrape_zillow_property_data(full_address, address.get('zip'))
-            
-            # If that fails, try Redfin
-            if not property_data:
-                property_data = scrape_redfin_property_data(full_address)
-            
-            # If we got data, store it
-            if property_data:
-                store_property_data(address_id, property_data)
-                
-                # Get the stored data
-                cursor.execute("SELECT * FROM property_details WHERE address_id = %s", (address_id,))
-                property_details = cursor.fetchone()
-        
-        # Get any extended property data
-        extended_data = get_extended_property_data(address_id, cursor)
+        columns = [column.name for column in cursor.description]
+        details_start = columns.index('details_start')
+        details_end = columns.index('details_end')
+        address = dict(zip(columns[:details_start], row[:details_start]))
+        status_row = dict(zip(columns[details_start + 1:details_end], row[details_start + 1:details_end]))
+        extra = dict(zip(columns[details_end + 1:], row[details_end + 1:]))
+        property_details = status_row if status_row.get('id') is not None else None
+        is_stale = extra['is_stale']
+        
+        # Missing or stale details are scraped in the background, never during the request
+        if property_details:
+            data_status = 'stale' if is_stale else 'fresh'
+        else:
+            is_stale = True
+            data_status = 'pending'
+        enrichment_job_id = None
+        if is_stale and not extra['backing_off']:
+            enrichment_job_id = schedule_property_refresh(address['id'])
+        
+        # Extended lists come back as JSON arrays (None when the address has no rows)
+        extended_data = {key: extra[key] for key in list_keys if extra.get(key)}
         
         # Return the combined data
+        result = dict(address)
         if property_details:
-            result = dict(address)
             result.update(property_details)
-            
-            # Add extended data if available
-            if extended_data:
-                result.update(extended_data)
-                
-            return result
         else:
             # Return just the address with default values
-            result = dict(address)
             result.update({
                 'year_built': 1980,  # Default value
                 'square_feet': 2000,  # Default value
@@ -652,12 +1090,14 @@ def get_property_data_by_address(address_id):
                 'estimated_value': 350000,  # Default value
                 'energy_score': 50  # Default value
             })
-            
-            # Add extended data if available
-            if extended_data:
-                result.update(extended_data)
-                
-            return result
+        result.update(extended_data)
+        
+        result['data_status'] = data_status
+        result['enrichment_job_id'] = enrichment_job_id
+        # Only fresh data is cached, so a page reloaded after its enrichment job sees the new details
+        if data_status == 'fresh':
+            cache.set(_property_data_cache_key(address['id']), result, PROPERTY_DATA_CACHE_TTL)
+        return dict(result)
         
     except Exception as e:
         logger.error(f"Error retrieving property data: {str(e)}")
@@ -667,6 +1107,56 @@ def get_property_data_by_address(address_id):
         if conn:
             conn.close()
 
+def load_extended_schema(cursor):
+    """
+    Detect which optional extended-data tables and property_details columns exist
+    
+    Parameters:
+    cursor: An open database cursor
+    
+    Returns:
+    tuple: (available list keys, available utility columns)
+    """
+    global _extended_schema
+    # to_regclass resolves names through the search_path, as the data query will
+    cursor.execute("""
+        SELECT ARRAY(
+                   SELECT key FROM unnest(%s::text[], %s::text[]) AS t(key, table_name)
+                   WHERE to_regclass(t.table_name) IS NOT NULL
+               ) AS list_keys,
+               ARRAY(
+                   SELECT attname::text FROM pg_attribute
+                   WHERE attrelid = to_regclass('property_details') AND attnum > 0 AND NOT attisdropped
+                     AND attname = ANY(%s::text[])
+               ) AS utility_columns
+    """, (list(_EXTENDED_LISTS), [table for table, _ in _EXTENDED_LISTS.values()], _UTILITY_COLUMNS))
+    row = cursor.fetchone()
+    list_keys, utility_columns = row.values() if isinstance(row, dict) else row
+    # Keep the declared order so the generated query is stable
+    list_keys = [key for key in _EXTENDED_LISTS if key in list_keys]
+    utility_columns = [column for column in _UTILITY_COLUMNS if column in utility_columns]
+    _extended_schema = (time.monotonic(), list_keys, utility_columns)
+    return list_keys, utility_columns
+
+def _extended_data_query(list_keys, utility_columns):
+    """Build the single query that reads all available extended data"""
+    selects = [f"d.{column}" for column in utility_columns]
+    selects += [
+        f"(SELECT json_agg(r) FROM ({_EXTENDED_LISTS[key][1]}) r) AS {key}"
+        for key in list_keys
+    ]
+    query = f"SELECT {', '.join(selects)} FROM (SELECT %(address_id)s::integer AS id) a"
+    if utility_columns:
+        query += f"""
+            LEFT JOIN LATERAL (
+                SELECT {', '.join(utility_columns)}
+                FROM property_details
+                WHERE address_id = a.id
+                ORDER BY id DESC
+                LIMIT 1
+            ) d ON TRUE"""
+    return query
+
 def get_extended_property_data(address_id, cursor=None):
     """
     Get extended property data for the Control tab
@@ -677,6 +1167,9 @@ def get_extended_property_data(address_id, cursor=None):
     
     Returns:
     dict: The extended property data
+    
+    Which optional tables exist is detected once and rechecked every EXTENDED_SCHEMA_TTL seconds
+    (or right away if the schema changes under a query); the data itself is one query.
     """
     close_conn = False
     conn = None
@@ -692,105 +1185,47 @@ def get_extended_property_data(address_id, cursor=None):
         # Create an extended data dictionary
         extended_data = {}
         
-        # Get any existing property permits
-        try:
-            cursor.execute("""
-                SELECT EXISTS (
-                    SELECT FROM information_schema.tables 
-                    WHERE table_name = 'property_permits'
-                )
-            """)
-            has_permits_table = cursor.fetchone()['exists']
-            
-            if has_permits_table:
-                cursor.execute("""
-                    SELECT date, type, description, permit_number
-                    FROM property_permits
-                    WHERE address_id = %s
-                    ORDER BY date DESC
-                    LIMIT 10
-                """, (address_id,))
-                permits = cursor.fetchall()
-                if permits and len(permits) > 0:
-                    extended_data['permits'] = [dict(permit) for permit in permits]
-        except Exception as e:
-            logger.warning(f"Error checking for permits: {str(e)}")
-            
-        # Get property updates if available
-        try:
-            cursor.execute("""
-                SELECT EXISTS (
-                    SELECT FROM information_schema.tables 
-                    WHERE table_name = 'property_updates'
-                )
-            """)
-            has_updates_table = cursor.fetchone()['exists']
-            
-            if has_updates_table:
-                cursor.execute("""
-                    SELECT date, description, type
-                    FROM property_updates
-                    WHERE address_id = %s
-                    ORDER BY date DESC
-                    LIMIT 5
-                """, (address_id,))
-                updates = cursor.fetchall()
-                if updates and len(updates) > 0:
-                    extended_data['recent_updates'] = [dict(update) for update in updates]
-        except Exception as e:
-            logger.warning(f"Error checking for updates: {str(e)}")
-        
-        # Get system information if available
-        try:
-            cursor.execute("""
-                SELECT EXISTS (
-                    SELECT FROM information_schema.tables 
-                    WHERE table_name = 'property_systems'
-                )
-            """)
-            has_systems_table = cursor.fetchone()['exists']
-            
-            if has_systems_table:
-                cursor.execute("""
-                    SELECT name, details, installation_date, expected_lifespan
-                    FROM property_systems
-                    WHERE address_id = %s
-                    ORDER BY name
-                """, (address_id,))
-                systems = cursor.fetchall()
-                if systems and len(systems) > 0:
-                    extended_data['systems'] = [dict(system) for system in systems]
-        except Exception as e:
-            logger.warning(f"Error checking for systems: {str(e)}")
-        
-        # Get utility information if available
+        schema = _extended_schema
+        if schema is None or time.monotonic() - schema[0] > EXTENDED_SCHEMA_TTL:
+            list_keys, utility_columns = load_extended_schema(cursor)
+        else:
+            _, list_keys, utility_columns = schema
+        if not list_keys and not utility_columns:
+            return extended_data
+        
         try:
-            cursor.execute("""
-                SELECT 
-                    property_type, lot_size, heating_type, cooling_type,
-                    avg_electric_bill, avg_gas_bill, avg_water_bill
-                FROM property_details
-                WHERE address_id = %s
-            """, (address_id,))
-            details = cursor.fetchone()
-            if details:
-                for key, value in details.items():
-                    if value is not None and key not in ['id', 'address_id']:
-                        extended_data[key] = value
-        except Exception as e:
-            logger.warning(f"Error checking for utility details: {str(e)}")
+            cursor.execute(_extended_data_query(list_keys, utility_columns), {'address_id': address_id})
+        except (psycopg2.errors.UndefinedTable, psycopg2.errors.UndefinedColumn) as e:
+            # A table or column was dropped since the schema was detected
+            logger.warning(f"Extended data schema changed, detecting it again: {str(e)}")
+            cursor.connection.rollback()
+            list_keys, utility_columns = load_extended_schema(cursor)
+            if not list_keys and not utility_columns:
+                return extended_data
+            cursor.execute(_extended_data_query(list_keys, utility_columns), {'address_id': address_id})
+        row = cursor.fetchone()
+        row = dict(row) if isinstance(row, dict) else dict(zip([c.name for c in cursor.description], row))
+        
+        # Lists come back as JSON arrays (None when the address has no rows)
+        for key in list_keys:
+            if row.get(key):
+                extended_data[key] = row[key]
+        
+        # Utility information, where set
+        for key in utility_columns:
+            if row.get(key) is not None:
+                extended_data[key] = row[key]
         
-        if close_conn and conn:
-            cursor.close()
-            conn.close()
-            
         return extended_data
         
     except Exception as e:
         logger.error(f"Error getting extended property data: {str(e)}")
+        return {}
+    
+    finally:
         if close_conn and conn:
+            cursor.close()
             conn.close()
-        return {}
 
 def format_price(value):
     """Format a price value into a string with appropriate abbreviations"""
@@ -0,0 +1,145 @@
+"""
+Property Data Sources
+
+This module queries every registered property data source concurrently under one overall
+deadline and merges their results field by field. Each field is taken from the highest-priority
+source that returned it, so a partial result from one site is filled in from the others, and
+the source of every field is recorded as provenance.
+
+A source is a function taking the address row and a deadline (a time.monotonic() value) and
+returning a dict of fields or None. Adding one is a single decorated function:
+
+    @property_source('county_records', priority=30)
+    def fetch_county_records(address, deadline):
+        ...
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+logger = logging.getLogger(__name__)
+
+# Seconds the whole multi-source lookup may take; slower sources are left out of the merge
+PROPERTY_FETCH_DEADLINE = float(os.environ.get('PROPERTY_FETCH_DEADLINE', 15))
+# Threads shared by all concurrent lookups in a process
+PROPERTY_FETCH_THREADS = int(os.environ.get('PROPERTY_FETCH_THREADS', 8))
+
+# Keys describing a result rather than the property
+_META_FIELDS = {'source', 'address', 'provenance'}
+
+# name -> (priority, fetch function); lower priority values win
+_sources = {}
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def property_source(name, priority=100):
+    """
+    Register a property data source
+
+    Parameters:
+    name (str): The source name recorded in provenance
+    priority (int): Merge priority; lower values win when sources disagree
+
+    Returns:
+    callable: The decorator
+    """
+    def decorator(fetch):
+        _sources[name] = (priority, fetch)
+        return fetch
+    return decorator
+
+
+def registered_sources():
+    """Return the registered source names in priority order"""
+    return [name for name, _ in sorted(_sources.items(), key=lambda item: item[1][0])]
+
+
+def _get_executor():
+    """Return this process's thread pool, creating it on first use or after a fork"""
+    global _executor, _executor_pid
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(max_workers=PROPERTY_FETCH_THREADS,
+                                           thread_name_prefix='property-source')
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def _run_source(name, fetch, address, deadline):
+    """Call one source, logging (rather than raising) its failures"""
+    started = time.monotonic()
+    try:
+        result = fetch(address, deadline)
+    except Exception as e:
+        logger.error(f"Property source {name} failed: {str(e)}")
+        return None
+    logger.info(f"Property source {name} finished in {time.monotonic() - started:.2f}s "
+                f"with {'data' if result else 'no data'}")
+    return result
+
+
+def merge_results(results):
+    """
+    Merge source results field by field
+
+    Parameters:
+    results (dict): Source name -> result dict
+
+    Returns:
+    dict: The merged fields, with 'provenance' (field -> source) and 'source' (provenance as JSON),
+          or None if no source returned a field
+    """
+    merged = {}
+    provenance = {}
+    for name in registered_sources():
+        result = results.get(name)
+        if not result:
+            continue
+        for field, value in result.items():
+            if field in _META_FIELDS or field in merged:
+                continue
+            if value is None or value == '':
+                continue
+            merged[field] = value
+            provenance[field] = name
+    if not merged:
+        return None
+    merged['provenance'] = provenance
+    merged['source'] = json.dumps(provenance, sort_keys=True, separators=(',', ':'))
+    return merged
+
+
+def fetch_property_data(address, deadline_seconds=None):
+    """
+    Query every registered source concurrently and merge what arrives before the deadline
+
+    Parameters:
+    address (dict): The address row
+    deadline_seconds (float, optional): Overall time budget (PROPERTY_FETCH_DEADLINE if None)
+
+    Returns:
+    dict: The merged property data, or None if no source returned anything in time
+    """
+    if not _sources:
+        return None
+    budget = PROPERTY_FETCH_DEADLINE if deadline_seconds is None else deadline_seconds
+    deadline = time.monotonic() + budget
+
+    executor = _get_executor()
+    futures = {
+        executor.submit(_run_source, name, fetch, address, deadline): name
+        for name, (priority, fetch) in _sources.items()
+    }
+    done, not_done = wait(futures, timeout=budget)
+    for future in not_done:
+        # Left running; whatever it returns is ignored
+        logger.warning(f"Property source {futures[future]} missed the {budget:.1f}s deadline")
+
+    results = {futures[future]: future.result() for future in done}
+    return merge_results(results)
@@ -0,0 +1,276 @@
+"""
+Room Recommendations
+
+This module precomputes product recommendations per room type.
+The ranked product list for every known room is stored in `room_product_recommendations`, and a
+pre-sampled `featured_products` set replaces the old ORDER BY RANDOM() fallback. Both are rebuilt
+when the products catalog version changes, so serving a recommendation is one indexed lookup.
+"""
+
+import os
+import logging
+import threading
+import time
+import db_pool
+from catalog_versions import setup_catalog_versions, track_table, get_catalog_version
+from product_search import build_search_filter
+
+logger = logging.getLogger(__name__)
+
+# Map room types to categories that would be relevant for that room
+ROOM_CATEGORY_MAP = {
+    'living': ['Furniture', 'Lighting', 'Decor', 'Entertainment'],
+    'kitchen': ['Kitchen', 'Appliances', 'Dining'],
+    'bedroom': ['Furniture', 'Bedding', 'Lighting', 'Decor'],
+    'bathroom': ['Bath', 'Fixtures', 'Storage'],
+    'office': ['Office', 'Furniture', 'Electronics'],
+    'outdoor': ['Outdoor', 'Garden', 'Patio']
+}
+# Used for room types without their own entry
+DEFAULT_ROOM_TYPE = 'default'
+DEFAULT_ROOM_CATEGORIES = ['Furniture', 'Lighting', 'Decor']
+
+RECOMMENDATIONS_PER_ROOM = int(os.environ.get('RECOMMENDATIONS_PER_ROOM', 50))
+FEATURED_SAMPLE_SIZE = int(os.environ.get('FEATURED_SAMPLE_SIZE', 200))
+# Seconds between checks of the catalog version
+RECOMMENDATIONS_REFRESH_INTERVAL = int(os.environ.get('RECOMMENDATIONS_REFRESH_INTERVAL', 60))
+
+# Advisory lock key so only one worker rebuilds at a time
+_REFRESH_LOCK_KEY = 72010006
+
+_PRODUCT_COLUMNS = """
+    p.id, p.name, p.description, p.price,
+    p.is_on_sale, p.sale_price, p.image_url,
+    p.product_url, p.external_id,
+    s.id as store_id, s.name as store_name, s.logo_url as store_logo,
+    sc.name as category_name
+"""
+
+_refresher_pid = None
+_refresher_lock = threading.Lock()
+
+
+def normalize_room_type(room_type):
+    """Normalize a room type such as 'Living_Room' to its lookup key ('living')"""
+    key = (room_type or '').strip().lower().replace('_', ' ').replace('-', ' ')
+    key = ' '.join(key.split())
+    if key.endswith(' room') and key != 'room':
+        key = key[:-len(' room')]
+    return key
+
+
+def setup_recommendations(cursor):
+    """
+    Create the recommendation tables and catalog change tracking
+
+    Parameters:
+    cursor: An open database cursor (the caller commits)
+    """
+    setup_catalog_versions(cursor)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS room_product_recommendations (
+            room_type VARCHAR(100) NOT NULL,
+            rank INTEGER NOT NULL,
+            product_id INTEGER NOT NULL,
+            PRIMARY KEY (room_type, rank)
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS featured_products (
+            rank INTEGER PRIMARY KEY,
+            product_id INTEGER NOT NULL
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS recommendation_builds (
+            id INTEGER PRIMARY KEY DEFAULT 1,
+            catalog_version BIGINT NOT NULL,
+            built_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    # Any change to products, stores or categories invalidates the recommendations
+    for table_name in ['products', 'stores', 'store_categories']:
+        track_table(cursor, table_name, 'products')
+
+
+def _get_room_types(cursor):
+    """Return every room key to precompute: the category map plus the room_types table"""
+    room_types = set(ROOM_CATEGORY_MAP.keys())
+    cursor.execute("SELECT to_regclass('room_types') IS NOT NULL")
+    if cursor.fetchone()[0]:
+        cursor.execute("SELECT name FROM room_types")
+        for row in cursor.fetchall():
+            room_types.add(normalize_room_type(row[0]))
+    room_types.discard('')
+    return sorted(room_types)
+
+
+def _insert_text_matches(cursor, room_type):
+    """Store the best text-search matches for a room; returns the number of rows written"""
+    search_sql, search_params, rank_sql, rank_params = build_search_filter(room_type)
+    cursor.execute(f"""
+        INSERT INTO room_product_recommendations (room_type, rank, product_id)
+        SELECT %s, ROW_NUMBER() OVER (ORDER BY {rank_sql} DESC, p.price DESC, p.id), p.id
+        FROM products p
+        JOIN stores s ON p.store_id = s.id
+        JOIN store_categories sc ON p.category_id = sc.id
+        WHERE {search_sql}
+        ORDER BY {rank_sql} DESC, p.price DESC, p.id
+        LIMIT %s
+    """, [room_type] + rank_params + search_params + rank_params + [RECOMMENDATIONS_PER_ROOM])
+    return cursor.rowcount
+
+
+def _insert_category_matches(cursor, room_type, categories):
+    """Store the most expensive products from the room's categories"""
+    category_patterns = [f"%{category}%" for category in categories]
+    cursor.execute("""
+        INSERT INTO room_product_recommendations (room_type, rank, product_id)
+        SELECT %s, ROW_NUMBER() OVER (ORDER BY p.price DESC, p.id), p.id
+        FROM products p
+        JOIN stores s ON p.store_id = s.id
+        JOIN store_categories sc ON p.category_id = sc.id
+        WHERE sc.name ILIKE ANY(%s)
+        ORDER BY p.price DESC, p.id
+        LIMIT %s
+    """, [room_type, category_patterns, RECOMMENDATIONS_PER_ROOM])
+    return cursor.rowcount
+
+
+def refresh_recommendations(conn, force=False):
+    """
+    Rebuild the precomputed recommendations if the products catalog has changed
+
+    Parameters:
+    conn: A database connection (autocommit is restored afterwards)
+    force (bool): Rebuild even if the catalog version is unchanged
+
+    Returns:
+    bool: True if the recommendations were rebuilt
+    """
+    # The lock and the swap must share one transaction, so readers never see it half done
+    previous_autocommit = conn.autocommit
+    if previous_autocommit:
+        conn.autocommit = False
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT pg_try_advisory_xact_lock(%s)", (_REFRESH_LOCK_KEY,))
+            if not cursor.fetchone()[0]:
+                conn.rollback()
+                return False
+
+            catalog_version = get_catalog_version(cursor, 'products')
+            cursor.execute("SELECT catalog_version FROM recommendation_builds WHERE id = 1")
+            build = cursor.fetchone()
+            if build and build[0] == catalog_version and not force:
+                conn.rollback()
+                return False
+
+            started = time.monotonic()
+            # Same precedence as the old request path: text matches, then the category map
+            cursor.execute("DELETE FROM room_product_recommendations")
+            for room_type in _get_room_types(cursor):
+                if _insert_text_matches(cursor, room_type) == 0:
+                    categories = ROOM_CATEGORY_MAP.get(room_type, DEFAULT_ROOM_CATEGORIES)
+                    _insert_category_matches(cursor, room_type, categories)
+            _insert_category_matches(cursor, DEFAULT_ROOM_TYPE, DEFAULT_ROOM_CATEGORIES)
+
+            # Sample the featured set once here instead of sorting the table per request
+            cursor.execute("DELETE FROM featured_products")
+            cursor.execute("""
+                INSERT INTO featured_products (rank, product_id)
+                SELECT ROW_NUMBER() OVER (), sample.id
+                FROM (
+                    SELECT p.id FROM products p
+                    JOIN stores s ON p.store_id = s.id
+                    JOIN store_categories sc ON p.category_id = sc.id
+                    ORDER BY RANDOM()
+                    LIMIT %s
+                ) sample
+            """, (FEATURED_SAMPLE_SIZE,))
+
+            cursor.execute("""
+                INSERT INTO recommendation_builds (id, catalog_version, built_at)
+                VALUES (1, %s, CURRENT_TIMESTAMP)
+                ON CONFLICT (id) DO UPDATE
+                SET catalog_version = EXCLUDED.catalog_version, built_at = EXCLUDED.built_at
+            """, (catalog_version,))
+        conn.commit()
+        logger.info(f"Rebuilt room recommendations for catalog version {catalog_version} "
+                    f"in {time.monotonic() - started:.2f}s")
+        return True
+    except Exception as e:
+        logger.error(f"Error refreshing recommendations: {str(e)}")
+        conn.rollback()
+        return False
+    finally:
+        if previous_autocommit:
+            conn.autocommit = previous_autocommit
+
+
+def get_recommended_products(cursor, room_type, limit):
+    """
+    Get the precomputed recommendations for a room
+
+    Parameters:
+    cursor: A RealDictCursor
+    room_type (str): The room type from the request
+    limit (int): Maximum number of products
+
+    Returns:
+    list: Product rows, falling back to the featured set for unknown rooms
+    """
+    room_key = normalize_room_type(room_type)
+    cursor.execute(f"""
+        SELECT {_PRODUCT_COLUMNS}
+        FROM room_product_recommendations r
+        JOIN products p ON p.id = r.product_id
+        JOIN stores s ON p.store_id = s.id
+        JOIN store_categories sc ON p.category_id = sc.id
+        WHERE r.room_type = COALESCE(
+            (SELECT room_type FROM room_product_recommendations WHERE room_type = %s LIMIT 1),
+            %s
+        )
+        ORDER BY r.rank
+        LIMIT %s
+    """, (room_key, DEFAULT_ROOM_TYPE, limit))
+    products = cursor.fetchall()
+    if products:
+        return products
+
+    logger.info(f"No precomputed recommendations for room type {room_type}, using featured products")
+    cursor.execute(f"""
+        SELECT {_PRODUCT_COLUMNS}
+        FROM featured_products f
+        JOIN products p ON p.id = f.product_id
+        JOIN stores s ON p.store_id = s.id
+        JOIN store_categories sc ON p.category_id = sc.id
+        ORDER BY RANDOM()
+        LIMIT %s
+    """, (limit,))
+    return cursor.fetchall()
+
+
+def _refresh_loop():
+    """Check the catalog version periodically and rebuild when it changes"""
+    while True:
+        conn = db_pool.get_connection()
+        if conn is not None:
+            try:
+                refresh_recommendations(conn)
+            finally:
+                conn.close()
+        time.sleep(RECOMMENDATIONS_REFRESH_INTERVAL)
+
+
+def ensure_refresher_started():
+    """Start this worker's background refresh thread if it is not running yet"""
+    global _refresher_pid
+    if _refresher_pid == os.getpid():
+        return
+    with _refresher_lock:
+        if _refresher_pid == os.getpid():
+            return
+        thread = threading.Thread(target=_refresh_loop, name='recommendations-refresh', daemon=True)
+        thread.start()
+        _refresher_pid = os.getpid()
@@ -0,0 +1,223 @@
+"""
+Scraping Client
+
+This module provides the shared HTTP client used by the property data scrapers.
+Each process keeps one requests.Session with keep-alive connection pools, so repeated scrapes
+of the same site reuse connections instead of opening a new TLS connection every time.
+Requests to each host pass through a token-bucket rate limiter. Connection errors, timeouts,
+429 and 5xx responses are retried a bounded number of times with jittered exponential backoff.
+Latency and error counters are kept per host and reported by host_stats().
+"""
+
+import os
+import time
+import random
+import logging
+import threading
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# Retries after the first attempt for retryable failures
+SCRAPE_MAX_RETRIES = int(os.environ.get('SCRAPE_MAX_RETRIES', 2))
+# Base and cap, in seconds, of the exponential backoff between retries
+SCRAPE_BACKOFF_BASE = float(os.environ.get('SCRAPE_BACKOFF_BASE', 0.5))
+SCRAPE_BACKOFF_MAX = float(os.environ.get('SCRAPE_BACKOFF_MAX', 8))
+# Default per-host rate limit: sustained requests per second and burst size
+SCRAPE_RATE_PER_SECOND = float(os.environ.get('SCRAPE_RATE_PER_SECOND', 1))
+SCRAPE_RATE_BURST = int(os.environ.get('SCRAPE_RATE_BURST', 3))
+# Keep-alive connections kept per host
+SCRAPE_POOL_SIZE = int(os.environ.get('SCRAPE_POOL_SIZE', 10))
+
+# Hosts that need a gentler limit than the default: host -> (requests per second, burst)
+HOST_RATE_LIMITS = {
+    'www.zillow.com': (0.5, 2),
+    'www.redfin.com': (0.5, 2)
+}
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept-Language': 'en-US,en;q=0.9',
+    'Connection': 'keep-alive'
+}
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class RateLimited(Exception):
+    """Raised when a host's rate limit would delay a request past its deadline"""
+
+
+class TokenBucket:
+    """A thread-safe token bucket: `rate` tokens per second, holding at most `burst`"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, max_wait=None):
+        """
+        Take a token, sleeping until one is available
+
+        Parameters:
+        max_wait (float, optional): Give up rather than wait longer than this many seconds
+
+        Returns:
+        float: Seconds spent waiting
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            wait = 0.0 if self._tokens >= 1 else (1 - self._tokens) / self.rate
+            if max_wait is not None and wait > max_wait:
+                raise RateLimited(f"Rate limit wait of {wait:.1f}s exceeds {max_wait:.1f}s")
+            # Reserve the token now so concurrent callers queue behind this one
+            self._tokens -= 1
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+_buckets = {}
+_buckets_lock = threading.Lock()
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def get_session():
+    """Return this process's shared session, creating it on first use or after a fork"""
+    global _session, _session_pid
+    if _session is not None and _session_pid == os.getpid():
+        return _session
+    with _session_lock:
+        if _session is None or _session_pid != os.getpid():
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=SCRAPE_POOL_SIZE, pool_maxsize=SCRAPE_POOL_SIZE)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            session.headers.update(DEFAULT_HEADERS)
+            _session = session
+            _session_pid = os.getpid()
+    return _session
+
+
+def _get_bucket(host):
+    """Return the rate limiter for a host"""
+    with _buckets_lock:
+        bucket = _buckets.get(host)
+        if bucket is None:
+            rate, burst = HOST_RATE_LIMITS.get(host, (SCRAPE_RATE_PER_SECOND, SCRAPE_RATE_BURST))
+            bucket = TokenBucket(rate, burst)
+            _buckets[host] = bucket
+        return bucket
+
+
+def _record(host, latency_ms=None, status=None, error=False, retried=False, throttled_ms=0.0):
+    """Update a host's counters"""
+    with _stats_lock:
+        stats = _stats.setdefault(host, {
+            'requests': 0, 'errors': 0, 'retries': 0, 'statuses': {},
+            'total_latency_ms': 0.0, 'max_latency_ms': 0.0, 'throttled_ms': 0.0
+        })
+        if latency_ms is not None:
+            stats['requests'] += 1
+            stats['total_latency_ms'] += latency_ms
+            stats['max_latency_ms'] = max(stats['max_latency_ms'], latency_ms)
+        if status is not None:
+            stats['statuses'][str(status)] = stats['statuses'].get(str(status), 0) + 1
+        if error:
+            stats['errors'] += 1
+        if retried:
+            stats['retries'] += 1
+        stats['throttled_ms'] += throttled_ms
+
+
+def _backoff_delay(attempt, response=None):
+    """Seconds to wait before retry number `attempt` (1-based), honoring Retry-After"""
+    if response is not None:
+        retry_after = response.headers.get('Retry-After')
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), SCRAPE_BACKOFF_MAX)
+    # Full jitter keeps workers that failed together from retrying together
+    return random.uniform(0, min(SCRAPE_BACKOFF_MAX, SCRAPE_BACKOFF_BASE * (2 ** attempt)))
+
+
+def get(url, params=None, headers=None, timeout=10, max_retries=None, deadline=None):
+    """
+    Fetch a URL through the shared session, rate limiter and retry policy
+
+    Parameters:
+    url (str): The URL to fetch
+    params (dict, optional): Query string parameters
+    headers (dict, optional): Headers added to the session defaults
+    timeout (float): Per-attempt timeout in seconds
+    max_retries (int, optional): Retries after the first attempt (SCRAPE_MAX_RETRIES if None)
+    deadline (float, optional): time.monotonic() value after which no new attempt is started
+
+    Returns:
+    requests.Response: The last response (which may be an error status)
+
+    Raises requests.RequestException if every attempt failed without a response, or
+    RateLimited if the host's rate limit would push the request past its deadline.
+    """
+    host = urlsplit(url).hostname or ''
+    max_retries = SCRAPE_MAX_RETRIES if max_retries is None else max_retries
+    session = get_session()
+    bucket = _get_bucket(host)
+
+    attempt = 0
+    while True:
+        max_wait = None if deadline is None else max(0.0, deadline - time.monotonic())
+        waited = bucket.acquire(max_wait)
+        if deadline is not None:
+            timeout = max(0.1, min(timeout, deadline - time.monotonic()))
+
+        started = time.monotonic()
+        response = None
+        error = None
+        try:
+            response = session.get(url, params=params, headers=headers, timeout=timeout)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            error = e
+        latency_ms = (time.monotonic() - started) * 1000
+
+        failed = error is not None or response.status_code in RETRY_STATUSES
+        _record(host, latency_ms=latency_ms, status=response.status_code if response is not None else None,
+                error=failed, throttled_ms=waited * 1000)
+        if not failed:
+            return response
+
+        attempt += 1
+        delay = _backoff_delay(attempt, response)
+        out_of_time = deadline is not None and time.monotonic() + delay >= deadline
+        if attempt > max_retries or out_of_time:
+            if error is not None:
+                raise error
+            return response
+
+        logger.warning(f"Retrying {host} in {delay:.2f}s (attempt {attempt} of {max_retries}): "
+                       f"{error or response.status_code}")
+        _record(host, retried=True)
+        time.sleep(delay)
+
+
+def host_stats():
+    """Return this process's per-host request counters"""
+    with _stats_lock:
+        report = {}
+        for host, stats in _stats.items():
+            host_report = dict(stats)
+            host_report['statuses'] = dict(stats['statuses'])
+            host_report['avg_latency_ms'] = (stats['total_latency_ms'] / stats['requests']
+                                             if stats['requests'] else 0.0)
+            report[host] = host_report
+        return report
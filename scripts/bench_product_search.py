@@ -0,0 +1,174 @@
+"""
+Product Search Benchmark
+
+Seeds a scratch schema with synthetic products and compares the old leading-wildcard ILIKE
+filter against the indexed full-text/trigram search from product_search.py, then checks that
+misspelled and partially typed searches still find the products that were meant.
+
+Usage:
+    DATABASE_URL=postgresql://... python scripts/bench_product_search.py --products 1000000
+
+The scratch schema is dropped at the end unless --keep is given.
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import psycopg2
+from product_search import setup_product_search, build_search_filter
+
+SCHEMA = 'bench_product_search'
+
+ADJECTIVES = ['oak', 'walnut', 'modern', 'rustic', 'velvet', 'linen', 'brass', 'marble',
+              'ceramic', 'leather', 'glass', 'bamboo', 'industrial', 'vintage', 'coastal']
+NOUNS = ['sofa', 'lamp', 'chair', 'table', 'rug', 'mirror', 'shelf', 'faucet', 'vanity',
+         'pendant', 'ottoman', 'dresser', 'headboard', 'stool', 'cabinet', 'sconce']
+CATEGORIES = ['Furniture', 'Lighting', 'Decor', 'Kitchen', 'Bath', 'Bedding', 'Office',
+              'Outdoor', 'Storage', 'Appliances']
+# Real words, multi-word queries, partial words and misspellings the indexes should still catch
+SEARCH_TERMS = ['sofa', 'brass lamp', 'walnut table', 'velvet', 'mirror', 'kitchen',
+                'pendnt', 'cabnet', 'rustic oak shelf', 'bath vanity', 'lamp', 'leathr chair',
+                'lam', 'walnu tab']
+# Misspelled search -> word every result should contain
+MISSPELLINGS = {'pendnt': 'pendant', 'cabnet': 'cabinet', 'leathr chair': 'leather', 'ottomn': 'ottoman',
+                'sconse': 'sconce', 'wallnut': 'walnut', 'headbord': 'headboard', 'vanaty': 'vanity'}
+# Partially typed search -> word every result should contain
+PARTIAL_WORDS = {'lam': 'lamp', 'cabin': 'cabinet', 'walnu tab': 'walnut', 'otto': 'ottoman',
+                 'head': 'headboard', 'cer': 'ceramic'}
+
+
+def seed(cursor, product_count):
+    """Create the scratch tables and fill them with synthetic products"""
+    cursor.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+    cursor.execute(f"CREATE SCHEMA {SCHEMA}")
+    cursor.execute(f"SET search_path TO {SCHEMA}, public")
+    cursor.execute("CREATE TABLE store_categories (id SERIAL PRIMARY KEY, name TEXT)")
+    cursor.execute("CREATE TABLE stores (id SERIAL PRIMARY KEY, name TEXT, logo_url TEXT)")
+    cursor.execute("""
+        CREATE TABLE products (
+            id SERIAL PRIMARY KEY,
+            store_id INTEGER REFERENCES stores(id),
+            category_id INTEGER REFERENCES store_categories(id),
+            name TEXT,
+            description TEXT,
+            price NUMERIC(10, 2)
+        )
+    """)
+    cursor.execute("INSERT INTO store_categories (name) SELECT unnest(%s::text[])", (CATEGORIES,))
+    cursor.execute("INSERT INTO stores (name) VALUES ('Store A'), ('Store B'), ('Store C')")
+    cursor.execute("""
+        INSERT INTO products (store_id, category_id, name, description, price)
+        SELECT 1 + (i %% 3),
+               1 + (i %% %(categories)s),
+               adj[1 + (i * 7) %% array_length(adj, 1)] || ' ' || noun[1 + (i * 13) %% array_length(noun, 1)],
+               'A ' || adj[1 + (i * 11) %% array_length(adj, 1)] || ' finish ' ||
+                   noun[1 + (i * 5) %% array_length(noun, 1)] || ' for any room, item ' || i,
+               round((random() * 900 + 20)::numeric, 2)
+        FROM generate_series(1, %(count)s) AS i,
+             (SELECT %(adjectives)s::text[] AS adj, %(nouns)s::text[] AS noun) words
+    """, {'count': product_count, 'categories': len(CATEGORIES),
+          'adjectives': ADJECTIVES, 'nouns': NOUNS})
+
+
+def percentile(samples, pct):
+    """Return the pct-th percentile of a list of samples"""
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def time_queries(cursor, build_query, iterations):
+    """Run build_query(term) for random terms and return latencies in milliseconds"""
+    latencies = []
+    for _ in range(iterations):
+        query, params = build_query(random.choice(SEARCH_TERMS))
+        started = time.perf_counter()
+        cursor.execute(query, params)
+        cursor.fetchall()
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+def ilike_query(term):
+    """The filter /api/products used before indexed search"""
+    pattern = f"%{term}%"
+    return ("""
+        SELECT p.id, p.name FROM products p
+        JOIN store_categories sc ON sc.id = p.category_id
+        WHERE p.name ILIKE %s OR p.description ILIKE %s OR sc.name ILIKE %s
+        ORDER BY p.price DESC LIMIT 20
+    """, [pattern, pattern, pattern])
+
+
+def indexed_query(term):
+    """The filter used by /api/products and /api/recommended_products now"""
+    search_sql, search_params, rank_sql, rank_params = build_search_filter(term)
+    return (f"""
+        SELECT p.id, p.name FROM products p
+        WHERE {search_sql}
+        ORDER BY {rank_sql} DESC LIMIT 20
+    """, search_params + rank_params)
+
+
+def typo_recall(cursor):
+    """Print how many results of each misspelled or partial search contain the word that was meant"""
+    for term, word in list(MISSPELLINGS.items()) + list(PARTIAL_WORDS.items()):
+        query, params = indexed_query(term)
+        cursor.execute(query, params)
+        names = [row[1] for row in cursor.fetchall()]
+        hits = sum(1 for name in names if word in name)
+        print(f"{term!r:<16} -> {word:<10} {hits}/{len(names)} results")
+
+
+def report(label, latencies):
+    """Print a one-line latency summary"""
+    print(f"{label:<10} n={len(latencies):<5} "
+          f"p50={statistics.median(latencies):8.2f}ms "
+          f"p95={percentile(latencies, 95):8.2f}ms "
+          f"p99={percentile(latencies, 99):8.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark product search at scale")
+    parser.add_argument('--products', type=int, default=1000000)
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--keep', action='store_true', help="keep the scratch schema")
+    args = parser.parse_args()
+
+    db_url = os.environ.get('DATABASE_URL')
+    if not db_url:
+        sys.exit("DATABASE_URL environment variable not set")
+
+    conn = psycopg2.connect(db_url)
+    conn.autocommit = True
+    cursor = conn.cursor()
+    try:
+        print(f"Seeding {args.products} products into schema {SCHEMA}...")
+        started = time.perf_counter()
+        seed(cursor, args.products)
+        setup_product_search(cursor)
+        cursor.execute("ANALYZE products")
+        cursor.execute("ANALYZE store_categories")
+        print(f"Seeded and indexed in {time.perf_counter() - started:.1f}s")
+
+        # Warm the buffer cache so both variants are measured the same way
+        time_queries(cursor, indexed_query, 10)
+        time_queries(cursor, ilike_query, 3)
+
+        report('indexed', time_queries(cursor, indexed_query, args.iterations))
+        report('ilike', time_queries(cursor, ilike_query, max(10, args.iterations // 10)))
+        typo_recall(cursor)
+    finally:
+        if not args.keep:
+            cursor.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+Build the Geo Factor Grid
+
+Compiles the scoring regions in geo_factors.GEO_REGIONS into the lat/lng bitmask grid that
+workers memory-map. Rerun it whenever the regions or GEO_FACTOR_GRID_RESOLUTION change; until
+then workers notice the stale file and build their own copy in memory.
+
+Usage:
+    python scripts/build_geo_factor_grid.py
+    python scripts/build_geo_factor_grid.py --resolution 0.125 --output /srv/glassrain/geo_factor_grid.npy
+"""
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import geo_factors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the geographic factor grid")
+    parser.add_argument('--resolution', type=float, default=geo_factors.GEO_FACTOR_GRID_RESOLUTION,
+                        help="Cell size in degrees (a power of two)")
+    parser.add_argument('--output', default=geo_factors.GEO_FACTOR_GRID_PATH, help="Grid file (.npy)")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    grid, metadata = geo_factors.build_grid(resolution=args.resolution)
+    geo_factors.save_grid(grid, metadata, args.output)
+
+    print(f"Wrote {args.output}: {grid.shape[0]} x {grid.shape[1]} positions, "
+          f"{grid.nbytes / 1024:.0f} KiB, built in {time.perf_counter() - started:.2f}s")
+    for bit, name in geo_factors.FACTOR_NAMES.items():
+        print(f"  {name:<20} {np.count_nonzero(grid & bit)} positions")
+    if args.resolution != geo_factors.GEO_FACTOR_GRID_RESOLUTION:
+        print(f"Set GEO_FACTOR_GRID_RESOLUTION={args.resolution} for workers to use this grid")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""
+Build the Static Assets
+
+Minifies, content-hashes and precompresses (gzip and brotli) everything under static/ into
+static/dist/, with the manifest static_assets.py reads to emit and serve hashed URLs. Run it on
+each deploy before starting the workers. Older hashed files are kept so pages rendered before the
+deploy can still load them; --clean removes them.
+
+Minifying needs rjsmin and rcssmin, and brotli copies need brotli; without them the build still
+hashes the files and writes gzip copies.
+
+Usage:
+    python scripts/build_static_assets.py
+    python scripts/build_static_assets.py --clean --no-minify
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import static_assets
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build hashed, minified and precompressed static assets")
+    parser.add_argument('--static-dir', default=static_assets.STATIC_DIR, help="Static directory to build")
+    parser.add_argument('--no-minify', action='store_true', help="Hash and compress the files without minifying them")
+    parser.add_argument('--clean', action='store_true', help="Remove earlier builds first")
+    args = parser.parse_args()
+
+    build_dir = os.path.join(args.static_dir, static_assets.STATIC_BUILD_SUBDIR)
+    if args.clean and os.path.isdir(build_dir):
+        shutil.rmtree(build_dir)
+
+    started = time.perf_counter()
+    assets = static_assets.build_assets(args.static_dir, minify_assets=not args.no_minify)
+
+    original_bytes = built_bytes = 0
+    sent_bytes = {encoding: 0 for encoding in static_assets.ENCODINGS}
+    for logical, entry in assets.items():
+        original_bytes += os.path.getsize(os.path.join(args.static_dir, logical))
+        built_bytes += entry['size']
+        for encoding in sent_bytes:
+            sent_bytes[encoding] += entry['encodings'].get(encoding, entry['size'])
+
+    print(f"Built {len(assets)} files into {build_dir} in {time.perf_counter() - started:.1f}s")
+    print(f"  original: {original_bytes / 1024:.0f} KiB; minified: {built_bytes / 1024:.0f} KiB; "
+          + "; ".join(f"{encoding}: {size / 1024:.0f} KiB" for encoding, size in sent_bytes.items()))
+
+
+if __name__ == '__main__':
+    main()
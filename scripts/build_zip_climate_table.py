@@ -0,0 +1,45 @@
+"""
+Build the ZIP Climate Table
+
+Compiles data/zip_climate.csv into the data/zip_climate.npz arrays loaded by zip_climate.py.
+Rerun it after editing the CSV (and bump ENERGY_SCORE_VERSION, since stored energy scores
+change with it).
+
+Usage:
+    python scripts/build_zip_climate_table.py
+    python scripts/build_zip_climate_table.py --csv /path/to/zip_climate.csv --output /path/to/zip_climate.npz
+"""
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import zip_climate
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the ZIP climate table from a CSV")
+    parser.add_argument('--csv', default=zip_climate.ZIP_CLIMATE_CSV_PATH, help="Source CSV")
+    parser.add_argument('--output', default=zip_climate.ZIP_CLIMATE_TABLE_PATH, help="Table file (.npz)")
+    parser.add_argument('--benchmark', type=int, default=1000000, help="Random ZIPs to score as a timing check (0 to skip)")
+    args = parser.parse_args()
+
+    prefix_scores, zip_scores = zip_climate.build_table(args.csv)
+    zip_climate.save_table(prefix_scores, zip_scores, args.output)
+    print(f"Wrote {args.output}: {np.count_nonzero(prefix_scores)} scored prefixes, "
+          f"{np.count_nonzero(zip_scores != zip_climate.NO_OVERRIDE)} 5-digit overrides")
+
+    if args.benchmark:
+        table = zip_climate.ZipClimateTable(prefix_scores, zip_scores)
+        zip_codes = np.char.zfill(np.random.randint(0, 100000, args.benchmark).astype(str), 5)
+        started = time.perf_counter()
+        table.scores_for(zip_codes)
+        print(f"Scored {args.benchmark} ZIPs in {time.perf_counter() - started:.3f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""
+Cache Check
+
+Runs the server-side cache against LocalRedis, the in-process stand-in for the shared backend,
+with two Cache instances playing two workers that share it. Checks that values computed by one
+worker are served to the other, that a worker's local copy never outlives the shared entry's TTL,
+that non-JSON values the application caches round-trip, and that a payload the cache did not
+write (such as a pickle) is treated as a miss instead of being run. Needs no Redis server.
+
+Usage:
+    python scripts/check_cache.py
+"""
+
+import os
+import sys
+import time
+import pickle
+import decimal
+import logging
+import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cache import Cache, LRUCache, LocalRedis, RedisCache
+
+
+def make_workers(local_max_ttl=30):
+    """Two worker caches sharing one LocalRedis"""
+    client = LocalRedis()
+    workers = [Cache(LRUCache(), RedisCache(client, prefix='check:'), local_max_ttl=local_max_ttl)
+               for _ in range(2)]
+    return client, workers
+
+
+def check_shared_hit():
+    _, (first, second) = make_workers()
+    first.set('payload', {'id': 1, 'tags': ['a', 'b']}, ttl=60)
+    return second.get('payload') == {'id': 1, 'tags': ['a', 'b']}
+
+
+def check_local_copy_keeps_shared_ttl():
+    # A short-lived marker (like a scrape backoff) must expire in every worker on time
+    _, (first, second) = make_workers(local_max_ttl=30)
+    first.set('backoff', True, ttl=1)
+    if second.get('backoff') is not True:
+        return False
+    time.sleep(1.2)
+    return second.get('backoff') is None and first.get('backoff') is None
+
+
+def check_local_copy_capped():
+    # A long-lived entry is kept locally for at most local_max_ttl, so deletes reach every worker
+    _, (first, second) = make_workers(local_max_ttl=1)
+    first.set('listing', [1, 2, 3], ttl=3600)
+    second.get('listing')
+    first.delete('listing')
+    time.sleep(1.2)
+    return second.get('listing') is None
+
+
+def check_round_trip():
+    _, (first, second) = make_workers()
+    value = {
+        'created_at': datetime.datetime(2024, 5, 1, 12, 30, 15, 250000),
+        'sold_on': datetime.date(2023, 11, 2),
+        'price': decimal.Decimal('350000.50'),
+        'body': b'\x00\x01binary',
+        'pair': ('text/html', 2)
+    }
+    first.set('typed', value, ttl=60)
+    return second.get('typed') == dict(value, pair=['text/html', 2])
+
+
+def check_foreign_payload_ignored():
+    client, (first, _) = make_workers()
+    client.set('check:evil', pickle.dumps({'not': 'json'}), ex=60)
+    return first.get('evil', 'miss') == 'miss'
+
+
+CHECKS = [
+    ('values are shared between workers', check_shared_hit),
+    ('local copies expire with the shared entry', check_local_copy_keeps_shared_ttl),
+    ('local copies are capped at local_max_ttl', check_local_copy_capped),
+    ('datetimes, dates, Decimals and bytes round-trip', check_round_trip),
+    ('payloads that are not the cache\'s JSON are misses', check_foreign_payload_ignored),
+]
+
+
+def main():
+    logging.basicConfig(level=logging.ERROR)
+    failures = 0
+    for description, check in CHECKS:
+        if not check():
+            print(f"FAILED: {description}")
+            failures += 1
+
+    if failures:
+        sys.exit(1)
+    print(f"All {len(CHECKS)} cache checks passed")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""
+Energy Score Parity Check
+
+Generates a randomized set of properties (with missing fields and values on every rule
+boundary), scores them with the scalar functions in property_data_service.py and with the batch
+scorer in energy_scoring.py, and fails if any score differs. Also reports the time each takes.
+
+Usage:
+    python scripts/check_energy_score_parity.py --properties 200000 --seed 7
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from property_data_service import (calculate_energy_score, calculate_climate_score, calculate_solar_exposure,
+                                   calculate_weather_resilience, calculate_zip_climate_score)
+from energy_scoring import SCORING_YEAR, score_properties, columns_from_properties
+
+# Values on and around the thresholds the scoring rules compare against
+LAT_EDGES = [-45, -35, -23.5, 0, 23.5, 25, 30, 31, 32, 35, 36, 37, 40, 42, 43, 45, 47, 49]
+LNG_EDGES = [-125, -120, -115, -105, -100, -98, -90, -88, -82, -80, -75, -65, 0]
+AGE_EDGES = [5, 15, 30, 50, 70, 100]
+SQFT_EDGES = [1000, 2000, 3000, 4000]
+ORIENTATIONS = ['south', 'South', 'NORTH', 'north', 'east', 'west', '']
+ZIP_CODES = ['02134', '10001', '20500', '33101', '48201', '60601', '73301', '80202', '94103',
+             '98101', '9810', '', 'A1234', ' 1234', '123456789', '85004-1234', '99501', '\uff19\uff18101']
+
+
+def _maybe(rng, value, missing_rate=0.15):
+    """Return the value, or occasionally a missing value"""
+    return rng.choice([None, '', 0]) if rng.random() < missing_rate else value
+
+
+def _near(rng, edges, spread):
+    """A value exactly on a threshold, or near one"""
+    edge = rng.choice(edges)
+    return edge if rng.random() < 0.3 else edge + rng.uniform(-spread, spread)
+
+
+def random_property(rng):
+    """Build one randomized property dict in the shape calculate_energy_score() reads"""
+    prop = {}
+    year = SCORING_YEAR - _near(rng, AGE_EDGES, 3) if rng.random() < 0.5 else rng.randint(1850, 2026)
+    prop['year_built'] = _maybe(rng, str(int(year)))
+    sqft = int(_near(rng, SQFT_EDGES, 50)) if rng.random() < 0.5 else rng.randint(400, 8000)
+    prop['square_feet'] = _maybe(rng, f"{sqft:,}" if rng.random() < 0.5 else str(sqft))
+    if rng.random() < 0.8:
+        prop['latitude'] = _near(rng, LAT_EDGES, 1.5) if rng.random() < 0.5 else rng.uniform(-60, 70)
+        prop['longitude'] = _near(rng, LNG_EDGES, 1.5) if rng.random() < 0.5 else rng.uniform(-170, 20)
+    prop['zip_code'] = rng.choice(ZIP_CODES) if rng.random() < 0.5 else f"{rng.randint(0, 99999):05d}"
+    if rng.random() < 0.6:
+        prop['orientation'] = rng.choice(ORIENTATIONS)
+    if rng.random() < 0.5:
+        prop['window_sqft'] = _maybe(rng, round(rng.uniform(0, 0.3) * max(sqft, 1), 2))
+    return prop
+
+
+def scalar_scores(prop):
+    """Score one property with the scalar functions"""
+    has_location = prop.get('latitude') is not None and prop.get('longitude') is not None
+    lat, lng = prop.get('latitude'), prop.get('longitude')
+    return {
+        'energy_score': calculate_energy_score(prop),
+        'climate_score': calculate_climate_score(lat, lng) if has_location else 0,
+        'solar_exposure': calculate_solar_exposure(lat, lng, prop) if has_location else 0,
+        'weather_resilience': calculate_weather_resilience(lat, lng, prop) if has_location else 0,
+        'zip_climate_score': 0 if has_location or not prop.get('zip_code') else calculate_zip_climate_score(prop['zip_code'])
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check batch energy scores against the scalar functions")
+    parser.add_argument('--properties', type=int, default=100000, help="Number of random properties")
+    parser.add_argument('--seed', type=int, default=1, help="Random seed")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    properties = [random_property(rng) for _ in range(args.properties)]
+
+    started = time.perf_counter()
+    expected = [scalar_scores(prop) for prop in properties]
+    scalar_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    columns = columns_from_properties(properties)
+    columns_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    actual = score_properties(**columns)
+    batch_seconds = time.perf_counter() - started
+
+    mismatches = 0
+    for index, scores in enumerate(expected):
+        for name, value in scores.items():
+            if int(actual[name][index]) != value:
+                mismatches += 1
+                if mismatches <= 20:
+                    print(f"Mismatch in {name} for {properties[index]}: scalar {value}, batch {int(actual[name][index])}")
+
+    print(f"Scalar: {scalar_seconds:.2f}s; batch: {batch_seconds:.3f}s "
+          f"(+{columns_seconds:.2f}s building columns) for {args.properties} properties")
+    if mismatches:
+        print(f"{mismatches} mismatched scores")
+        sys.exit(1)
+    print(f"All {args.properties * len(expected[0]) if expected else 0} scores match")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""
+Ingest Row Check
+
+Runs a set of malformed input records (numbers written as "3.0" or "$350,000.00", unparseable
+fields, bad coordinates) through the same normalize/enrich/score path as
+scripts/ingest_addresses.py, without a database or any scraping. Fails if a record raises
+instead of being coerced, nulled or skipped.
+
+Usage:
+    python scripts/check_ingest_rows.py
+"""
+
+import os
+import sys
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from ingest_addresses import prepare_batch
+
+BASE = {'street': '1 Main St', 'city': 'Seattle', 'state': 'WA', 'zip': '98101', 'lat': '47.6', 'lng': '-122.3'}
+
+# (record overrides, expected (year_built, square_feet, bedrooms, bathrooms, estimated_value),
+#  or None if the record should be skipped)
+CASES = [
+    ({'year_built': '1990', 'square_feet': '2300', 'bedrooms': '3', 'bathrooms': '2', 'estimated_value': '350000'},
+     (1990, 2300, 3, 2.0, 350000)),
+    ({'year_built': '1990.0', 'square_feet': '2,300', 'bedrooms': '3.0', 'bathrooms': '2.5',
+      'estimated_value': '350000.00'},
+     (1990, 2300, 3, 2.5, 350000)),
+    ({'estimated_value': '$1,250,000.00', 'square_feet': '2300.5'}, (None, 2300, None, None, 1250000)),
+    ({'year_built': 'unknown', 'bedrooms': 'three', 'bathrooms': 'n/a', 'estimated_value': '350000'},
+     (None, None, None, None, 350000)),
+    ({'square_feet': 'nan', 'estimated_value': 'inf', 'bedrooms': '4'}, (None, None, 4, None, None)),
+    ({'lat': 'north', 'bedrooms': '3'}, None),
+    ({'lng': 'inf', 'bedrooms': '3'}, None),
+]
+
+
+def main():
+    logging.basicConfig(level=logging.ERROR)
+    batch = [dict(BASE, **overrides) for overrides, _ in CASES]
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        addresses, property_rows = prepare_batch(executor, batch, 1, scrape=False, deadline_seconds=1)
+
+    kept = [expected for _, expected in CASES if expected is not None]
+    failures = 0
+    if len(addresses) != len(kept):
+        print(f"Expected {len(kept)} addresses to be kept, got {len(addresses)}")
+        failures += 1
+    details = {index: values[:5] for index, values, _ in property_rows}
+    for index, expected in enumerate(kept):
+        actual = details.get(index)
+        if actual != expected:
+            print(f"Row {index + 1}: expected {expected}, got {actual}")
+            failures += 1
+
+    if failures:
+        sys.exit(1)
+    print(f"All {len(CASES)} records handled: {len(addresses)} kept, {len(CASES) - len(addresses)} skipped")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,289 @@
+"""
+Bulk Address Ingest
+
+Streams a CSV or NDJSON file of addresses into the database. Each batch is enriched concurrently
+from the property data sources, scored, and written to `addresses` and `property_details` with
+COPY in one transaction. The number of input rows committed is stored in `address_ingest_runs`
+inside the same transaction, so an interrupted import resumes where it stopped.
+
+Input columns (CSV header or NDJSON keys): street, city, state, zip, country, lat, lng,
+full_address. Optional year_built, square_feet, bedrooms, bathrooms and estimated_value columns
+fill fields the scrapers could not find.
+
+Usage:
+    DATABASE_URL=postgresql://... python scripts/ingest_addresses.py homes.csv --workers 8
+    DATABASE_URL=postgresql://... python scripts/ingest_addresses.py homes.ndjson --no-enrich
+"""
+
+import os
+import io
+import sys
+import csv
+import json
+import math
+import time
+import logging
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import psycopg2
+from property_data_service import prepare_property_details, ENERGY_SCORE_VERSION, ENERGY_SCORE_INPUTS_SQL
+import property_sources
+from property_sources import fetch_property_data, registered_sources
+
+logger = logging.getLogger('ingest_addresses')
+
+ADDRESS_FIELDS = ['street', 'city', 'state', 'zip', 'country', 'lat', 'lng', 'full_address']
+PROPERTY_FIELDS = ['year_built', 'square_feet', 'bedrooms', 'bathrooms', 'estimated_value']
+
+
+def read_records(path, input_format):
+    """Yield address records from a CSV or NDJSON file, one at a time"""
+    with open(path, newline='', encoding='utf-8') as f:
+        if input_format == 'csv':
+            for row in csv.DictReader(f):
+                yield row
+        else:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+
+def batched(records, batch_size):
+    """Group an iterator of records into lists of batch_size"""
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def normalize_address(record):
+    """Build an address row from an input record"""
+    address = {field: (record.get(field) or None) for field in ADDRESS_FIELDS}
+    address['country'] = address['country'] or 'USA'
+    for field in ['lat', 'lng']:
+        address[field] = float(address[field]) if address[field] not in (None, '') else 0
+        if not math.isfinite(address[field]):
+            raise ValueError(f"{field} must be a finite number, not {record.get(field)!r}")
+    if not address['full_address']:
+        address['full_address'] = f"{address['street']}, {address['city']}, {address['state']} {address['zip']}, {address['country']}"
+    return address
+
+
+def enrich(record, address, scrape, deadline_seconds):
+    """Scrape one address and fill remaining fields from the input record"""
+    property_data = {}
+    provenance = {}
+    if scrape:
+        scraped = fetch_property_data(address, deadline_seconds)
+        if scraped:
+            provenance = scraped.pop('provenance')
+            scraped.pop('source', None)
+            property_data.update(scraped)
+    for field in PROPERTY_FIELDS:
+        if field not in property_data and record.get(field) not in (None, ''):
+            property_data[field] = str(record[field])
+            provenance[field] = 'import'
+    if not property_data:
+        return None
+    property_data['source'] = json.dumps(provenance, sort_keys=True, separators=(',', ':'))
+    return property_data
+
+
+def prepare_batch(executor, batch, first_row, scrape, deadline_seconds):
+    """
+    Normalize, enrich and score one batch of input records
+
+    Parameters:
+    executor: The enrichment worker pool
+    batch (list): Input records
+    first_row (int): Input row number of the batch's first record, for log messages
+    scrape (bool): Query the property data sources
+    deadline_seconds (float): Enrichment deadline per address
+
+    Returns:
+    tuple: (addresses, property_rows) for write_batch(). Records that cannot be normalized are
+           logged and skipped; malformed property fields are stored as NULL.
+    """
+    records = []
+    addresses = []
+    for offset, record in enumerate(batch):
+        try:
+            address = normalize_address(record)
+        except (TypeError, ValueError) as e:
+            logger.warning(f"Skipping input row {first_row + offset}: {str(e)}")
+            continue
+        records.append(record)
+        addresses.append(address)
+
+    results = executor.map(lambda pair: enrich(pair[0], pair[1], scrape, deadline_seconds),
+                           zip(records, addresses))
+    property_rows = []
+    for index, property_data in enumerate(results):
+        if property_data:
+            property_rows.append((index, prepare_property_details(property_data, addresses[index]),
+                                  property_data['source']))
+    return addresses, property_rows
+
+
+def _copy_value(value):
+    """Format one value for COPY's text format"""
+    if value is None:
+        return '\\N'
+    return (str(value).replace('\\', '\\\\').replace('\t', '\\t')
+            .replace('\n', '\\n').replace('\r', '\\r'))
+
+
+def copy_rows(cursor, table, columns, rows):
+    """Write rows to a table with COPY ... FROM STDIN"""
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write('\t'.join(_copy_value(value) for value in row))
+        buffer.write('\n')
+    buffer.seek(0)
+    cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", buffer)
+
+
+def setup_run(conn, run_name):
+    """Create the checkpoint table and return how many rows this run already committed"""
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS address_ingest_runs (
+                name TEXT PRIMARY KEY,
+                rows_committed BIGINT NOT NULL DEFAULT 0,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        cursor.execute("""
+            INSERT INTO address_ingest_runs (name) VALUES (%s)
+            ON CONFLICT (name) DO NOTHING
+        """, (run_name,))
+        cursor.execute("SELECT rows_committed FROM address_ingest_runs WHERE name = %s", (run_name,))
+        rows_committed = cursor.fetchone()[0]
+    conn.commit()
+    return rows_committed
+
+
+def write_batch(conn, run_name, addresses, property_rows, rows_committed):
+    """Write one batch and advance the checkpoint, all in one transaction"""
+    with conn.cursor() as cursor:
+        # COPY cannot return generated keys, so reserve the ids up front
+        cursor.execute(
+            "SELECT nextval(pg_get_serial_sequence('addresses', 'id')) FROM generate_series(1, %s)",
+            (len(addresses),)
+        )
+        ids = [row[0] for row in cursor.fetchall()]
+
+        copy_rows(cursor, 'addresses', ['id'] + ADDRESS_FIELDS, [
+            [address_id] + [address[field] for field in ADDRESS_FIELDS]
+            for address_id, address in zip(ids, addresses)
+        ])
+
+        details = [
+            [ids[index]] + list(values) + [source, ENERGY_SCORE_VERSION]
+            for index, values, source in property_rows
+        ]
+        if details:
+            copy_rows(cursor, 'property_details', [
+                'address_id', 'year_built', 'square_feet', 'bedrooms', 'bathrooms',
+                'estimated_value', 'energy_score', 'property_age_group', 'data_source',
+                'energy_score_version'
+            ], details)
+            # Record the inputs each score was computed from, so the recompute job skips these rows
+            cursor.execute(f"""
+                UPDATE property_details pd
+                SET energy_score_inputs = {ENERGY_SCORE_INPUTS_SQL.format(year_built='pd.year_built', square_feet='pd.square_feet')}
+                FROM addresses a
+                WHERE a.id = pd.address_id AND pd.address_id = ANY(%s)
+            """, ([row[0] for row in details],))
+
+        cursor.execute("""
+            UPDATE address_ingest_runs
+            SET rows_committed = %s, updated_at = CURRENT_TIMESTAMP
+            WHERE name = %s
+        """, (rows_committed, run_name))
+    conn.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import addresses with property enrichment")
+    parser.add_argument('path', help="CSV or NDJSON file of addresses")
+    parser.add_argument('--format', choices=['csv', 'ndjson'], help="Input format (default: from the file extension)")
+    parser.add_argument('--batch-size', type=int, default=1000, help="Rows per COPY transaction")
+    parser.add_argument('--workers', type=int, default=8, help="Concurrent enrichment lookups")
+    parser.add_argument('--deadline', type=float, default=15, help="Seconds allowed per address lookup")
+    parser.add_argument('--no-enrich', action='store_true', help="Skip scraping; only use fields from the input")
+    parser.add_argument('--run-name', help="Checkpoint name (default: the input file's absolute path)")
+    parser.add_argument('--restart', action='store_true', help="Ignore the checkpoint and start from the first row")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    db_url = os.environ.get('DATABASE_URL')
+    if not db_url:
+        sys.exit("DATABASE_URL is required")
+
+    # Every enrichment worker runs all sources at once; size the shared source pool to match
+    property_sources.PROPERTY_FETCH_THREADS = max(property_sources.PROPERTY_FETCH_THREADS,
+                                                  args.workers * len(registered_sources()))
+
+    input_format = args.format or ('ndjson' if args.path.endswith(('.ndjson', '.jsonl')) else 'csv')
+    run_name = args.run_name or os.path.abspath(args.path)
+
+    conn = psycopg2.connect(db_url)
+    try:
+        if args.restart:
+            with conn.cursor() as cursor:
+                cursor.execute("DELETE FROM address_ingest_runs WHERE name = %s", (run_name,))
+            conn.commit()
+        skip = setup_run(conn, run_name)
+        if skip:
+            logger.info(f"Resuming {run_name} after {skip} committed rows")
+
+        records = read_records(args.path, input_format)
+        for _ in range(skip):
+            if next(records, None) is None:
+                break
+
+        rows_committed = skip
+        imported = 0
+        enriched = 0
+        started = time.monotonic()
+
+        with ThreadPoolExecutor(max_workers=max(1, args.workers)) as executor:
+            for batch in batched(records, args.batch_size):
+                batch_started = time.monotonic()
+                addresses, property_rows = prepare_batch(executor, batch, rows_committed + 1,
+                                                         not args.no_enrich, args.deadline)
+
+                # Skipped rows count as consumed, so a resumed run does not read them again
+                rows_committed += len(batch)
+                write_batch(conn, run_name, addresses, property_rows, rows_committed)
+                imported += len(addresses)
+                enriched += len(property_rows)
+
+                elapsed = time.monotonic() - started
+                logger.info(
+                    f"Committed {rows_committed} rows ({len(property_rows)}/{len(batch)} enriched) "
+                    f"in {time.monotonic() - batch_started:.1f}s; {imported / elapsed:.1f} rows/s overall"
+                )
+
+        logger.info(f"Done: imported {imported} addresses, {enriched} with property details, "
+                    f"in {time.monotonic() - started:.1f}s")
+    except KeyboardInterrupt:
+        conn.rollback()
+        logger.info("Interrupted; rerun the same command to resume from the last committed batch")
+        sys.exit(1)
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,231 @@
+"""
+Energy Score Recompute
+
+Rescores stored properties whose energy score is out of date: rows scored with an older
+ENERGY_SCORE_VERSION (or never versioned), and rows whose inputs (year built, square footage,
+or the address's location and ZIP) changed since they were scored. Only those rows are read,
+in id order, one keyset-paged chunk at a time; each read is its own short transaction, so the
+run never holds a snapshot open (and never holds back vacuum) while it works through the
+backlog. Each chunk is scored with the vectorized scorer and written back with one
+UPDATE ... FROM (VALUES ...).
+
+The last id written is checkpointed in `energy_score_recompute_runs` in the same transaction as
+each chunk, so an interrupted run resumes where it stopped. Writes use a short lock timeout and
+are paced (--pause, --max-rate) so the job yields to the application's own queries; --max-rows
+splits a large backlog into several short runs.
+
+Usage:
+    DATABASE_URL=postgresql://... python scripts/recompute_energy_scores.py
+    DATABASE_URL=postgresql://... python scripts/recompute_energy_scores.py --max-rate 2000 --max-rows 500000
+"""
+
+import os
+import sys
+import time
+import logging
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import psycopg2
+import psycopg2.errors
+from psycopg2.extras import execute_values
+import cache
+from energy_scoring import score_properties, columns_from_properties
+from property_data_service import (ENERGY_SCORE_VERSION, ENERGY_SCORE_INPUTS_SQL, energy_score_inputs,
+                                   _property_data_cache_key)
+
+logger = logging.getLogger('recompute_energy_scores')
+
+STORED_INPUTS_SQL = ENERGY_SCORE_INPUTS_SQL.format(year_built='pd.year_built', square_feet='pd.square_feet')
+
+# Attempts at writing a chunk before giving up when it keeps hitting the lock timeout
+WRITE_ATTEMPTS = 5
+
+
+def setup_run(conn):
+    """Create the checkpoint table and return the last id rescored for this version"""
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS energy_score_recompute_runs (
+                version INTEGER PRIMARY KEY,
+                last_id BIGINT NOT NULL DEFAULT 0,
+                rows_rescored BIGINT NOT NULL DEFAULT 0,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        cursor.execute("""
+            INSERT INTO energy_score_recompute_runs (version) VALUES (%s)
+            ON CONFLICT (version) DO NOTHING
+        """, (ENERGY_SCORE_VERSION,))
+        cursor.execute("SELECT last_id FROM energy_score_recompute_runs WHERE version = %s", (ENERGY_SCORE_VERSION,))
+        last_id = cursor.fetchone()[0]
+    conn.commit()
+    return last_id
+
+
+def read_chunk(conn, last_id, chunk_size):
+    """
+    Read the next chunk of stale rows after last_id
+
+    Parameters:
+    conn: The reader connection
+    last_id (int): The last property_details id already handled
+    chunk_size (int): The most rows to read
+
+    Returns:
+    list: (id, year_built, square_feet, lat, lng, zip, inputs) rows in id order
+    """
+    with conn.cursor() as cursor:
+        cursor.execute(f"""
+            SELECT pd.id, pd.year_built, pd.square_feet, a.lat, a.lng, a.zip, {STORED_INPUTS_SQL}
+            FROM property_details pd
+            JOIN addresses a ON a.id = pd.address_id
+            WHERE pd.id > %s
+              AND (pd.energy_score_version IS DISTINCT FROM %s
+                   OR pd.energy_score_inputs IS DISTINCT FROM {STORED_INPUTS_SQL})
+            ORDER BY pd.id
+            LIMIT %s
+        """, (last_id, ENERGY_SCORE_VERSION, chunk_size))
+        return cursor.fetchall()
+
+
+def score_chunk(rows):
+    """
+    Score a chunk of streamed rows
+
+    Parameters:
+    rows (list): (id, year_built, square_feet, lat, lng, zip, inputs) tuples
+
+    Returns:
+    list: (id, energy_score, inputs) tuples
+    """
+    # Read the columns exactly as store_property_data() does, so both paths give the same score
+    properties = [energy_score_inputs(year_built, square_feet, lat, lng, zip_code)
+                  for _, year_built, square_feet, lat, lng, zip_code, _ in rows]
+    scores = score_properties(**columns_from_properties(properties))['energy_score']
+    ids = [row[0] for row in rows]
+    inputs = [row[6] for row in rows]
+    return [(row_id, int(score), row_inputs) for row_id, score, row_inputs in zip(ids, scores, inputs)]
+
+
+def write_chunk(conn, scored, last_id):
+    """
+    Write a chunk of scores and advance the checkpoint in one transaction
+
+    Returns:
+    list: The address ids whose scores were written
+    """
+    with conn.cursor() as cursor:
+        # Rows whose inputs changed again since they were read are left for the next run
+        updated = execute_values(cursor, f"""
+            UPDATE property_details pd
+            SET energy_score = v.energy_score,
+                energy_score_version = {int(ENERGY_SCORE_VERSION)},
+                energy_score_inputs = v.inputs
+            FROM (VALUES %s) AS v(id, energy_score, inputs), addresses a
+            WHERE pd.id = v.id AND a.id = pd.address_id AND {STORED_INPUTS_SQL} = v.inputs
+            RETURNING pd.address_id
+        """, scored, template='(%s::integer, %s::integer, %s::text)', page_size=len(scored), fetch=True)
+        cursor.execute("""
+            UPDATE energy_score_recompute_runs
+            SET last_id = %s, rows_rescored = rows_rescored + %s, updated_at = CURRENT_TIMESTAMP
+            WHERE version = %s
+        """, (last_id, len(updated), ENERGY_SCORE_VERSION))
+    conn.commit()
+    return [row[0] for row in updated]
+
+
+def write_with_retry(conn, scored, last_id):
+    """Write a chunk, backing off while it conflicts with locks held by the application"""
+    for attempt in range(1, WRITE_ATTEMPTS + 1):
+        try:
+            return write_chunk(conn, scored, last_id)
+        except psycopg2.errors.LockNotAvailable:
+            conn.rollback()
+            delay = min(30, 2 ** attempt)
+            logger.warning(f"Chunk ending at id {last_id} hit the lock timeout; retrying in {delay}s")
+            time.sleep(delay)
+    raise RuntimeError(f"Chunk ending at id {last_id} still locked after {WRITE_ATTEMPTS} attempts")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rescore properties with stale energy scores")
+    parser.add_argument('--chunk-size', type=int, default=1000, help="Rows scored and written per transaction")
+    parser.add_argument('--pause', type=float, default=0.1, help="Seconds to sleep between chunks")
+    parser.add_argument('--max-rate', type=float, default=None, help="Upper bound on rows written per second")
+    parser.add_argument('--max-rows', type=int, default=None, help="Stop after this many rows; the next run resumes")
+    parser.add_argument('--lock-timeout', type=int, default=2000, help="Milliseconds a write may wait for a row lock")
+    parser.add_argument('--restart', action='store_true', help="Ignore the checkpoint and scan from the first row")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    db_url = os.environ.get('DATABASE_URL')
+    if not db_url:
+        sys.exit("DATABASE_URL is required")
+
+    reader = psycopg2.connect(db_url, application_name='recompute_energy_scores')
+    writer = psycopg2.connect(db_url, application_name='recompute_energy_scores')
+    # Each chunk is read in its own transaction
+    reader.set_session(readonly=True, autocommit=True)
+    try:
+        with writer.cursor() as cursor:
+            cursor.execute("SET lock_timeout = %s", (f"{args.lock_timeout}ms",))
+        writer.commit()
+        if args.restart:
+            with writer.cursor() as cursor:
+                cursor.execute("DELETE FROM energy_score_recompute_runs WHERE version = %s", (ENERGY_SCORE_VERSION,))
+            writer.commit()
+        last_id = setup_run(writer)
+        if last_id:
+            logger.info(f"Resuming version {ENERGY_SCORE_VERSION} rescoring after id {last_id}")
+
+        rescored = 0
+        streamed = 0
+        started = time.monotonic()
+        finished = True
+
+        while True:
+            rows = read_chunk(reader, last_id, args.chunk_size)
+            if not rows:
+                break
+            chunk_started = time.monotonic()
+            last_id = rows[-1][0]
+            address_ids = write_with_retry(writer, score_chunk(rows), last_id)
+            for address_id in address_ids:
+                cache.delete(_property_data_cache_key(address_id))
+            streamed += len(rows)
+            rescored += len(address_ids)
+
+            logger.info(f"Rescored {rescored} rows (through id {last_id}); "
+                        f"{streamed / (time.monotonic() - started):.0f} rows/s")
+            if args.max_rows and streamed >= args.max_rows:
+                finished = False
+                break
+
+            pause = args.pause
+            if args.max_rate:
+                pause = max(pause, len(rows) / args.max_rate - (time.monotonic() - chunk_started))
+            time.sleep(pause)
+
+        if finished:
+            # Later input changes can land below the checkpoint, so the next run scans from the start
+            with writer.cursor() as cursor:
+                cursor.execute("UPDATE energy_score_recompute_runs SET last_id = 0 WHERE version = %s",
+                               (ENERGY_SCORE_VERSION,))
+            writer.commit()
+            logger.info(f"Done: rescored {rescored} of {streamed} stale rows in {time.monotonic() - started:.1f}s")
+        else:
+            logger.info(f"Stopped after {streamed} rows at id {last_id}; rerun to continue")
+    except KeyboardInterrupt:
+        writer.rollback()
+        logger.info("Interrupted; rerun the same command to resume from the last committed chunk")
+        sys.exit(1)
+    finally:
+        reader.close()
+        writer.close()
+
+
+if __name__ == '__main__':
+    main()
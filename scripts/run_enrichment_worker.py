@@ -0,0 +1,36 @@
+"""
+Enrichment Worker
+
+Runs queued enrichment jobs (property data scraping) outside the web processes.
+
+Usage:
+    DATABASE_URL=postgresql://... ENRICHMENT_WORKERS=0 python scripts/run_enrichment_worker.py --threads 4
+
+Set ENRICHMENT_WORKERS=0 for the web processes when this worker handles the queue.
+"""
+
+import os
+import sys
+import logging
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import enrichment_jobs
+import property_data_service  # registers the property data job handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run queued enrichment jobs")
+    parser.add_argument('--threads', type=int, default=2, help="Concurrent jobs")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    if args.threads > 1:
+        enrichment_jobs.ensure_workers_started(args.threads - 1)
+    logging.getLogger(__name__).info(f"Enrichment worker running with {args.threads} threads")
+    enrichment_jobs.run_worker()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,189 @@
+"""
+Zillow Parser Fixtures
+
+Records Zillow property pages as fixtures and replays them offline, so the parser can be checked
+and benchmarked without the network.
+
+    record  Fetch the pages for some addresses (through the scraping client) and save each one
+            as <name>.html with a <name>.json file holding its address and URL
+    replay  Parse every fixture with the full-document parse and the fast (strained) parse, and
+            fail if the extracted fields differ from each other or from the recorded fields
+    bench   Report parse time and memory allocated per page for each parse path and parser backend
+
+Usage:
+    python scripts/zillow_fixtures.py record "123 Main St, Springfield, IL 62701" --zip 62701
+    python scripts/zillow_fixtures.py replay
+    python scripts/zillow_fixtures.py bench --iterations 20 --parser html.parser --parser lxml
+
+scripts/fixtures/zillow/ holds anonymized pages (addresses, listing ids and prices replaced) so
+replay and bench run offline out of the box, including a page whose only data is JSON-LD.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import logging
+import argparse
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import scraping_client
+from property_data_service import zillow_url, parse_zillow_page
+
+logger = logging.getLogger('zillow_fixtures')
+
+DEFAULT_FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'zillow')
+
+
+def fixture_name(address):
+    """Build a file name for an address"""
+    return re.sub(r'[^a-z0-9]+', '-', address.lower()).strip('-')
+
+
+def load_fixtures(fixture_dir):
+    """Yield (name, address, content, recorded fields or None) for every recorded page"""
+    for filename in sorted(os.listdir(fixture_dir)):
+        if not filename.endswith('.html'):
+            continue
+        name = filename[:-len('.html')]
+        meta_path = os.path.join(fixture_dir, f"{name}.json")
+        meta = {}
+        if os.path.exists(meta_path):
+            with open(meta_path, encoding='utf-8') as f:
+                meta = json.load(f)
+        with open(os.path.join(fixture_dir, filename), 'rb') as f:
+            yield name, meta.get('address', name), f.read(), meta.get('fields')
+
+
+def record(args):
+    os.makedirs(args.dir, exist_ok=True)
+    failures = 0
+    for address in args.addresses:
+        url = zillow_url(address, args.zip)
+        try:
+            response = scraping_client.get(url, headers={'Upgrade-Insecure-Requests': '1'}, timeout=15)
+        except Exception as e:
+            logger.error(f"Failed to fetch {url}: {str(e)}")
+            failures += 1
+            continue
+        if response.status_code != 200:
+            logger.error(f"Failed to fetch {url}: Status {response.status_code}")
+            failures += 1
+            continue
+
+        name = fixture_name(address)
+        with open(os.path.join(args.dir, f"{name}.html"), 'wb') as f:
+            f.write(response.content)
+        with open(os.path.join(args.dir, f"{name}.json"), 'w', encoding='utf-8') as f:
+            json.dump({
+                'address': address,
+                'url': url,
+                'recorded_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+                'fields': parse_zillow_page(response.content, address, full_parse=True)
+            }, f, indent=2, sort_keys=True)
+        logger.info(f"Recorded {name} ({len(response.content)} bytes)")
+    return 1 if failures else 0
+
+
+def replay(args):
+    count = 0
+    mismatches = 0
+    for name, address, content, recorded in load_fixtures(args.dir):
+        count += 1
+        expected = parse_zillow_page(content, address, full_parse=True, parser=args.parser)
+        actual = parse_zillow_page(content, address, parser=args.parser)
+        if actual != expected:
+            mismatches += 1
+            logger.error(f"{name}: fast parse returned {actual}, full parse returned {expected}")
+        elif recorded is not None and expected != recorded:
+            # The fields saved when the page was recorded catch changes to both parse paths
+            mismatches += 1
+            logger.error(f"{name}: parser returned {expected}, recorded fields are {recorded}")
+        else:
+            logger.info(f"{name}: {len(expected) - 2} fields match")
+    if not count:
+        logger.error(f"No fixtures in {args.dir}; record some first")
+        return 1
+    logger.info(f"{count - mismatches}/{count} fixtures match")
+    return 1 if mismatches else 0
+
+
+def _measure(content, address, full_parse, parser, iterations):
+    """Return (milliseconds per parse, bytes left allocated by a parse, peak bytes during it) for one page"""
+    started = time.perf_counter()
+    for _ in range(iterations):
+        parse_zillow_page(content, address, full_parse=full_parse, parser=parser)
+    elapsed_ms = (time.perf_counter() - started) * 1000 / iterations
+
+    # Allocations are measured on a separate run; tracing slows the parse down
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    before = tracemalloc.take_snapshot()
+    parse_zillow_page(content, address, full_parse=full_parse, parser=parser)
+    after = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    allocated = sum(stat.size_diff for stat in after.compare_to(before, 'filename') if stat.size_diff > 0)
+    return elapsed_ms, allocated, peak
+
+
+def bench(args):
+    fixtures = list(load_fixtures(args.dir))
+    if not fixtures:
+        logger.error(f"No fixtures in {args.dir}; record some first")
+        return 1
+
+    parsers = args.parser or ['html.parser']
+    print(f"{'fixture':<40} {'parser':<12} {'path':<5} {'ms/page':>9} {'held KiB':>10} {'peak KiB':>10}")
+    totals = {}
+    for name, address, content, _ in fixtures:
+        for parser in parsers:
+            for path, full_parse in [('full', True), ('fast', False)]:
+                try:
+                    elapsed_ms, allocated, peak = _measure(content, address, full_parse, parser, args.iterations)
+                except Exception as e:
+                    # bs4 raises FeatureNotFound when a backend such as lxml is not installed
+                    logger.error(f"Skipping parser {parser}: {str(e)}")
+                    break
+                total = totals.setdefault((parser, path), [0.0, 0, 0])
+                total[0] += elapsed_ms
+                total[1] += allocated
+                total[2] = max(total[2], peak)
+                print(f"{name[:40]:<40} {parser:<12} {path:<5} {elapsed_ms:>9.2f} "
+                      f"{allocated / 1024:>10.1f} {peak / 1024:>10.1f}")
+
+    print()
+    for (parser, path), (elapsed_ms, allocated, peak) in totals.items():
+        print(f"{'mean':<40} {parser:<12} {path:<5} {elapsed_ms / len(fixtures):>9.2f} "
+              f"{allocated / len(fixtures) / 1024:>10.1f} {peak / 1024:>10.1f}")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record, replay and benchmark Zillow parser fixtures")
+    parser.add_argument('--dir', default=DEFAULT_FIXTURE_DIR, help="Fixture directory")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    record_parser = subparsers.add_parser('record', help="Fetch pages and save them as fixtures")
+    record_parser.add_argument('addresses', nargs='+', help="Property addresses")
+    record_parser.add_argument('--zip', help="ZIP code added to the search")
+
+    replay_parser = subparsers.add_parser('replay', help="Check the fast parse against the full parse")
+    replay_parser.add_argument('--parser', default=None, help="BeautifulSoup parser backend")
+
+    bench_parser = subparsers.add_parser('bench', help="Time the parse paths")
+    bench_parser.add_argument('--iterations', type=int, default=10, help="Parses per page when timing")
+    bench_parser.add_argument('--parser', action='append', help="Parser backend to compare (repeatable)")
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    commands = {'record': record, 'replay': replay, 'bench': bench}
+    sys.exit(commands[args.command](args))
+
+
+if __name__ == '__main__':
+    main()
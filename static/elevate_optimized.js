@@ -919,6 +919,22 @@ function showToast(message, type = 'info') {
     }, 3000);
 }
 
+// Fetch every page of product categories, following the X-Next-Cursor header
+function fetchProductPages(cursor = null, categories = []) {
+    const url = cursor ? `/api/products?cursor=${encodeURIComponent(cursor)}` : '/api/products';
+    return fetch(url)
+        .then(response => {
+            if (!response.ok) {
+                throw new Error('Failed to fetch products');
+            }
+            const nextCursor = response.headers.get('X-Next-Cursor');
+            return response.json().then(page => {
+                const allCategories = categories.concat(page);
+                return nextCursor ? fetchProductPages(nextCursor, allCategories) : allCategories;
+            });
+        });
+}
+
 // Load products from local storage or fallback to demo products
 function loadProducts() {
     // Show loading state
@@ -938,13 +954,7 @@ function loadProducts() {
             window.storesList = storesData;
             
             // Fetch product data 
-            return fetch('/api/products');
-        })
-        .then(response => {
-            if (!response.ok) {
-                throw new Error('Failed to fetch products');
-            }
-            return response.json();
+            return fetchProductPages();
         })
         .then(categoriesData => {
             // Process the products data structure
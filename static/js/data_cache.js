@@ -162,6 +162,36 @@ class DataCache {
         return null;
     }
     
+    /**
+     * Get a cache entry even if it has expired, so it can be revalidated
+     * @param {string} key - The cache key
+     * @returns {Object} The raw cache entry or null if not found
+     */
+    async getEntry(key) {
+        const cacheKey = this.config.cachePrefix + key;
+        
+        if (this.config.useMemoryCache && this.memoryCache[cacheKey]) {
+            return this.memoryCache[cacheKey];
+        }
+        
+        const storages = [];
+        if (this.config.useLocalStorage) storages.push(localStorage);
+        if (this.config.useSessionStorage) storages.push(sessionStorage);
+        
+        for (const storage of storages) {
+            try {
+                const rawEntry = storage.getItem(cacheKey);
+                if (rawEntry) {
+                    return JSON.parse(rawEntry);
+                }
+            } catch (error) {
+                console.warn('Error retrieving cache entry:', error);
+            }
+        }
+        
+        return null;
+    }
+    
     /**
      * Clear a specific item from the cache
      * @param {string} key - The cache key
@@ -372,8 +402,30 @@ class DataCache {
         }
         
         try {
+            // Revalidate with the ETag of the previous response, even if it has expired
+            const previousEntry = await this.getEntry(cacheKey);
+            const previousEtag = previousEntry && previousEntry.metadata && previousEntry.metadata.etag;
+            const requestOptions = Object.assign({}, fetchOptions);
+            if (previousEtag) {
+                requestOptions.headers = Object.assign({}, fetchOptions.headers, {
+                    'If-None-Match': previousEtag
+                });
+            }
+            
             // Perform the actual fetch
-            const response = await fetch(url, fetchOptions);
+            const response = await fetch(url, requestOptions);
+            
+            // Not modified: keep the cached data and extend its lifetime
+            if (response.status === 304 && previousEntry) {
+                if (progressCallback) {
+                    progressCallback(100, true, previousEntry.data);
+                }
+                await this.set(cacheKey, previousEntry.data, {
+                    maxAge: cacheTTL,
+                    metadata: previousEntry.metadata
+                });
+                return previousEntry.data;
+            }
             
             if (!response.ok) {
                 throw new Error(`Network response was not ok: ${response.status}`);
@@ -392,8 +444,12 @@ class DataCache {
                 progressCallback(100, true, data);
             }
             
-            // Cache the successful response
-            await this.set(cacheKey, data, { maxAge: cacheTTL });
+            // Cache the successful response along with its validator
+            const etag = response.headers.get('ETag');
+            await this.set(cacheKey, data, {
+                maxAge: cacheTTL,
+                metadata: etag ? { etag: etag } : {}
+            });
             
             return data;
         } catch (error) {
@@ -0,0 +1,49 @@
+/**
+ * GlassRain Enrichment Status
+ * Polls a background enrichment job and reloads the page once the
+ * property data it was scraping is ready
+ */
+
+document.addEventListener('DOMContentLoaded', function() {
+    const jobId = document.body.dataset.enrichmentJobId;
+    if (!jobId) {
+        return;
+    }
+    
+    let delay = 2000;
+    const maxDelay = 30000;
+    // Stop polling after ~10 minutes; the placeholder data stays on screen
+    const deadline = Date.now() + 600000;
+    
+    function poll() {
+        fetch(`/api/enrichment-jobs/${encodeURIComponent(jobId)}`)
+            .then(response => response.ok ? response.json() : null)
+            .then(job => {
+                if (!job) {
+                    return;
+                }
+                if (job.status === 'done') {
+                    window.location.reload();
+                    return;
+                }
+                if (job.status === 'failed') {
+                    return;
+                }
+                scheduleNext();
+            })
+            .catch(error => {
+                console.warn('Enrichment status check failed:', error);
+                scheduleNext();
+            });
+    }
+    
+    function scheduleNext() {
+        if (Date.now() > deadline) {
+            return;
+        }
+        setTimeout(poll, delay);
+        delay = Math.min(delay * 1.5, maxDelay);
+    }
+    
+    scheduleNext();
+});
@@ -0,0 +1,255 @@
+"""
+Static Assets
+
+This module serves the files under static/ from a build made by scripts/build_static_assets.py.
+The build minifies JavaScript and CSS, names every file after a hash of its content
+(home.js -> dist/home.3f9a1c2b7d4e.js) and writes gzip and brotli copies of the text assets next
+to it, with a manifest mapping each original path to its build.
+
+Templates keep calling url_for('static', filename='home.js'); once init_app() is registered those
+calls emit the hashed URL. A hashed URL never changes content, so it is served with a far-future
+immutable Cache-Control, from the precompressed copy the client accepts. Files are sent with
+send_file(), which gunicorn passes to sendfile() (or to the front-end proxy with
+STATIC_X_SENDFILE), so the worker never copies the bytes itself. Without a build, or for a file
+the build does not know, the original file is served and revalidated as before.
+"""
+
+import os
+import json
+import gzip
+import hashlib
+import logging
+import mimetypes
+import threading
+from flask import request, send_file, send_from_directory, url_for
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import rjsmin
+except ImportError:
+    rjsmin = None
+
+try:
+    import rcssmin
+except ImportError:
+    rcssmin = None
+
+logger = logging.getLogger(__name__)
+
+# Directory the application's static files live in
+STATIC_DIR = os.environ.get('STATIC_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static'))
+# Subdirectory of STATIC_DIR the build is written to (and served from)
+STATIC_BUILD_SUBDIR = os.environ.get('STATIC_BUILD_SUBDIR', 'dist')
+# Seconds browsers and CDNs keep a hashed asset (its URL changes whenever its content does)
+STATIC_ASSET_MAX_AGE = int(os.environ.get('STATIC_ASSET_MAX_AGE', 365 * 86400))
+# Seconds an unhashed static URL may be reused before it is revalidated
+STATIC_FALLBACK_MAX_AGE = int(os.environ.get('STATIC_FALLBACK_MAX_AGE', 0))
+# Hand files to the front-end proxy with X-Sendfile instead of sending them from the worker
+STATIC_X_SENDFILE = os.environ.get('STATIC_X_SENDFILE', '').lower() in ('1', 'true', 'yes')
+
+# Hex digits of the content hash put in each file name
+HASH_LENGTH = 12
+# Extensions worth precompressing; images and models are already compressed
+COMPRESSIBLE_EXTENSIONS = {'.js', '.css', '.svg', '.json', '.html', '.txt', '.map', '.xml'}
+# Files smaller than this are sent as-is (compression would not save a packet)
+MIN_COMPRESS_SIZE = 512
+# Encodings written by the build, in order of preference
+ENCODINGS = {'br': '.br', 'gzip': '.gz'}
+
+_manifest = None
+_manifest_lock = threading.Lock()
+
+
+def _manifest_path(static_dir=None):
+    """Path of the build manifest"""
+    return os.path.join(static_dir or STATIC_DIR, STATIC_BUILD_SUBDIR, 'manifest.json')
+
+
+def minify(filename, content):
+    """
+    Minify a JavaScript or CSS file
+
+    Parameters:
+    filename (str): The file name (its extension picks the minifier)
+    content (bytes): The file content
+
+    Returns:
+    bytes: The minified content, or the content unchanged if no minifier applies
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == '.js' and rjsmin is not None:
+        return rjsmin.jsmin(content.decode('utf-8')).encode('utf-8')
+    if extension == '.css' and rcssmin is not None:
+        return rcssmin.cssmin(content.decode('utf-8')).encode('utf-8')
+    return content
+
+
+def _compressed_variants(content):
+    """Return encoding -> compressed bytes for every encoding that makes the content smaller"""
+    variants = {}
+    if brotli is not None:
+        variants['br'] = brotli.compress(content, quality=11)
+    # mtime=0 keeps the output identical between builds of the same content
+    variants['gzip'] = gzip.compress(content, compresslevel=9, mtime=0)
+    return {encoding: data for encoding, data in variants.items() if len(data) < len(content)}
+
+
+def _write_file(path, content):
+    """Write a build file, creating its directory"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(content)
+
+
+def build_assets(static_dir=None, minify_assets=True):
+    """
+    Build the hashed, minified and precompressed copy of every static file
+
+    Parameters:
+    static_dir (str, optional): The static directory (STATIC_DIR if None)
+    minify_assets (bool): Minify JavaScript and CSS
+
+    Returns:
+    dict: The manifest written: original path -> {'file', 'size', 'encodings': {encoding: size}}
+    """
+    static_dir = static_dir or STATIC_DIR
+    build_dir = os.path.join(static_dir, STATIC_BUILD_SUBDIR)
+    if minify_assets and (rjsmin is None or rcssmin is None):
+        logger.warning("rjsmin/rcssmin are not installed; JavaScript and CSS will not be minified")
+    if brotli is None:
+        logger.warning("brotli is not installed; only gzip copies will be written")
+
+    assets = {}
+    for root, dirs, files in os.walk(static_dir):
+        # Never build the build
+        dirs[:] = sorted(d for d in dirs if os.path.join(root, d) != build_dir and not d.startswith('.'))
+        for name in sorted(files):
+            if name.startswith('.'):
+                continue
+            path = os.path.join(root, name)
+            logical = os.path.relpath(path, static_dir).replace(os.sep, '/')
+            with open(path, 'rb') as f:
+                content = f.read()
+            if minify_assets:
+                content = minify(name, content)
+
+            stem, extension = os.path.splitext(logical)
+            digest = hashlib.sha256(content).hexdigest()[:HASH_LENGTH]
+            hashed = f"{STATIC_BUILD_SUBDIR}/{stem}.{digest}{extension}"
+            _write_file(os.path.join(static_dir, hashed), content)
+
+            encodings = {}
+            if extension.lower() in COMPRESSIBLE_EXTENSIONS and len(content) >= MIN_COMPRESS_SIZE:
+                for encoding, data in _compressed_variants(content).items():
+                    _write_file(os.path.join(static_dir, hashed + ENCODINGS[encoding]), data)
+                    encodings[encoding] = len(data)
+            assets[logical] = {'file': hashed, 'size': len(content), 'encodings': encodings}
+
+    # The manifest is replaced last, so workers never see it point at files not written yet
+    manifest_path = _manifest_path(static_dir)
+    os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+    with open(manifest_path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(assets, f, indent=2, sort_keys=True)
+    os.replace(manifest_path + '.tmp', manifest_path)
+    return assets
+
+
+class AssetManifest:
+    """The build manifest and the lookups against it"""
+
+    def __init__(self, assets):
+        self.assets = assets
+        # Hashed path -> entry, for the request path
+        self.files = {entry['file']: entry for entry in assets.values()}
+
+    def hashed_path(self, filename):
+        """Return the hashed path of an original static path, or None if it was not built"""
+        entry = self.assets.get(filename)
+        return entry['file'] if entry else None
+
+
+def _load_manifest():
+    """Read the build manifest; an empty manifest serves the original files"""
+    path = _manifest_path()
+    try:
+        with open(path, encoding='utf-8') as f:
+            return AssetManifest(json.load(f))
+    except FileNotFoundError:
+        logger.info(f"No static asset manifest at {path}; serving unhashed files "
+                    f"(run scripts/build_static_assets.py to build them)")
+    except Exception as e:
+        logger.error(f"Error loading static asset manifest: {str(e)}")
+    return AssetManifest({})
+
+
+def get_manifest():
+    """Return this process's asset manifest, loading it on first use"""
+    global _manifest
+    if _manifest is None:
+        with _manifest_lock:
+            if _manifest is None:
+                _manifest = _load_manifest()
+    return _manifest
+
+
+def _preferred_encoding(available):
+    """Pick the best precompressed encoding the client accepts"""
+    for encoding in ENCODINGS:
+        if encoding in available and request.accept_encodings[encoding] > 0:
+            return encoding
+    return None
+
+
+def send_asset(filename):
+    """
+    Send a static file
+
+    Parameters:
+    filename (str): The path requested under /static/
+
+    Returns:
+    Response: The precompressed build of a hashed path with an immutable Cache-Control, or the
+              original file with a revalidating one
+    """
+    entry = get_manifest().files.get(filename)
+    if entry is None:
+        return send_from_directory(STATIC_DIR, filename, max_age=STATIC_FALLBACK_MAX_AGE)
+
+    path = os.path.join(STATIC_DIR, entry['file'])
+    mimetype = mimetypes.guess_type(entry['file'])[0] or 'application/octet-stream'
+    encoding = _preferred_encoding(entry['encodings'])
+    if encoding:
+        path += ENCODINGS[encoding]
+    # Name the served file, not its .br/.gz copy, in the Content-Disposition header
+    response = send_file(path, mimetype=mimetype, max_age=STATIC_ASSET_MAX_AGE, conditional=True,
+                         download_name=os.path.basename(entry['file']))
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    if entry['encodings']:
+        response.vary.add('Accept-Encoding')
+    response.headers['Cache-Control'] = f"public, max-age={STATIC_ASSET_MAX_AGE}, immutable"
+    return response
+
+
+def asset_url(filename):
+    """Return the URL of a static file (its hashed URL once built)"""
+    return url_for('static', filename=filename)
+
+
+def _hashed_static_url(endpoint, values):
+    """Point url_for('static', filename=...) at the hashed build of the file"""
+    if endpoint == 'static' and 'filename' in values:
+        hashed = get_manifest().hashed_path(values['filename'])
+        if hashed:
+            values['filename'] = hashed
+
+
+def init_app(app):
+    """Emit hashed static URLs from url_for and the asset_url template global"""
+    app.url_defaults(_hashed_static_url)
+    app.jinja_env.globals['asset_url'] = asset_url
+    app.config['USE_X_SENDFILE'] = STATIC_X_SENDFILE
@@ -0,0 +1,143 @@
+"""
+ZIP Climate
+
+This module maps ZIP codes to a climate score adjustment with two small arrays: one entry per
+3-digit ZIP prefix, and an optional override per 5-digit ZIP. Lookups are a single index into
+an array, for one ZIP or a whole column of them.
+
+The table is built from data/zip_climate.csv by scripts/build_zip_climate_table.py and shipped
+as data/zip_climate.npz. Each CSV row gives a 3-digit prefix, an inclusive prefix range
+("980-986") or a 5-digit ZIP, with its score; later rows override earlier ones and prefixes
+not listed score 0. The shipped scores are state- and region-level estimates of heating and
+cooling load, refined for a few prefixes whose climate differs from the rest of the state.
+"""
+
+import os
+import csv
+import logging
+import threading
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+# Built table loaded by each process
+ZIP_CLIMATE_TABLE_PATH = os.environ.get('ZIP_CLIMATE_TABLE_PATH', os.path.join(_DATA_DIR, 'zip_climate.npz'))
+# Source CSV the table is built from (and loaded from directly if the table file is missing)
+ZIP_CLIMATE_CSV_PATH = os.environ.get('ZIP_CLIMATE_CSV_PATH', os.path.join(_DATA_DIR, 'zip_climate.csv'))
+
+# Marks a 5-digit ZIP without its own score (the prefix score applies)
+NO_OVERRIDE = -128
+
+_table = None
+_table_lock = threading.Lock()
+
+
+def build_table(csv_path=None):
+    """
+    Build the prefix and 5-digit arrays from a CSV
+
+    Parameters:
+    csv_path (str, optional): The CSV file (ZIP_CLIMATE_CSV_PATH if None)
+
+    Returns:
+    tuple: (prefix_scores, zip_scores) int8 arrays of length 1000 and 100000
+    """
+    prefix_scores = np.zeros(1000, dtype=np.int8)
+    zip_scores = np.full(100000, NO_OVERRIDE, dtype=np.int8)
+    with open(csv_path or ZIP_CLIMATE_CSV_PATH, newline='', encoding='utf-8') as f:
+        for line_number, row in enumerate(csv.DictReader(f), start=2):
+            key = row['zip'].strip()
+            score = int(row['score'])
+            if not -10 <= score <= 10:
+                raise ValueError(f"Line {line_number}: score {score} is outside -10..10")
+            if '-' in key:
+                start, end = (int(part) for part in key.split('-'))
+                prefix_scores[start:end + 1] = score
+            elif len(key) == 3 and key.isdigit():
+                prefix_scores[int(key)] = score
+            elif len(key) == 5 and key.isdigit():
+                zip_scores[int(key)] = score
+            else:
+                raise ValueError(f"Line {line_number}: {key!r} is not a ZIP prefix, prefix range or 5-digit ZIP")
+    return prefix_scores, zip_scores
+
+
+def save_table(prefix_scores, zip_scores, path=None):
+    """Write a built table"""
+    np.savez_compressed(path or ZIP_CLIMATE_TABLE_PATH, prefix_scores=prefix_scores, zip_scores=zip_scores)
+
+
+class ZipClimateTable:
+    """ZIP prefix and 5-digit climate scores"""
+
+    def __init__(self, prefix_scores, zip_scores):
+        self.prefix_scores = prefix_scores
+        self.zip_scores = zip_scores
+        # Per-ZIP score with the prefix score filled in, so a lookup is one read
+        self.scores = np.where(zip_scores == NO_OVERRIDE, np.repeat(prefix_scores, 100), zip_scores).astype(np.int64)
+        self._scores_list = self.scores.tolist()
+
+    def score(self, zip_code):
+        """Score one ZIP code; 0 unless it starts with five ASCII digits"""
+        head = zip_code[:5]
+        if len(head) < 5 or not (head.isascii() and head.isdigit()):
+            return 0
+        return self._scores_list[int(head)]
+
+    def scores_for(self, zip_codes):
+        """Score an array of ZIP codes (see score())"""
+        zip_codes = np.asarray(zip_codes, dtype=str)
+        # Each string as five code points; shorter strings are padded with 0
+        codes = zip_codes.astype('U5').view(np.uint32).reshape(-1, 5)
+        digits = codes.astype(np.int64) - ord('0')
+        valid = ((digits >= 0) & (digits <= 9)).all(axis=1)
+        index = digits @ np.array([10000, 1000, 100, 10, 1])
+        return np.where(valid, self.scores[np.where(valid, index, 0)], 0).reshape(zip_codes.shape)
+
+
+def _load_table():
+    """Load the built table, or build it from the CSV if it is missing"""
+    try:
+        with np.load(ZIP_CLIMATE_TABLE_PATH) as data:
+            return ZipClimateTable(data['prefix_scores'], data['zip_scores'])
+    except FileNotFoundError:
+        logger.warning(f"No ZIP climate table at {ZIP_CLIMATE_TABLE_PATH}; building it from {ZIP_CLIMATE_CSV_PATH}")
+    return ZipClimateTable(*build_table())
+
+
+def get_table():
+    """Return this process's ZIP climate table, loading it on first use"""
+    global _table
+    if _table is None:
+        with _table_lock:
+            if _table is None:
+                _table = _load_table()
+    return _table
+
+
+def zip_climate_score(zip_code):
+    """
+    Get the climate score adjustment for a ZIP code
+
+    Parameters:
+    zip_code (str): The ZIP code (ZIP+4 is accepted)
+
+    Returns:
+    int: Score adjustment from -10 to +10, or 0 for an unknown or malformed ZIP
+    """
+    return get_table().score(zip_code)
+
+
+def zip_climate_scores(zip_codes):
+    """
+    Get the climate score adjustments for an array of ZIP codes
+
+    Parameters:
+    zip_codes (array-like): ZIP code strings
+
+    Returns:
+    numpy.ndarray: int64 score adjustments
+    """
+    return get_table().scores_for(zip_codes)